@@ -1,10 +1,33 @@
 """
 Handles AI responses using OpenRouter API for Zoya AI Assistant
+
+Requests go to the fastest healthy of the configured OpenAI-compatible
+backends (see llm_backends), OpenRouter by default.
 """
 
 import os
+import re
+import json
+import hashlib
+import time
 import requests
-from utils import stop_flag
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeout
+import diagnostics
+import llm_backends
+import metrics
+import outbound
+import session_store
+import telemetry
+from utils import Cancelled, run_cancellable
+from http_client import session as http_session, abort_response, bind as bind_request
+from answer_cache import AnswerCache
+from resilience import (
+    CircuitBreaker,
+    LatencyTracker,
+    RETRYABLE_STATUSES,
+    backoff_delay,
+    retry_after_seconds,
+)
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,11 +35,56 @@ load_dotenv()
 
 # Configure OpenRouter API
 API_KEY = os.getenv("OPENROUTER_API_KEY")
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
+API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 MODEL_NAME = os.getenv("OPENROUTER_MODEL", "x-ai/grok-4-fast:free")
 
+# Models tried in order when the primary one is failing, e.g. "meta-llama/llama-3.3-8b-instruct:free,..."
+FALLBACK_MODELS = [m.strip() for m in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(",") if m.strip()]
+
+# Seconds to establish a connection, and to wait for each read from it
+CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "20"))
+
+# Total seconds spent on retries and fallbacks before giving up
+REQUEST_DEADLINE = float(os.getenv("OPENROUTER_DEADLINE", "25"))
+
+# Retries per model on rate limits, server errors and timeouts
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "2"))
+
+# Send a second, hedged request when the first is slower than the model's recent p95
+HEDGE_REQUESTS = os.getenv("OPENROUTER_HEDGE", "0") == "1"
+
+# Generation budgets in tokens per mode: spoken replies are kept tighter than text
+GENERATION_BUDGETS = {
+    "voice": int(os.getenv("ZOYA_VOICE_MAX_TOKENS", "110")),
+    "text": int(os.getenv("ZOYA_TEXT_MAX_TOKENS", "240"))
+}
+
+# Stop sequences per mode: a spoken reply ends with its first paragraph
+STOP_SEQUENCES = {
+    "voice": ["\n\n"]
+}
+
+# Rough English words per token, used to turn token budgets into word budgets
+WORDS_PER_TOKEN = 0.75
+
+# End of a sentence, including the Devanagari danda
+SENTENCE_END = re.compile(r"[.!?\u0964][\"')\]]*(?=\s|$)")
+
+# A sentence boundary while streaming, confirmed by the whitespace after it
+SENTENCE_BREAK = re.compile(r"[.!?\u0964][\"')\]]*(?=\s)")
+
+# OpenRouter plus any other backends named in ZOYA_LLM_BACKENDS, fastest healthy first
+router = llm_backends.build_router(llm_backends.Backend(
+    "openrouter", API_URL, [MODEL_NAME] + [m for m in FALLBACK_MODELS if m != MODEL_NAME], API_KEY,
+    headers={"HTTP-Referer": "http://localhost", "X-Title": "Zoya AI Assistant"},
+    # Ask OpenRouter to report each request's cost with its token usage
+    body={"usage": {"include": True}},
+    requires_key=True
+))
+
 # Global flag for AI availability
-OPENAI_AVAILABLE = True if API_KEY else False
+OPENAI_AVAILABLE = router.available()
 
 # Language names for prompt
 language_names = {
@@ -28,48 +96,476 @@ language_names = {
     "fr": "French"
 }
 
+# Most recent conversation messages sent to the model with each request
+HISTORY_MESSAGES = int(os.getenv("ZOYA_HISTORY_MESSAGES", "20"))
+
+# Default system prompt, refined with the response language on every request
+SYSTEM_PROMPT = (
+    "You are Zoya, a smart and kind female AI assistant created by Masthan Valli. "
+    "Always speak in a friendly, conversational tone. "
+    "Keep answers short (under 3 lines) unless asked for details. "
+    "Never include definitions, grammar tips, dictionary entries, or code unless requested. "
+    "When asked personal questions, reply naturally as Zoya."
+)
+
+
+def new_memory():
+    """Create a fresh conversation memory holding only the system message"""
+    return [{"role": "system", "content": SYSTEM_PROMPT}]
+
+
+def context_window(memory):
+    """Return the system message and the most recent messages, as sent to the model"""
+    system = [msg for msg in memory[:1] if msg["role"] == "system"]
+    history = list(memory[len(system):])
+    if len(history) > HISTORY_MESSAGES:
+        history = history[-HISTORY_MESSAGES:]
+        # Never open the window on a reply to a question that was cut off
+        while history and history[0]["role"] == "assistant":
+            history.pop(0)
+    return system + history
+
+
+def trim_history(memory=None):
+    """
+    Drop messages older than the context window, which are never sent again
+
+    Args:
+        memory (list): Conversation memory to trim, defaults to the global chat_memory
+    """
+    if memory is None:
+        memory = chat_memory
+    window = context_window(memory)
+    if len(window) < len(memory):
+        memory[:] = window
+
+
 # 🧠 Persistent memory (list of messages)
-chat_memory = [
-    {
-        "role": "system",
-        "content": (
-            "You are Zoya, a smart and kind female AI assistant created by Masthan Valli. "
-            "Always speak in a friendly, conversational tone. "
-            "Keep answers short (under 3 lines) unless asked for details. "
-            "Never include definitions, grammar tips, dictionary entries, or code unless requested. "
-            "When asked personal questions, reply naturally as Zoya."
-        )
-    }
-]
+chat_memory = new_memory()
+
+
+# Cached answers to repeated questions, shared by every session in the process
+answer_cache = AnswerCache()
 
+# Freed by diagnostics when the process reaches a memory ceiling
+diagnostics.add_trimmer("answer_cache", answer_cache.clear)
+diagnostics.add_trimmer("chat_history", lambda: trim_history())
 
-def get_ai_response(query, language="en"):
+# Per-model health and latency on each backend, shared by every session in the process
+_breakers = {}
+_latency = {}
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="zoya-hedge")
+
+
+def _model_state(backend, model):
+    """Return the circuit breaker and latency tracker for a model on a backend"""
+    key = (backend.name, model)
+    if key not in _breakers:
+        _breakers.setdefault(key, CircuitBreaker())
+        _latency.setdefault(key, LatencyTracker())
+    return _breakers[key], _latency[key]
+
+
+def _send(backend, data, stream):
+    """Send one chat-completions request and return (response, seconds)"""
+    start = time.monotonic()
+    response = http_session.post(backend.url, headers=backend.headers(), json=data,
+                                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=stream)
+    metrics.inc("zoya_requests_total", backend=backend.name, status=response.status_code)
+    metrics.inc("zoya_http_bytes_total", len(response.request.body or b""), backend=backend.name, direction="out")
+    return response, time.monotonic() - start
+
+
+def _close_result(future):
+    """Close the response of an abandoned request once it arrives"""
+    try:
+        future.result()[0].close()
+    except Exception:
+        pass
+
+
+def _close_abandoned(result):
+    """Close the response of a request abandoned by a cancelled turn"""
+    result[0].close()
+
+
+def _hedged_send(backend, data, hedge_after):
+    """
+    Send a request, and a duplicate if the first has not answered in time
+
+    Args:
+        backend (Backend): Backend to send both requests to
+        data (dict): Request body
+        hedge_after (float): Seconds to wait before sending the duplicate
+
+    Returns:
+        tuple: (response, seconds) from whichever request succeeded first
+    """
+    # Both requests are aborted with the caller's, if it is cancelled
+    send = bind_request(_send)
+    primary = _hedge_pool.submit(send, backend, data, False)
+    try:
+        return primary.result(timeout=hedge_after)
+    except FutureTimeout:
+        pass
+
+    # Hedges are extra load, so only send one if the rate limit has room right now
+    if not outbound.try_acquire(backend.name):
+        return primary.result()
+    metrics.inc("zoya_hedged_requests_total", model=data["model"])
+    pending = {primary, _hedge_pool.submit(send, backend, data, False)}
+    fallback, error = None, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            if result[0].status_code == 200:
+                for other in pending:
+                    other.add_done_callback(_close_result)
+                return result
+            fallback = result
+    if fallback:
+        return fallback
+    raise error
+
+
+def _request_key(data):
+    """Return a digest identifying a request body, for sharing identical requests"""
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _post_completion(payload, stream=False, cancel=None):
+    """
+    Post a chat completion with retries, circuit breakers, hedging and fallback
+
+    Backends are tried fastest healthy first, as ranked by the router, and on
+    each backend its models in order (on OpenRouter: MODEL_NAME, then
+    FALLBACK_MODELS). Each model gets up to MAX_RETRIES jittered retries on
+    429/5xx responses and timeouts, unless its circuit breaker is open; a
+    backend that cannot be reached is skipped at once if another one is left. Everything stops at
+    REQUEST_DEADLINE. Every attempt waits for the backend's rate limit, and
+    identical non-streamed requests already in flight are shared.
+
+    Args:
+        payload (dict): Request body without the model
+        stream (bool): Request a streamed reply; streams are never hedged
+        cancel (CancelToken): Abandons the request and any retries when set
+
+    Returns:
+        tuple: (response, backend, model) for the first successful or non-retryable response
+
+    Raises:
+        Cancelled: If cancel was set before a response arrived
+        Exception: The last network error if no response was ever received
+    """
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    last_response, last_backend, last_model, last_error = None, None, MODEL_NAME, None
+    first_choice = True
+    backends = router.order()
+
+    for backend in backends:
+        unreachable = False
+        for model in backend.models:
+            if unreachable:
+                break
+            breaker, latency = _model_state(backend, model)
+            if not first_choice:
+                metrics.inc("zoya_model_fallbacks_total", model=model)
+
+            for attempt in range(MAX_RETRIES + 1):
+                if time.monotonic() >= deadline:
+                    break
+                if not breaker.allow():
+                    metrics.inc("zoya_circuit_rejections_total", model=model)
+                    break
+
+                data = dict(payload, model=model, **backend.extra_body)
+                delay = None
+                try:
+                    if stream:
+                        outbound.acquire(backend.name, cancel)
+                        response, elapsed = run_cancellable(_send, cancel, backend, data, True,
+                                                            on_abandon=_close_abandoned)
+                    elif HEDGE_REQUESTS:
+                        response, elapsed = outbound.call(backend.name, _request_key(data), _hedged_send,
+                                                          backend, data, latency.percentile(95),
+                                                          cancel=cancel, on_abandon=_close_abandoned)
+                    else:
+                        response, elapsed = outbound.call(backend.name, _request_key(data), _send,
+                                                          backend, data, False,
+                                                          cancel=cancel, on_abandon=_close_abandoned)
+                except requests.RequestException as e:
+                    breaker.record_failure()
+                    backend.observe(ok=False)
+                    last_error = e
+                    print(f"AI request to {model} on {backend.name} failed: {e}")
+                    if isinstance(e, requests.ConnectionError) and backend is not backends[-1]:
+                        # The backend is unreachable; move on to the next one instead of retrying
+                        unreachable = True
+                        break
+                except BaseException:
+                    # Cancelled or interrupted: no verdict on the model, so a half-open trial is freed
+                    breaker.release_trial()
+                    raise
+                else:
+                    if response.status_code == 200:
+                        breaker.record_success()
+                        latency.record(elapsed)
+                        backend.observe(elapsed)
+                        if not first_choice:
+                            print(f"↪️ Answered by fallback model {model} on {backend.name}")
+                        return response, backend, model
+
+                    # Read the error body now so it is still available after closing
+                    print(f"AI response error from {model} on {backend.name} ({response.status_code}):",
+                          response.text[:200])
+                    last_response, last_backend, last_model = response, backend, model
+                    response.close()
+                    if response.status_code not in RETRYABLE_STATUSES:
+                        # The request itself is bad; another attempt will not help
+                        breaker.record_success()
+                        backend.observe(elapsed)
+                        return response, backend, model
+                    breaker.record_failure()
+                    backend.observe(ok=False)
+                    delay = retry_after_seconds(response)
+                    if response.status_code == 429:
+                        # Hold back everyone else queued for this backend, not just this caller
+                        outbound.pause(backend.name, delay if delay is not None else backoff_delay(attempt))
+
+                if attempt < MAX_RETRIES:
+                    metrics.inc("zoya_retries_total", model=model)
+                    delay = backoff_delay(attempt) if delay is None else delay
+                    delay = max(0.0, min(delay, deadline - time.monotonic()))
+                    if cancel is None:
+                        time.sleep(delay)
+                    elif cancel.wait(delay):
+                        raise Cancelled()
+            first_choice = False
+
+    if last_response is not None:
+        return last_response, last_backend, last_model
+    if last_error is not None:
+        raise last_error
+    raise RuntimeError("No AI model available: all circuit breakers are open")
+
+
+def generation_budget(mode):
+    """
+    Return the generation budget for a mode
+
+    Args:
+        mode (str): The mode asking, e.g. "voice" or "text"
+
+    Returns:
+        tuple: (max_tokens sent to the model, word budget for the reply)
+    """
+    max_tokens = GENERATION_BUDGETS.get(mode, GENERATION_BUDGETS["text"])
+    return max_tokens, max(1, int(max_tokens * WORDS_PER_TOKEN))
+
+
+def trim_to_sentence(text, max_words, truncated=False):
+    """
+    Trim text to the last complete sentence within a word budget
+
+    Args:
+        text (str): Reply to trim
+        max_words (int): Maximum number of words to keep
+        truncated (bool): The model stopped at max_tokens (finish_reason "length"),
+            so the text ends mid-sentence whatever its word count
+
+    Returns:
+        str: The trimmed text, ending on a sentence boundary when one exists
+    """
+    words = text.split()
+    if len(words) <= max_words:
+        if not truncated:
+            return text
+        clipped = text
+    else:
+        clipped = " ".join(words[:max_words])
+    ends = list(SENTENCE_END.finditer(clipped))
+    if ends:
+        return clipped[:ends[-1].end()]
+    return clipped + "..."
+
+
+def _read_stream(response, on_delta, cancel=None, max_words=None, backend="openrouter"):
+    """
+    Read a streamed chat completion, passing the reply to on_delta a sentence at a time
+
+    Text after the last sentence boundary is held back until the next boundary
+    arrives, so a reply cut short still ends on a complete sentence for the
+    client, exactly as it is saved. Stops early, without the delta that
+    crossed it, once the reply exceeds max_words, and closes the connection so
+    the model stops generating. Cancelling aborts the connection at once,
+    even mid-read.
+
+    Args:
+        response: Streaming requests response with server-sent events
+        on_delta (callable): Called with each piece of the reply
+        cancel (CancelToken): Ends the stream early when set
+        max_words (int): Word budget for the reply
+        backend (str): Name of the backend streaming the reply, for metrics
+
+    Returns:
+        tuple: (the text passed to on_delta, usage dict or None, True if the budget
+            ended the stream, time.monotonic() of the first delta or None,
+            finish_reason or None)
+    """
+    parts = []
+    sent = 0
+    received = 0
+    usage = None
+    over_budget = False
+    finish_reason = None
+    first_delta_at = None
+    abort = cancel.on_cancel(lambda: abort_response(response)) if cancel is not None else None
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if cancel is not None and cancel.is_set():
+                break
+            received += len(line) + 1
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            try:
+                chunk = json.loads(payload)
+            except ValueError:
+                continue
+            usage = chunk.get("usage") or usage
+            choices = chunk.get("choices") or [{}]
+            finish_reason = choices[0].get("finish_reason") or finish_reason
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                if max_words and len(("".join(parts) + delta).split()) > max_words:
+                    over_budget = True
+                    break
+                if first_delta_at is None:
+                    first_delta_at = time.monotonic()
+                parts.append(delta)
+                # Pass on complete sentences only; a boundary counts once whitespace follows it
+                text = "".join(parts)
+                ends = list(SENTENCE_BREAK.finditer(text, sent))
+                if ends:
+                    on_delta(text[sent:ends[-1].end()])
+                    sent = ends[-1].end()
+    except Exception:
+        # Aborting the connection surfaces as a read error in this thread
+        if cancel is None or not cancel.is_set():
+            raise
+    finally:
+        if abort is not None:
+            cancel.remove_callback(abort)
+        response.close()
+    metrics.inc("zoya_http_bytes_total", received, backend=backend, direction="in")
+
+    text = "".join(parts)
+    if cancel is not None and cancel.is_set():
+        # Only what the user already heard counts
+        return text[:sent], usage, over_budget, first_delta_at, finish_reason
+    if over_budget or finish_reason == "length":
+        text = trim_to_sentence(text, max_words or len(text.split()), truncated=True)
+    if len(text) > sent:
+        on_delta(text[sent:])
+    return text, usage, over_budget, first_delta_at, finish_reason
+
+
+def _estimate_tokens(text):
+    return round(len(text.split()) / WORDS_PER_TOKEN)
+
+
+def _record_tokens(usage, max_tokens, reply, stopped_early):
+    """
+    Count tokens used, and tokens saved by ending a reply at its budget
+
+    Returns:
+        int: Completion tokens used
+    """
+    if usage:
+        metrics.inc("zoya_llm_tokens_total", usage.get("prompt_tokens", 0), kind="prompt")
+        completion = usage.get("completion_tokens", 0)
+    else:
+        completion = _estimate_tokens(reply)
+    metrics.inc("zoya_llm_tokens_total", completion, kind="completion")
+    if stopped_early:
+        metrics.inc("zoya_llm_tokens_saved_total", max(0, max_tokens - completion))
+    return completion
+
+
+def _record_request(memory, mode, model, status, started, messages=None, usage=None, completion=None,
+                    first_delta_at=None, streamed=False):
+    """Record an AI request's tokens, cost and timing in the telemetry store"""
+    now = time.monotonic()
+    ttft = first_delta_at - started if first_delta_at is not None else None
+    if ttft is not None:
+        metrics.observe("zoya_llm_ttft_seconds", ttft, model=model)
+    prompt = usage.get("prompt_tokens") if usage else None
+    estimated = status == 200 and prompt is None
+    if estimated and messages:
+        prompt = sum(_estimate_tokens(msg["content"]) for msg in messages)
+    telemetry.record(
+        model, status, now - started,
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        ttft=ttft,
+        cost=usage.get("cost") if usage else None,
+        streamed=streamed,
+        estimated=estimated,
+        mode=mode,
+        session_id=telemetry.current_session() or getattr(memory, "session_id", None)
+    )
+
+
+@metrics.timed("ai")
+def get_ai_response(query, language="en", memory=None, on_delta=None, cancel=None, mode="text"):
     """
     Get AI response for the given query using OpenRouter API with memory context
     
     Args:
         query (str): User's query
         language (str): Language code for response
+        memory (list): Conversation memory to use, defaults to the global chat_memory
+        on_delta (callable): Streams the reply when given, called with each piece of text
+        cancel (CancelToken): Abandons the request, or ends a streamed reply, when set
+        mode (str): The mode asking, which sets the generation budget
         
     Returns:
         str: AI response or None if failed
+
+    Raises:
+        Cancelled: If cancel was set; any partial reply is kept in memory and
+            carried on the exception
     """
-    if not API_KEY:
-        print("❌ Missing OPENROUTER_API_KEY in .env")
+    if not router.available():
+        print("❌ Missing OPENROUTER_API_KEY in .env, and no other AI backend is configured")
         return "I couldn't process that request."
         
     language_name = language_names.get(language, "English")
+
+    if memory is None:
+        memory = chat_memory
+
+    max_tokens, max_words = generation_budget(mode)
         
     try:
-        headers = {
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost",
-            "X-Title": "Zoya AI Assistant"
-        }
+        # Look up the answer cache before the query joins the context
+        cache_key = answer_cache.make_key(query, language, memory)
+        cached_reply = answer_cache.get(cache_key)
 
         # 🧠 Add user query to memory
-        chat_memory.append({"role": "user", "content": query})
+        user_message = {"role": "user", "content": query}
+        memory.append(user_message)
+
+        # Older messages are never sent again; dropping them in batches keeps long sessions flat
+        if len(memory) > 2 * HISTORY_MESSAGES:
+            trim_history(memory)
 
         # Update system message with language context
         system_message = (
@@ -80,53 +576,117 @@ def get_ai_response(query, language="en"):
             "When asked personal questions, reply naturally as Zoya."
         )
         
-        # Find and update the system message in chat_memory
-        for msg in chat_memory:
+        # Find and update the system message in memory
+        for msg in memory:
             if msg["role"] == "system":
                 msg["content"] = system_message
                 break
         else:
             # If no system message found, add one
-            chat_memory.insert(0, {"role": "system", "content": system_message})
+            memory.insert(0, {"role": "system", "content": system_message})
+
+        if cached_reply:
+            # Answers cached for a looser budget are trimmed to this one
+            cached_reply = trim_to_sentence(cached_reply, max_words)
+
+            # 🧠 Save the cached answer in memory just like a fresh one
+            memory.append({"role": "assistant", "content": cached_reply})
+            if on_delta:
+                on_delta(cached_reply)
+            return cached_reply
 
         data = {
-            "model": MODEL_NAME,
-            "messages": chat_memory
+            # A snapshot, since the request may still be serialized after a cancelled turn edits memory
+            "messages": context_window(memory),
+            "max_tokens": max_tokens
         }
+        if STOP_SEQUENCES.get(mode):
+            data["stop"] = STOP_SEQUENCES[mode]
+        if on_delta:
+            data["stream"] = True
+            data["stream_options"] = {"include_usage": True}
 
-        response = requests.post(API_URL, headers=headers, json=data, timeout=30)
+        started = time.monotonic()
+        try:
+            response, backend, model = _post_completion(data, stream=bool(on_delta), cancel=cancel)
+        except Cancelled:
+            _record_request(memory, mode, MODEL_NAME, "cancelled", started, streamed=bool(on_delta))
+            # Nothing was said, so forget the question too
+            if memory and memory[-1] is user_message:
+                memory.pop()
+            raise
+        except Exception:
+            _record_request(memory, mode, MODEL_NAME, "error", started, streamed=bool(on_delta))
+            raise
         if response.status_code == 200:
-            result = response.json()
-            ai_reply = result["choices"][0]["message"]["content"].strip()
+            if on_delta:
+                ai_reply, usage, stopped_early, first_delta_at, finish_reason = _read_stream(
+                    response, on_delta, cancel, max_words, backend.name)
+                if cancel is not None and cancel.is_set():
+                    _record_request(memory, mode, model, "cancelled", started, usage=usage,
+                                    completion=_estimate_tokens(ai_reply), first_delta_at=first_delta_at,
+                                    streamed=True)
+                    partial = ai_reply.strip()
+                    if partial:
+                        # 🧠 Keep what was already said, as the user heard it
+                        memory.append({"role": "assistant", "content": partial})
+                    elif memory and memory[-1] is user_message:
+                        memory.pop()
+                    raise Cancelled(partial)
+            else:
+                result = response.json()
+                metrics.inc("zoya_http_bytes_total", len(response.content), backend=backend.name, direction="in")
+                ai_reply = result["choices"][0]["message"]["content"]
+                finish_reason = result["choices"][0].get("finish_reason")
+                usage = result.get("usage")
+                stopped_early = False
+                first_delta_at = None
+            completion = _record_tokens(usage, max_tokens, ai_reply, stopped_early)
+            _record_request(memory, mode, model, 200, started, data["messages"], usage, completion,
+                            first_delta_at, streamed=bool(on_delta))
 
-            # Remove long irrelevant text
-            if len(ai_reply.split()) > 80:
-                ai_reply = " ".join(ai_reply.split()[:80]) + "..."
+            # End on the last complete sentence instead of mid-sentence; a stream did so already
+            if on_delta:
+                ai_reply = ai_reply.strip()
+            else:
+                ai_reply = trim_to_sentence(ai_reply.strip(), max_words, finish_reason == "length")
 
             # 🧠 Save AI response in memory
-            chat_memory.append({"role": "assistant", "content": ai_reply})
+            memory.append({"role": "assistant", "content": ai_reply})
+            answer_cache.put(cache_key, ai_reply)
 
             return ai_reply
         else:
-            print("AI response error:", response.text)
+            _record_request(memory, mode, model, response.status_code, started, streamed=bool(on_delta))
             return "I couldn't process that request."
             
     except Exception as e:
+        metrics.inc("zoya_stage_errors_total", stage="ai_request")
         print("AI response error:", e)
         return "I couldn't process that request."
 
 
 def clear_memory():
     """Clear the chat memory, keeping only the system message"""
+    if chat_memory and chat_memory[0]["role"] == "system":
+        del chat_memory[1:]
+    else:
+        chat_memory[:] = new_memory()
+
+
+def resume_session(session_id=None, resume=True):
+    """
+    Back the global chat memory with a saved session
+
+    Args:
+        session_id (str): Session to open, defaults to the most recent one
+        resume (bool): Whether to resume the most recent session when no id is given
+
+    Returns:
+        JournaledMemory: The session's memory, now the global chat_memory
+    """
     global chat_memory
-    system_msg = chat_memory[0] if chat_memory and chat_memory[0]["role"] == "system" else {
-        "role": "system", 
-        "content": (
-            "You are Zoya, a smart and kind female AI assistant created by Masthan Valli. "
-            "Always speak in a friendly, conversational tone. "
-            "Keep answers short (under 3 lines) unless asked for details. "
-            "Never include definitions, grammar tips, dictionary entries, or code unless requested. "
-            "When asked personal questions, reply naturally as Zoya."
-        )
-    }
-    chat_memory = [system_msg]
\ No newline at end of file
+    if isinstance(chat_memory, session_store.JournaledMemory):
+        chat_memory.close()
+    chat_memory = session_store.SessionStore(window=HISTORY_MESSAGES).open(session_id, resume=resume)
+    return chat_memory
@@ -0,0 +1,213 @@
+"""
+Context-aware answer cache for Zoya AI Assistant
+
+Caches AI replies keyed by the normalized query, the response language and a
+hash of the conversation context that matters for the answer. Lookups can
+also match near-duplicate questions by character trigram similarity.
+Follow-up questions that lean on earlier turns ("tell me more about it")
+bypass the cache, since the same words mean something different each time.
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Enable the cache (set to 0 to always ask the model)
+ANSWER_CACHE_ENABLED = os.getenv("ZOYA_ANSWER_CACHE", "1") == "1"
+
+# Maximum cached answers kept, least recently used are evicted first
+ANSWER_CACHE_SIZE = int(os.getenv("ZOYA_ANSWER_CACHE_SIZE", "1024"))
+
+# Seconds a cached answer stays valid
+ANSWER_CACHE_TTL = float(os.getenv("ZOYA_ANSWER_CACHE_TTL", "3600"))
+
+# Minimum trigram similarity for a near-duplicate match (set to 1 for exact matches only)
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ZOYA_ANSWER_CACHE_SIMILARITY", "0.85"))
+
+# Recent user turns included in the context hash, so a question asked mid-topic
+# is not answered from another conversation (0 keys on the query and language only)
+ANSWER_CACHE_CONTEXT_TURNS = int(os.getenv("ZOYA_ANSWER_CACHE_CONTEXT_TURNS", "1"))
+
+# Words that make a question depend on what was said before
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "this", "those", "these", "he", "she", "him", "her", "his", "hers",
+    "they", "them", "their", "there", "more", "else", "again", "also", "another",
+    "previous", "above", "earlier", "same", "why", "continue", "elaborate", "explain"
+}
+FOLLOW_UP_PREFIXES = ("and ", "but ", "so ", "what about", "how about", "tell me more", "what else")
+
+
+def normalize_query(query):
+    """Lowercase a query and strip punctuation and extra whitespace"""
+    words = re.sub(r"[^\w\s]", " ", query.lower()).split()
+    return " ".join(words)
+
+
+def trigrams(text):
+    """Return the set of character trigrams of a normalized string"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_follow_up(normalized):
+    """Return True if a normalized query refers back to earlier turns"""
+    if normalized.startswith(FOLLOW_UP_PREFIXES):
+        return True
+    return any(word in FOLLOW_UP_WORDS for word in normalized.split())
+
+
+class _Entry:
+    __slots__ = ("reply", "expires_at", "grams", "bucket")
+
+    def __init__(self, reply, expires_at, grams, bucket):
+        self.reply = reply
+        self.expires_at = expires_at
+        self.grams = grams
+        self.bucket = bucket
+
+
+class AnswerCache:
+    """LRU answer cache with TTLs and near-duplicate lookup"""
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL,
+                 similarity=ANSWER_CACHE_SIMILARITY, context_turns=ANSWER_CACHE_CONTEXT_TURNS,
+                 enabled=ANSWER_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.context_turns = context_turns
+        self.enabled = enabled
+        self.entries = OrderedDict()
+        # (language, context hash) -> trigram -> keys containing it
+        self.index = {}
+        self.lock = threading.Lock()
+
+    def make_key(self, query, language, memory):
+        """
+        Build the cache key for a query, before it is added to memory
+
+        Args:
+            query (str): User's query
+            language (str): Language code for the response
+            memory (list): Conversation memory the query will be asked in
+
+        Returns:
+            tuple: (normalized query, language, context hash), or None if the
+                query should bypass the cache
+        """
+        if not self.enabled:
+            return None
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        has_history = any(msg["role"] != "system" for msg in memory)
+        if has_history and is_follow_up(normalized):
+            metrics.inc("zoya_cache_bypass_total", cache="answer")
+            return None
+
+        context = ""
+        if self.context_turns:
+            user_turns = [msg["content"] for msg in memory if msg["role"] == "user"]
+            context = "\n".join(user_turns[-self.context_turns:])
+        context_hash = hashlib.sha1(context.encode("utf-8")).hexdigest()[:16]
+        return normalized, language, context_hash
+
+    def get(self, key):
+        """
+        Return a cached reply for a key, trying near-duplicates if no exact match
+
+        Args:
+            key (tuple): Key from make_key, or None
+
+        Returns:
+            str: The cached reply, or None
+        """
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            match = "exact"
+            if entry is None and self.similarity < 1:
+                key, entry = self._find_similar(key)
+                match = "similar"
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                metrics.inc("zoya_cache_misses_total", cache="answer")
+                return None
+            self.entries.move_to_end(key)
+        metrics.inc("zoya_cache_hits_total", cache="answer", match=match)
+        return entry.reply
+
+    def put(self, key, reply):
+        """Cache a reply under a key from make_key"""
+        if key is None or not reply:
+            return
+        grams = trigrams(key[0])
+        bucket = key[1:]
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = _Entry(reply, time.monotonic() + self.ttl, grams, bucket)
+            postings = self.index.setdefault(bucket, {})
+            for gram in grams:
+                postings.setdefault(gram, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self.lock:
+            self.entries.clear()
+            self.index.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _find_similar(self, key):
+        """Return the most similar cached (key, entry) above the threshold"""
+        postings = self.index.get(key[1:])
+        if not postings:
+            return None, None
+        grams = trigrams(key[0])
+
+        # Any entry with Jaccard similarity >= t shares at least ceil(t * |grams|)
+        # trigrams with the query, so it must contain one of the rarest
+        # |grams| - ceil(t * |grams|) + 1 of them. Probing only those keeps the
+        # candidate set small even when many cached questions look alike.
+        probe = len(grams) - math.ceil(self.similarity * len(grams)) + 1
+        candidates = set()
+        for gram in sorted(grams, key=lambda g: len(postings.get(g, ())))[:probe]:
+            candidates.update(postings.get(gram, ()))
+
+        best_key, best_score = None, self.similarity
+        for candidate in candidates:
+            other = self.entries[candidate].grams
+            common = len(grams & other)
+            score = common / (len(grams) + len(other) - common)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        if best_key is None:
+            return None, None
+        return best_key, self.entries[best_key]
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        postings = self.index.get(entry.bucket, {})
+        for gram in entry.grams:
+            keys = postings.get(gram)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del postings[gram]
+        if not postings:
+            # One bucket per language and context: drop it with its last entry
+            self.index.pop(entry.bucket, None)
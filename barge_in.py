@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Barge-in for Zoya AI Assistant's voice mode
+
+Voice mode keeps one microphone open for the whole conversation. While Zoya
+speaks, a small energy-based voice activity detector watches the input
+stream. Once the user has spoken for SPEECH_MS, speech output is stopped and
+recording simply continues: the user's phrase, including a short pre-roll
+from before it was detected, goes straight to recognition. There is no need
+to wait for the reply to end, or to repeat the question after it.
+
+Barge-in is off unless ZOYA_BARGE_IN=1, because without echo cancellation
+the microphone also hears Zoya's own voice from the loudspeakers. When it is
+on, the first ECHO_CALIBRATION_MS after each reply becomes audible are taken
+as the echo level
+and speech has to be well above both that and the room noise. A captured
+phrase that turns out to be the reply itself is dropped. Headsets work best.
+
+Recordings of the microphone side of a turn can be checked offline:
+    python barge_in.py interrupt.wav --playback-seconds 6
+    python barge_in.py fixtures/*.wav --playback reply.wav --save-dir captured --json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import warnings
+import wave
+from array import array
+from collections import deque
+
+import metrics
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:
+    # Removed from the standard library in Python 3.13
+    audioop = None
+
+# Listen for the user while Zoya speaks (off by default: loudspeaker echo can trigger it)
+BARGE_IN_ENABLED = os.getenv("ZOYA_BARGE_IN", "0") == "1"
+
+# How many times the calibrated ambient energy counts as speech during playback
+BARGE_IN_RATIO = float(os.getenv("ZOYA_BARGE_IN_RATIO", "3.0"))
+
+# Milliseconds after playback starts that are measured as the echo of Zoya's voice
+ECHO_CALIBRATION_MS = float(os.getenv("ZOYA_BARGE_IN_ECHO_MS", "300"))
+
+# How many times the measured echo energy counts as speech
+ECHO_RATIO = float(os.getenv("ZOYA_BARGE_IN_ECHO_RATIO", "1.5"))
+
+# Share of a captured phrase's words found in the reply that marks it as echo
+ECHO_WORD_SHARE = 0.8
+
+# Lowest energy ever taken for speech, for very quiet rooms
+MIN_SPEECH_ENERGY = float(os.getenv("ZOYA_BARGE_IN_MIN_ENERGY", "300"))
+
+# Milliseconds of speech before playback is stopped; shorter reacts faster but trips on coughs
+SPEECH_MS = float(os.getenv("ZOYA_BARGE_IN_SPEECH_MS", "300"))
+
+# Pauses between syllables shorter than this still count as one stretch of speech
+MAX_GAP_MS = 150
+
+# Audio kept from before speech was detected, so the first syllable is not lost
+PREROLL_MS = float(os.getenv("ZOYA_BARGE_IN_PREROLL_MS", "400"))
+
+# Silence that ends the captured phrase, and the longest phrase captured
+END_SILENCE_MS = float(os.getenv("ZOYA_BARGE_IN_END_SILENCE_MS", "800"))
+PHRASE_SECONDS = 10
+
+# Seconds of ambient noise measured when the microphone is opened
+CALIBRATION_SECONDS = 1.0
+
+# Dead time of the old listen cycle: the pause after speaking plus per-turn calibration
+LEGACY_DEAD_SECONDS = 0.5 + CALIBRATION_SECONDS
+
+# Longest wait for speech output to notice a stop (its playback loops poll every 0.1 s)
+STOP_POLL_SECONDS = 0.1
+
+# speech_recognition sets energy_threshold to ambient energy times this ratio
+SR_DYNAMIC_ENERGY_RATIO = 1.5
+
+
+def rms(fragment, sample_width):
+    """Return the root-mean-square energy of little-endian signed PCM audio"""
+    if audioop is not None:
+        return audioop.rms(fragment, sample_width)
+    fragment = fragment[:len(fragment) - len(fragment) % sample_width]
+    if not fragment:
+        return 0
+    if sample_width == 3:
+        samples = [int.from_bytes(fragment[i:i + 3], "little", signed=True)
+                   for i in range(0, len(fragment), 3)]
+    else:
+        samples = array({1: "b", 2: "h", 4: "i"}[sample_width], fragment)
+        if sys.byteorder == "big":
+            samples.byteswap()
+    return int((sum(s * s for s in samples) / len(samples)) ** 0.5)
+
+
+def speech_threshold(energy_threshold):
+    """
+    Energy that counts as the user speaking over Zoya
+
+    Args:
+        energy_threshold (float): The recognizer's calibrated speech threshold
+
+    Returns:
+        float: Threshold for barge-in
+    """
+    return max(MIN_SPEECH_ENERGY, energy_threshold * BARGE_IN_RATIO)
+
+
+def _words(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def is_echo(heard, reply):
+    """
+    Whether a phrase captured during a reply is only the reply itself
+
+    Args:
+        heard (str): Transcript of the captured phrase
+        reply (str): Text Zoya was speaking
+
+    Returns:
+        bool: True if nearly every word heard is in the reply
+    """
+    heard_words = _words(heard)
+    if not heard_words or not reply:
+        return False
+    reply_words = set(_words(reply))
+    found = sum(1 for word in heard_words if word in reply_words)
+    return found >= ECHO_WORD_SHARE * len(heard_words)
+
+
+class BargeInDetector:
+    """Finds sustained speech in a stream of audio frames and captures the phrase"""
+
+    def __init__(self, threshold, sample_rate, sample_width, speech_ms=SPEECH_MS,
+                 preroll_ms=PREROLL_MS, end_silence_ms=END_SILENCE_MS, phrase_seconds=PHRASE_SECONDS,
+                 echo_ms=ECHO_CALIBRATION_MS, playback_started=True):
+        """
+        Args:
+            threshold (float): RMS energy that counts as speech
+            sample_rate (int): Samples per second
+            sample_width (int): Bytes per sample
+            speech_ms (float): Speech needed before barging in
+            preroll_ms (float): Audio kept from before the speech started
+            end_silence_ms (float): Silence that ends the phrase
+            phrase_seconds (float): Longest phrase captured
+            echo_ms (float): Audio measured as echo once playback starts,
+                during which nobody is taken to be speaking
+            playback_started (bool): Whether the reply is audible from the first
+                frame; otherwise echo is measured from start_playback()
+        """
+        self.threshold = threshold
+        self.echo_ms = echo_ms
+        self.echo = bytearray()
+        self.echo_from_ms = 0.0 if playback_started else None
+        self.sample_width = sample_width
+        self.bytes_per_ms = sample_rate * sample_width / 1000.0
+        self.speech_ms = speech_ms
+        self.preroll_bytes = int(preroll_ms * self.bytes_per_ms)
+        self.end_silence_ms = end_silence_ms
+        self.max_bytes = int(phrase_seconds * 1000 * self.bytes_per_ms)
+
+        self.elapsed_ms = 0.0
+        self.preroll = deque()
+        self.preroll_size = 0
+        self.pending = []
+        self.voiced_ms = 0.0
+        self.gap_ms = 0.0
+        self.onset_ms = None
+        self.triggered_ms = None
+        self.captured = bytearray()
+        self.silence_ms = 0.0
+        self.ended = False
+
+    @property
+    def triggered(self):
+        return self.triggered_ms is not None
+
+    @property
+    def hearing_speech(self):
+        """Whether speech has started but is not yet long enough to barge in"""
+        return self.voiced_ms > 0 and not self.triggered
+
+    def start_playback(self):
+        """Mark the reply as audible from the next frame, starting echo calibration"""
+        if self.echo_from_ms is not None or self.triggered:
+            return
+        self.echo_from_ms = self.elapsed_ms
+        # Speech still building up would now be mixed with the echo: start over
+        for pending in self.pending:
+            self._keep_preroll(pending)
+        self.pending, self.voiced_ms, self.gap_ms, self.onset_ms = [], 0.0, 0.0, None
+
+    def _keep_preroll(self, frame):
+        self.preroll.append(frame)
+        self.preroll_size += len(frame)
+        while self.preroll and self.preroll_size - len(self.preroll[0]) >= self.preroll_bytes:
+            self.preroll_size -= len(self.preroll.popleft())
+
+    def feed(self, frame):
+        """
+        Process the next frame of audio
+
+        Returns:
+            str: "speech" when sustained speech is first detected, "end" when
+                the captured phrase is complete, otherwise None
+        """
+        ms = len(frame) / self.bytes_per_ms
+        self.elapsed_ms += ms
+        if self.echo_from_ms is not None and self.elapsed_ms - self.echo_from_ms <= self.echo_ms \
+                and not self.triggered:
+            self.echo += frame
+            self._keep_preroll(frame)
+            return None
+        if self.echo:
+            # Playback has started: speech must also be well above Zoya's own voice
+            self.threshold = max(self.threshold, rms(bytes(self.echo), self.sample_width) * ECHO_RATIO)
+            self.echo = bytearray()
+        voiced = rms(frame, self.sample_width) > self.threshold
+
+        if self.triggered:
+            if self.ended:
+                return None
+            self.captured += frame
+            self.silence_ms = 0.0 if voiced else self.silence_ms + ms
+            if self.silence_ms >= self.end_silence_ms or len(self.captured) >= self.max_bytes:
+                self.ended = True
+                return "end"
+            return None
+
+        if voiced:
+            if not self.voiced_ms:
+                self.onset_ms = self.elapsed_ms - ms
+            self.voiced_ms += ms
+            self.gap_ms = 0.0
+            self.pending.append(frame)
+        elif self.voiced_ms:
+            self.gap_ms += ms
+            self.pending.append(frame)
+            if self.gap_ms > MAX_GAP_MS:
+                # Only a blip: its frames become pre-roll for the next try
+                for pending in self.pending:
+                    self._keep_preroll(pending)
+                self.pending, self.voiced_ms, self.gap_ms, self.onset_ms = [], 0.0, 0.0, None
+        else:
+            self._keep_preroll(frame)
+
+        if self.voiced_ms >= self.speech_ms:
+            self.triggered_ms = self.elapsed_ms
+            self.captured = bytearray(b"".join(self.preroll) + b"".join(self.pending))
+            self.preroll.clear()
+            self.pending = []
+            return "speech"
+        return None
+
+
+class BargeInListener:
+    """Watches an open microphone on a background thread while Zoya speaks"""
+
+    def __init__(self, source, threshold, on_speech, audible=None):
+        """
+        Args:
+            source (Microphone): Open speech_recognition microphone
+            threshold (float): RMS energy that counts as speech
+            on_speech (callable): Called once, on the listener thread, to stop speech output
+            audible (Event): Set by speech output once the reply can be heard;
+                without it the reply is taken to be audible at once
+        """
+        self.source = source
+        self.on_speech = on_speech
+        self.audible = audible
+        self.detector = BargeInDetector(threshold, source.SAMPLE_RATE, source.SAMPLE_WIDTH,
+                                        playback_started=audible is None)
+        self.playing = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        self.playing.set()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="zoya-barge-in")
+        self.thread.start()
+        return self
+
+    def _keep_reading(self):
+        detector = self.detector
+        if detector.triggered:
+            return not detector.ended
+        # After playback, only finish a phrase that was already starting
+        return self.playing.is_set() or detector.hearing_speech
+
+    def _run(self):
+        try:
+            while self._keep_reading():
+                if self.audible is not None and self.audible.is_set():
+                    # Synthesis is over: measure the echo from here, not from before the audio
+                    self.detector.start_playback()
+                frame = self.source.stream.read(self.source.CHUNK)
+                if self.detector.feed(frame) == "speech":
+                    metrics.observe("zoya_barge_in_detect_seconds",
+                                    (self.detector.triggered_ms - self.detector.onset_ms) / 1000)
+                    self.on_speech()
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        """
+        Stop watching once speech output has ended
+
+        Returns:
+            AudioData: The phrase the user barged in with, or None
+        """
+        self.playing.clear()
+        self.thread.join()
+        if self.error is not None:
+            print(f"⚠️ Barge-in listener failed: {self.error}")
+        if not self.detector.triggered:
+            return None
+        import speech_recognition as sr
+        return sr.AudioData(bytes(self.detector.captured), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+
+
+class VoiceChannel:
+    """
+    One open, calibrated microphone for a whole voice-mode conversation
+
+    Usage:
+        with VoiceChannel(speak_text, stop_speaking) as voice:
+            query = voice.listen("en")
+            voice.speak(reply, "en")
+    """
+
+    def __init__(self, speak, stop, barge_in=BARGE_IN_ENABLED, audible=None):
+        """
+        Args:
+            speak (callable): speak_text(text, language)
+            stop (callable): Stops speech output from another thread
+            barge_in (bool): Listen for the user while speaking
+            audible (Event): Set by speech output while a reply can be heard,
+                e.g. speech_output.audible
+        """
+        self.speak_text = speak
+        self.stop_speaking = stop
+        self.barge_in = barge_in
+        self.audible = audible
+        self.recognizer = None
+        self.microphone = None
+        self.source = None
+        self.pending = None
+        self.reply = None
+
+    def open(self):
+        """Open the microphone and calibrate for ambient noise, once"""
+        import speech_recognition as sr
+        self.recognizer = sr.Recognizer()
+        self.microphone = sr.Microphone()
+        self.source = self.microphone.__enter__()
+        # The recognizer keeps adapting while it listens, so later turns skip calibration
+        print("Adjusting for ambient noise...")
+        self.recognizer.adjust_for_ambient_noise(self.source, duration=CALIBRATION_SECONDS)
+        return self
+
+    def close(self):
+        if self.source is not None:
+            self.microphone.__exit__(None, None, None)
+            self.source = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def listen(self, language="en"):
+        """
+        Return the user's next phrase as text
+
+        A phrase captured by barge-in during the last reply is used first,
+        unless it was only the reply heard through the loudspeakers.
+        """
+        from speech_input import get_voice_input
+        audio, self.pending = self.pending, None
+        if audio is not None:
+            text = get_voice_input(language, source=self.source, recognizer=self.recognizer, audio=audio)
+            if not is_echo(text, self.reply):
+                return text
+            metrics.inc("zoya_barge_in_echoes_total")
+            print("🔇 That was my own voice, listening again...")
+        return get_voice_input(language, source=self.source, recognizer=self.recognizer)
+
+    def speak(self, text, language="en"):
+        """
+        Speak text, stopping as soon as the user talks over it
+
+        Returns:
+            bool: True if the user barged in
+        """
+        self.reply = text
+        if not self.barge_in:
+            self.speak_text(text, language)
+            return False
+
+        listener = BargeInListener(self.source, speech_threshold(self.recognizer.energy_threshold),
+                                   self.stop_speaking, self.audible).start()
+        try:
+            self.speak_text(text, language)
+        finally:
+            self.pending = listener.finish()
+        if self.pending is None:
+            return False
+        metrics.inc("zoya_barge_ins_total")
+        print("🗣️ Heard you, listening...")
+        return True
+
+
+def read_wav(path):
+    """
+    Read a PCM WAV file, mixing it down to mono
+
+    Returns:
+        tuple: (frames as bytes, sample rate, sample width)
+    """
+    with wave.open(path, "rb") as wav:
+        rate, width, channels = wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+        data = wav.readframes(wav.getnframes())
+    if channels > 1:
+        if channels > 2 or audioop is None:
+            raise ValueError(f"{path}: convert to mono first")
+        data = audioop.tomono(data, width, 0.5, 0.5)
+    if width == 1:
+        # 8-bit WAV is unsigned
+        data = bytes((b - 128) & 0xFF for b in data)
+    return data, rate, width
+
+
+def wav_seconds(path):
+    """Return the duration of a WAV file in seconds"""
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def simulate(path, playback_seconds, calibrate_ms=CALIBRATION_SECONDS * 1000, chunk=1024, save_to=None):
+    """
+    Replay a microphone recording through the barge-in detector
+
+    The recording starts when Zoya starts speaking; its first calibrate_ms
+    must be room noise, which stands in for the calibration at startup.
+
+    Args:
+        path (str): Mono or stereo PCM WAV recorded at the microphone
+        playback_seconds (float): How long Zoya's reply would play
+        calibrate_ms (float): Leading milliseconds used as ambient noise
+        chunk (int): Samples per read, as from the microphone
+        save_to (str): Write the captured phrase to this WAV file
+
+    Returns:
+        dict: When speech started, was detected and stopped playback, and the
+            dead time of the old and new listen cycles
+    """
+    data, rate, width = read_wav(path)
+    calibration = data[:int(calibrate_ms * rate / 1000) * width]
+    energy_threshold = rms(calibration, width) * SR_DYNAMIC_ENERGY_RATIO
+    detector = BargeInDetector(speech_threshold(energy_threshold), rate, width)
+
+    step = chunk * width
+    for start in range(0, len(data), step):
+        if not detector.triggered and detector.elapsed_ms >= playback_seconds * 1000 \
+                and not detector.hearing_speech:
+            break
+        if detector.feed(data[start:start + step]) == "end":
+            break
+
+    result = {
+        "file": path,
+        "playback_seconds": playback_seconds,
+        "threshold": round(detector.threshold, 1),
+        "barged_in": detector.triggered,
+        # Old cycle: pause, recalibrate, then listen; speech during the reply is lost
+        "legacy_dead_seconds": LEGACY_DEAD_SECONDS
+    }
+    if not detector.triggered:
+        result["dead_seconds"] = 0.0
+        result["saved_seconds"] = LEGACY_DEAD_SECONDS
+        return result
+
+    onset = detector.onset_ms / 1000
+    detected = detector.triggered_ms / 1000
+    stopped = min(detected + STOP_POLL_SECONDS, playback_seconds)
+    if onset < playback_seconds:
+        result["legacy_dead_seconds"] = round(playback_seconds - onset + LEGACY_DEAD_SECONDS, 3)
+    result.update({
+        "speech_at": round(onset, 3),
+        "detected_at": round(detected, 3),
+        "detect_ms": round((detected - onset) * 1000, 1),
+        "playback_stopped_at": round(stopped, 3),
+        # Time Zoya keeps talking over the user; nothing they say is lost
+        "dead_seconds": round(max(0.0, stopped - onset), 3),
+        "captured_seconds": round(len(detector.captured) / (rate * width), 3)
+    })
+    result["saved_seconds"] = round(result["legacy_dead_seconds"] - result["dead_seconds"], 3)
+
+    if save_to:
+        with wave.open(save_to, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(width)
+            wav.setframerate(rate)
+            wav.writeframes(bytes(detector.captured) if width != 1
+                            else bytes((b + 128) & 0xFF for b in detector.captured))
+        result["saved_to"] = save_to
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure voice-mode barge-in on microphone WAV recordings.")
+    parser.add_argument("fixtures", nargs="+", help="PCM WAV files recorded at the microphone while Zoya speaks")
+    playback = parser.add_mutually_exclusive_group(required=True)
+    playback.add_argument("--playback", help="WAV file of Zoya's reply, for its length")
+    playback.add_argument("--playback-seconds", type=float, help="Length of Zoya's reply in seconds")
+    parser.add_argument("--calibrate-ms", type=float, default=CALIBRATION_SECONDS * 1000,
+                        help="Leading room noise in each recording used for calibration (default: 1000)")
+    parser.add_argument("--save-dir", help="Write each captured phrase to this directory")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    playback_seconds = wav_seconds(args.playback) if args.playback else args.playback_seconds
+    if args.save_dir:
+        os.makedirs(args.save_dir, exist_ok=True)
+
+    results = []
+    for path in args.fixtures:
+        save_to = None
+        if args.save_dir:
+            save_to = os.path.join(args.save_dir, os.path.splitext(os.path.basename(path))[0] + "-captured.wav")
+        results.append(simulate(path, playback_seconds, args.calibrate_ms, save_to=save_to))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    for r in results:
+        if r["barged_in"]:
+            print(f"🗣️ {r['file']}: speech at {r['speech_at']}s, detected in {r['detect_ms']} ms, "
+                  f"playback stopped by {r['playback_stopped_at']}s, captured {r['captured_seconds']}s")
+        else:
+            print(f"🔇 {r['file']}: no barge-in (threshold {r['threshold']})")
+        print(f"   dead time {r['legacy_dead_seconds']}s -> {r['dead_seconds']}s (saved {r['saved_seconds']}s)")
+    saved = sum(r["saved_seconds"] for r in results) / len(results)
+    print(f"⏱️ Average dead time saved per turn: {saved:.2f}s over {len(results)} recordings")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Headless batch query mode for Zoya AI Assistant
+
+Reads queries as JSON Lines from a file or stdin, runs them through the same
+routing, search, AI and translation stack as the interactive modes, and
+streams the results out as JSON Lines with per-stage timings.
+
+Each input line is either a JSON string or an object such as:
+    {"id": "faq-1", "query": "What is the capital of France?", "language": "fr"}
+
+Lines sharing a "session" value run in order against one conversation memory;
+every other line gets a fresh memory so concurrent answers stay independent.
+
+Usage:
+    python batch.py faq.jsonl -o answers.jsonl --concurrency 8 --rate ai=2 --rate translate=5
+    cat faq.jsonl | python batch.py - --language hi
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import outbound
+import telemetry
+
+
+def parse_rates(values):
+    """
+    Parse --rate arguments of the form backend=requests_per_second[:burst]
+
+    Args:
+        values (list): Raw argument strings
+
+    Returns:
+        list: (backend, rate, burst) tuples for outbound.configure
+    """
+    rates = []
+    for value in values or []:
+        try:
+            rates.append(outbound.parse_rate(value))
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+    return rates
+
+
+def read_records(stream, default_language):
+    """
+    Read query records from a JSON Lines stream
+
+    Args:
+        stream: Text stream to read from
+        default_language (str): Language code for records that do not set one
+
+    Returns:
+        list: Normalized records with index, id, query, language and session
+    """
+    records = []
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Skipping line {line_no}: invalid JSON ({e})", file=sys.stderr)
+            continue
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict) or not str(item.get("query", "")).strip():
+            print(f"Skipping line {line_no}: no query", file=sys.stderr)
+            continue
+        records.append({
+            "index": len(records),
+            "id": item.get("id", line_no),
+            "query": str(item["query"]).strip(),
+            "language": item.get("language", default_language),
+            "session": item.get("session")
+        })
+    return records
+
+
+def group_records(records):
+    """Group records into units of work: one per session, one per sessionless record"""
+    groups = []
+    sessions = {}
+    for record in records:
+        session = record["session"]
+        if session is None:
+            groups.append([record])
+        elif session in sessions:
+            sessions[session].append(record)
+        else:
+            sessions[session] = [record]
+            groups.append(sessions[session])
+    return groups
+
+
+def run_group(group, log, emit):
+    """Run a group of records in order against one conversation memory, behind interactive traffic"""
+    from pipeline import process_query
+    from ai_engine import new_memory
+
+    memory = new_memory()
+    for record in group:
+        output = {
+            "index": record["index"],
+            "id": record["id"],
+            "query": record["query"],
+            "language": record["language"]
+        }
+        try:
+            with outbound.priority(outbound.PRIORITY_BATCH), telemetry.session(record["session"]):
+                result = process_query(record["query"], record["language"], mode="batch",
+                                       memory=memory, log=log)
+            output["route"] = result["route"]
+            output["ok"] = result["ok"]
+            output["response"] = result["response"]
+            output["timings_ms"] = {stage: round(seconds * 1000, 2) for stage, seconds in result["timings"].items()}
+        except Exception as e:
+            output["error"] = str(e)
+        emit(output)
+
+
+def run_batch(records, output, concurrency=4, log=True):
+    """
+    Run query records concurrently and stream results as JSON Lines
+
+    Args:
+        records (list): Records from read_records
+        output: Text stream to write results to, in completion order
+        concurrency (int): Number of queries in flight at once
+        log (bool): Whether to log each interaction
+
+    Returns:
+        dict: Summary with counts and wall-clock duration
+    """
+    write_lock = threading.Lock()
+    stats = {"queries": 0, "errors": 0}
+
+    def emit(result):
+        line = json.dumps(result, ensure_ascii=False)
+        with write_lock:
+            stats["queries"] += 1
+            if "error" in result:
+                stats["errors"] += 1
+            output.write(line + "\n")
+            output.flush()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_group, group, log, emit) for group in group_records(records)]
+        for future in as_completed(futures):
+            future.result()
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["qps"] = round(stats["queries"] / stats["seconds"], 2) if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Zoya queries from a JSON Lines file without the interactive menus.")
+    parser.add_argument("input", help="JSON Lines file with queries, or '-' for stdin")
+    parser.add_argument("-o", "--output", help="Write results to this file instead of stdout")
+    parser.add_argument("-l", "--language", default="en", help="Default response language code (default: en)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Queries in flight at once (default: 4)")
+    parser.add_argument("--rate", action="append", metavar="BACKEND=RPS[:BURST]",
+                        help="Limit calls per second to a backend (openrouter/ai, mymemory/translate, "
+                             "ddgs/search), 0 for no limit; repeatable")
+    parser.add_argument("--no-log", action="store_true", help="Do not write interactions to the log file")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    try:
+        rates = parse_rates(args.rate)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    for backend, rate, burst in rates:
+        outbound.configure(backend, rate, burst)
+
+    # Module status and progress messages go to stderr so stdout stays valid JSON Lines
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    sys.stdout = sys.stderr
+
+    try:
+        if args.input == "-":
+            records = read_records(sys.stdin, args.language)
+        else:
+            with open(args.input, "r", encoding="utf-8") as f:
+                records = read_records(f, args.language)
+
+        stats = run_batch(records, output, args.concurrency, log=not args.no_log)
+    finally:
+        sys.stdout = sys.__stdout__
+        if output is not sys.__stdout__:
+            output.close()
+
+    print(f"✅ Batch complete: {stats['queries']} queries, {stats['errors']} errors, "
+          f"{stats['seconds']}s ({stats['qps']} queries/s)", file=sys.stderr)
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
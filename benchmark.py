@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for Zoya AI Assistant
+
+Runs text-mode turns end-to-end through pipeline.process_query against the
+local stand-ins in fake_services.py, then reports p50/p95/p99 latency per
+stage and overall throughput. Results are saved as JSON under
+bench_results/ so regressions can be compared between commits.
+
+Usage:
+    python benchmark.py --turns 200 --concurrency 8
+    python benchmark.py --openrouter latency_ms=800,error_rate=0.05 --stream
+    python benchmark.py --compare bench_results/<earlier run>.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from metrics import percentile
+
+RESULTS_DIR = "bench_results"
+
+# Query mix: (query, language) pairs covering the AI, search and translation paths
+DEFAULT_WORKLOAD = [
+    ("Tell me about Python", "en"),
+    ("Give me a quick health tip", "en"),
+    ("How do I learn faster", "en"),
+    ("What is the capital of France", "en"),
+    ("Where is the Eiffel Tower", "en"),
+    ("Tell me about Python", "hi"),
+    ("Give me a quick health tip", "fr"),
+    ("What is the capital of France", "es"),
+    ("What is your name", "en")
+]
+
+
+def summarize(samples):
+    """Summarize per-stage latency samples in milliseconds"""
+    summary = {}
+    for stage, values in sorted(samples.items()):
+        summary[stage] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(max(values), 3)
+        }
+    return summary
+
+
+def git_revision():
+    """Return the short hash of the current commit, or 'unknown'"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(turns=100, concurrency=4, stream=False, workload=None):
+    """
+    Run turns through the pipeline and collect per-stage latencies
+
+    The fakes must already be installed so no real service is contacted.
+
+    Args:
+        turns (int): Number of turns to run
+        concurrency (int): Turns in flight at once
+        stream (bool): Stream AI replies and record time to first token
+        workload (list): (query, language) pairs cycled through
+
+    Returns:
+        dict: Per-stage summaries, throughput and failure counts
+    """
+    from pipeline import process_query
+    from ai_engine import new_memory
+
+    workload = workload or DEFAULT_WORKLOAD
+    samples = {}
+    routes = {}
+    stats = {"failed": 0}
+    lock = threading.Lock()
+
+    def run_turn(i):
+        query, language = workload[i % len(workload)]
+        first_token = {}
+        start = time.perf_counter()
+
+        def on_delta(text):
+            first_token.setdefault("at", time.perf_counter())
+
+        result = process_query(query, language, mode="bench", memory=new_memory(),
+                               on_delta=on_delta if stream else None)
+        with lock:
+            for stage, seconds in result["timings"].items():
+                samples.setdefault(stage, []).append(seconds * 1000)
+            if "at" in first_token:
+                samples.setdefault("ai_first_token", []).append((first_token["at"] - start) * 1000)
+            routes[result["route"]] = routes.get(result["route"], 0) + 1
+            if not result["ok"]:
+                stats["failed"] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_turn, range(turns)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "turns": turns,
+        "concurrency": concurrency,
+        "stream": stream,
+        "seconds": round(elapsed, 3),
+        "throughput_tps": round(turns / elapsed, 3) if elapsed else 0.0,
+        "failed_turns": stats["failed"],
+        "routes": routes,
+        "stages": summarize(samples)
+    }
+
+
+def reported_counters():
+    """Return cache, token, coalescing and rate limiter counters recorded in metrics"""
+    import metrics
+    snapshot = metrics.snapshot()
+    counters = {series: value for series, value in sorted(snapshot["counters"].items())
+                if series.startswith(("zoya_cache_", "zoya_llm_", "zoya_coalesced_", "zoya_limiter_"))}
+    for series, hist in sorted(snapshot["histograms"].items()):
+        if series.startswith("zoya_limiter_wait_seconds") and hist["count"]:
+            counters[series.replace("_seconds", "_ms_mean", 1)] = round(hist["sum"] / hist["count"] * 1000, 2)
+    return counters
+
+
+def print_report(report, baseline=None):
+    """Print a stage table, with deltas against a baseline report if given"""
+    print(f"\n📊 {report['turns']} turns, concurrency {report['concurrency']}, "
+          f"{report['throughput_tps']} turns/s, {report['failed_turns']} failed")
+    header = f"{'stage':<16}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}"
+    if baseline:
+        header += f"{'Δp95':>10}"
+    print(header)
+    for stage, s in report["stages"].items():
+        line = f"{stage:<16}{s['count']:>7}{s['p50_ms']:>11.2f}{s['p95_ms']:>11.2f}{s['p99_ms']:>11.2f}"
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base and base["p95_ms"]:
+            line += f"{(s['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100:>+9.1f}%"
+        print(line)
+    for series, value in report.get("counters", {}).items():
+        print(f"{series} {value}")
+    if baseline:
+        print(f"Throughput: {baseline['throughput_tps']} → {report['throughput_tps']} turns/s "
+              f"(baseline {baseline.get('revision', '?')})")
+
+
+def save_report(report, directory=RESULTS_DIR):
+    """Save a report as JSON and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{report['timestamp'].replace(':', '')}-{report['revision']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    return path
+
+
+def main(argv=None):
+    from fake_services import FakeServices, FakeProfile
+
+    parser = argparse.ArgumentParser(description="Benchmark Zoya end-to-end against local fake services.")
+    parser.add_argument("--turns", type=int, default=100, help="Turns to run (default: 100)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Turns in flight at once (default: 4)")
+    parser.add_argument("--stream", action="store_true", help="Stream AI replies and measure time to first token")
+    parser.add_argument("--openrouter", default="latency_ms=400,jitter_ms=100", help="Fake OpenRouter profile")
+    parser.add_argument("--mymemory", default="latency_ms=80,jitter_ms=20", help="Fake MyMemory profile")
+    parser.add_argument("--ddgs", default="latency_ms=250,jitter_ms=60", help="Fake DDGS profile")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the fake latency distributions")
+    parser.add_argument("--rate", action="append", default=[], metavar="BACKEND=RPS[:BURST]",
+                        help="Rate limit a backend as in batch mode; without it the fakes are unlimited")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Always ask the model, even for repeated questions")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--no-save", action="store_true", help=f"Do not save results under {RESULTS_DIR}/")
+    args = parser.parse_args(argv)
+
+    # The fakes have no quotas, so only the limits asked for are applied
+    import outbound
+    for backend in outbound.BACKENDS:
+        outbound.configure(backend, 0)
+    try:
+        for value in args.rate:
+            outbound.configure(*outbound.parse_rate(value))
+    except ValueError as e:
+        parser.error(str(e))
+
+    profiles = {}
+    for offset, name in enumerate(("openrouter", "mymemory", "ddgs")):
+        profile = FakeProfile.parse(getattr(args, name))
+        profile.random.seed(args.seed + offset)
+        profiles[name] = profile
+
+    # Keep benchmark interactions out of the real log
+    import logger
+    import telemetry
+    scratch = tempfile.mkdtemp(prefix="zoya-bench-")
+    logger.LOG_DIR = os.path.join(scratch, "zoya_logs")
+    telemetry.TELEMETRY_DB = os.path.join(scratch, "zoya_telemetry.db")
+
+    if args.no_answer_cache:
+        import ai_engine
+        ai_engine.answer_cache.enabled = False
+
+    with FakeServices(**profiles) as fakes:
+        fakes.install()
+        report = run_benchmark(args.turns, args.concurrency, args.stream)
+        report["service_calls"] = dict(sorted(fakes.counts.items()))
+        report["counters"] = reported_counters()
+
+    report["revision"] = git_revision()
+    report["timestamp"] = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    report["profiles"] = {name: profile.to_dict() for name, profile in profiles.items()}
+    report["rates"] = args.rate
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if not args.no_save:
+        print(f"💾 Saved results to {save_report(report)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
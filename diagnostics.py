@@ -0,0 +1,345 @@
+"""
+Long-session memory diagnostics for Zoya AI Assistant
+
+For assistants that run for days. After every turn, diagnostics records the
+process RSS, thread count and open file handles. Every few minutes a
+background thread takes a tracemalloc snapshot and compares it with one
+taken after the first turn, so allocation sites that keep growing stand out
+before the OOM killer finds them, without slowing the turn that was sampled. Ceilings on RSS, threads and open files raise an alert, and can also
+trim caches and conversation history through registered trimmers.
+
+Usage:
+    python main.py --diagnostics            # or ZOYA_DIAGNOSTICS=1
+    ZOYA_DIAG_MAX_RSS_MB=800 ZOYA_DIAG_ACTION=trim python server.py
+
+    diagnostics.add_trimmer("answer_cache", answer_cache.clear)
+"""
+
+import atexit
+import gc
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import tracemalloc
+
+import metrics
+
+# Optional: psutil gives RSS and handle counts on systems without /proc
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Start diagnostics with the assistant (main.py --diagnostics does the same)
+DIAGNOSTICS_ENABLED = os.getenv("ZOYA_DIAGNOSTICS", "0") == "1"
+
+# Seconds between tracemalloc snapshots compared against the first one
+SNAPSHOT_INTERVAL = float(os.getenv("ZOYA_DIAG_SNAPSHOT_SECONDS", "300"))
+
+# Stack frames recorded per allocation; more frames cost more memory
+TRACE_FRAMES = int(os.getenv("ZOYA_DIAG_FRAMES", "1"))
+
+# Growing allocation sites listed in each report
+TOP_SITES = int(os.getenv("ZOYA_DIAG_TOP", "10"))
+
+# Ceilings checked after every turn (0 = no ceiling)
+MAX_RSS_MB = float(os.getenv("ZOYA_DIAG_MAX_RSS_MB", "0"))
+MAX_THREADS = int(os.getenv("ZOYA_DIAG_MAX_THREADS", "0"))
+MAX_OPEN_FILES = int(os.getenv("ZOYA_DIAG_MAX_OPEN_FILES", "0"))
+
+# At a ceiling: "alert" only warns, "trim" also runs the registered trimmers
+CEILING_ACTION = os.getenv("ZOYA_DIAG_ACTION", "trim")
+
+# JSON Lines file that receives every sample and report (empty to disable)
+DIAG_FILE = os.getenv("ZOYA_DIAG_FILE", "zoya_diagnostics.jsonl")
+
+_trimmers = {}
+_instance = None
+_lock = threading.Lock()
+
+
+def add_trimmer(name, func):
+    """
+    Register a function that frees memory when a ceiling is reached
+
+    Args:
+        name (str): Name shown in reports
+        func (callable): Called with no arguments
+    """
+    _trimmers[name] = func
+
+
+def rss_bytes():
+    """Return the resident memory of this process in bytes, or None if unknown"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+def open_files():
+    """Return the number of open file descriptors or handles, or None if unknown"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        pass
+    if PSUTIL_AVAILABLE:
+        process = psutil.Process()
+        return process.num_handles() if sys.platform == "win32" else process.num_fds()
+    return None
+
+
+def _malloc_trim():
+    """Ask glibc to hand freed heap memory back to the OS, where available"""
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class Diagnostics:
+    """Per-turn resource samples, periodic tracemalloc comparisons and ceilings"""
+
+    CEILINGS = (("rss_mb", "MAX_RSS_MB"), ("threads", "MAX_THREADS"), ("open_files", "MAX_OPEN_FILES"))
+
+    def __init__(self, path=DIAG_FILE):
+        self.path = path
+        self.started = time.time()
+        self.turns = 0
+        self.baseline = None
+        self.baseline_sample = None
+        self.last_snapshot = 0.0
+        self.peak = {}
+        self.breached = set()
+        self.last_report = None
+        self.lock = threading.Lock()
+        # Snapshots, comparisons and trims run here, off the threads serving turns
+        self.jobs = queue.Queue()
+        self.worker = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        self.worker = threading.Thread(target=self._work, daemon=True, name="zoya-diagnostics")
+        self.worker.start()
+        metrics.on_turn(self.on_turn)
+        print(f"🩺 Diagnostics on: snapshots every {SNAPSHOT_INTERVAL:.0f}s"
+              + (f", samples in {self.path}" if self.path else ""))
+
+    def stop(self):
+        metrics.remove_turn_hook(self.on_turn)
+        if self.worker is not None:
+            self.jobs.put(None)
+            self.worker.join()
+            self.worker = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def sample(self):
+        """Return the current resource usage"""
+        rss = rss_bytes()
+        traced, _ = tracemalloc.get_traced_memory()
+        return {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "turn": self.turns,
+            "rss_mb": round(rss / 1048576, 1) if rss is not None else None,
+            "traced_mb": round(traced / 1048576, 1),
+            "threads": threading.active_count(),
+            "open_files": open_files()
+        }
+
+    def _write(self, kind, record):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(dict(record, kind=kind), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write diagnostics: {e}")
+            self.path = None
+
+    def on_turn(self, stages):
+        """Sample after a turn and check the ceilings; snapshots and trims are queued"""
+        with self.lock:
+            self.turns += 1
+            current = self.sample()
+            for key, value in current.items():
+                if isinstance(value, (int, float)) and key != "turn":
+                    self.peak[key] = max(self.peak.get(key, value), value)
+            self._write("sample", dict(current, turn_ms=round(stages.get("total", 0.0) * 1000, 1)))
+            exceeded = self._check_ceilings(current)
+
+            now = time.monotonic()
+            if self.turns == 1:
+                # The first turn has loaded modules and warmed caches, so growth is measured from here
+                self.last_snapshot = now
+                self.jobs.put(("baseline", current))
+            elif now - self.last_snapshot >= SNAPSHOT_INTERVAL:
+                self.last_snapshot = now
+                self.jobs.put(("report", current))
+        if exceeded and CEILING_ACTION == "trim":
+            self.jobs.put(("trim", exceeded))
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            kind, detail = job
+            try:
+                if kind == "baseline":
+                    snapshot = self._snapshot()
+                    with self.lock:
+                        self.baseline, self.baseline_sample = snapshot, detail
+                elif kind == "report":
+                    report = self._report(detail, self.top_growth())
+                    with self.lock:
+                        self.last_report = report
+                        self._write("report", report)
+                    print(format_report(report))
+                else:
+                    self._trim(detail)
+            except Exception as e:
+                print(f"⚠️ Diagnostics {kind} failed: {e}")
+
+    def _check_ceilings(self, current):
+        """Warn about ceilings newly exceeded and return them"""
+        exceeded = []
+        for key, setting in self.CEILINGS:
+            limit = globals()[setting]
+            value = current.get(key)
+            if limit and value is not None and value > limit:
+                if key not in self.breached:
+                    self.breached.add(key)
+                    exceeded.append(key)
+                    metrics.inc("zoya_diag_ceiling_breaches_total", resource=key)
+                    print(f"⚠️ {key} is {value}, above the ceiling of {limit}")
+            else:
+                # Warn again only after dropping back below the ceiling
+                self.breached.discard(key)
+        return exceeded
+
+    def _trim(self, exceeded):
+        trimmed = trim()
+        after = self.sample()
+        with self.lock:
+            self._write("trim", {"exceeded": exceeded, "trimmed": trimmed, "after": after})
+            for key in exceeded:
+                limit = globals()[dict(self.CEILINGS)[key]]
+                if after.get(key) is not None and after[key] <= limit:
+                    self.breached.discard(key)
+        print(f"✂️ Trimmed {', '.join(trimmed) or 'nothing'}: RSS now {after['rss_mb']} MB")
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ))
+
+    def top_growth(self, limit=TOP_SITES):
+        """Return the allocation sites that grew most since the first turn"""
+        baseline = self.baseline
+        if baseline is None:
+            return []
+        sites = []
+        for stat in self._snapshot().compare_to(baseline, "lineno"):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            sites.append({
+                "site": f"{frame.filename}:{frame.lineno}",
+                "growth_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "blocks": stat.count_diff
+            })
+            if len(sites) >= limit:
+                break
+        return sites
+
+    def _report(self, current, sites):
+        hours = (time.time() - self.started) / 3600
+        base = self.baseline_sample or current
+        with self.lock:
+            peak = dict(self.peak)
+        growth = None
+        if current["rss_mb"] is not None and base["rss_mb"] is not None and hours > 0:
+            growth = round((current["rss_mb"] - base["rss_mb"]) / hours, 1)
+        return {
+            "uptime_hours": round(hours, 2),
+            "turns": self.turns,
+            "current": current,
+            "peak": peak,
+            "rss_growth_mb_per_hour": growth,
+            "growing_sites": sites
+        }
+
+    def report(self):
+        """Take a fresh snapshot and return a full report"""
+        return self._report(self.sample(), self.top_growth())
+
+
+def trim():
+    """
+    Free memory: run every registered trimmer, collect garbage and release the heap
+
+    Returns:
+        list: Names of the trimmers that ran
+    """
+    trimmed = []
+    for name, func in list(_trimmers.items()):
+        try:
+            func()
+            trimmed.append(name)
+        except Exception as e:
+            print(f"⚠️ Trimmer {name} failed: {e}")
+    gc.collect()
+    _malloc_trim()
+    metrics.inc("zoya_diag_trims_total")
+    return trimmed
+
+
+def format_report(report):
+    """Render a report as a few readable lines"""
+    current = report["current"]
+    lines = [
+        f"🩺 {report['turns']} turns in {report['uptime_hours']}h | RSS {current['rss_mb']} MB "
+        f"(peak {report['peak'].get('rss_mb')}, {report['rss_growth_mb_per_hour']} MB/h) | "
+        f"traced {current['traced_mb']} MB | {current['threads']} threads | {current['open_files']} open files"
+    ]
+    for site in report["growing_sites"]:
+        lines.append(f"   +{site['growth_kb']:>9.1f} KB  {site['blocks']:>+7} blocks  {site['site']}")
+    return "\n".join(lines)
+
+
+def start(path=DIAG_FILE):
+    """Start diagnostics for this process, once"""
+    global _instance
+    with _lock:
+        if _instance is None:
+            _instance = Diagnostics(path)
+            _instance.start()
+            atexit.register(_final_report)
+    return _instance
+
+
+def running():
+    """Return the running Diagnostics, or None"""
+    return _instance
+
+
+def _final_report():
+    if _instance is not None and _instance.turns:
+        report = _instance.report()
+        _instance._write("report", report)
+        print(format_report(report))
@@ -1,7 +1,21 @@
 """
 Handles web search functionality using DuckDuckGo for Zoya AI Assistant
+
+Several DDGS sources (instant answers, web text and news) are queried in
+parallel under one deadline. Near-duplicate snippets are dropped by comparing
+word shingles, and the rest are ranked by how much of the query they cover,
+so a reply never waits on the slowest source.
 """
 
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+import outbound
+from http_client import current_handle
 from utils import clean_text
 
 # Try to import DDGS from ddgs
@@ -12,47 +26,182 @@ except ImportError:
     print("Warning: ddgs not available. Web search will be disabled.")
     DDGS_AVAILABLE = False
 
+# DDGS sources queried for every search, best first when scores tie
+SEARCH_SOURCES = [s.strip() for s in os.getenv("ZOYA_SEARCH_SOURCES", "answers,text,news").split(",") if s.strip()]
+
+# Results fetched from each source before dedupe and ranking
+SEARCH_RESULTS_PER_SOURCE = int(os.getenv("ZOYA_SEARCH_RESULTS_PER_SOURCE", "5"))
+
+# Seconds the whole search may take
+SEARCH_DEADLINE = float(os.getenv("ZOYA_SEARCH_DEADLINE", "3"))
+
+# Seconds to keep waiting for slower sources once one has returned results
+SEARCH_STRAGGLER_WAIT = float(os.getenv("ZOYA_SEARCH_STRAGGLER_WAIT", "0.3"))
+
+# Threads fetching search sources; separate from the I/O pool that the fetches themselves use
+SEARCH_WORKERS = int(os.getenv("ZOYA_SEARCH_WORKERS", "32"))
+
+# Shingle similarity above which two snippets count as the same
+DUPLICATE_SIMILARITY = 0.6
+
+# Ranking bonus per source, so an instant answer wins a close call
+SOURCE_WEIGHTS = {"answers": 0.2, "text": 0.1, "news": 0.0}
+
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="zoya-search")
+
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "of", "in", "on", "at", "to", "for", "and", "or",
+    "what", "who", "when", "where", "which", "how", "why", "do", "does", "did", "me", "tell", "about"
+}
+
+
+def _fetch(source, query, max_results):
+    """Query one DDGS source and return its results as snippet dicts"""
+    handle = current_handle()
+    if handle is not None and handle.aborted:
+        return []
+    # DDGS has its own HTTP client, which cannot be aborted mid-request, so its
+    # sockets are held no longer than the search may take
+    with DDGS(timeout=max(1, math.ceil(SEARCH_DEADLINE))) as ddgs:
+        method = getattr(ddgs, source, None)
+        if method is None:
+            # Older and newer ddgs releases do not all offer every source
+            return []
+        if source == "answers":
+            # Instant answers take no result count
+            results = list(method(query) or [])
+        else:
+            results = list(method(query, max_results=max_results) or [])
+    snippets = []
+    for position, r in enumerate(results):
+        body = r.get("body") or r.get("text") or ""
+        if body.strip():
+            snippets.append({"source": source, "position": position, "title": r.get("title", ""), "body": body})
+    return snippets
+
+
+def _search_source(source, query, max_results, cancel):
+    """Fetch one source through the outbound layer, counting the outcome"""
+    try:
+        snippets = outbound.call("ddgs", (source, query, max_results), _fetch, source, query, max_results,
+                                 cancel=cancel)
+    except Exception:
+        metrics.inc("zoya_requests_total", backend="ddgs", status="error")
+        raise
+    metrics.inc("zoya_requests_total", backend="ddgs", status="ok")
+    return snippets
+
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def shingles(text, size=3):
+    """Return the set of word shingles of a text"""
+    words = _words(text)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
 
-def search_web(query, max_results=2):
+def rank_snippets(query, snippets):
+    """
+    Drop near-duplicate snippets and order the rest by relevance to the query
+
+    Args:
+        query (str): Search query
+        snippets (list): Snippet dicts with source, position, title and body
+
+    Returns:
+        list: The distinct snippets, most relevant first, each with the
+            fraction of query terms it covers
+    """
+    terms = {word for word in _words(query) if word not in STOP_WORDS} or set(_words(query))
+
+    scored = []
+    for snippet in snippets:
+        words = set(_words(snippet["title"] + " " + snippet["body"]))
+        coverage = len(terms & words) / len(terms) if terms else 0.0
+        score = coverage + SOURCE_WEIGHTS.get(snippet["source"], 0.0) - 0.01 * snippet["position"]
+        scored.append((score, dict(snippet, coverage=coverage)))
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    kept = []
+    for _, snippet in scored:
+        grams = shingles(snippet["body"])
+        duplicate = False
+        for other in kept:
+            union = len(grams | other["shingles"])
+            if union and len(grams & other["shingles"]) / union >= DUPLICATE_SIMILARITY:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(dict(snippet, shingles=grams))
+    return kept
+
+
+@metrics.timed("search")
+def search_web(query, max_results=2, cancel=None):
     """
     Search DuckDuckGo and return short, readable summaries.
-    
+
     Args:
         query (str): Search query
-        max_results (int): Maximum number of results to return
-        
+        max_results (int): Maximum number of snippets to return
+        cancel (CancelToken): Abandons the search when set
+
     Returns:
         str: Summarized search results or None if failed
+
+    Raises:
+        Cancelled: If cancel was set before the search finished
     """
     if not DDGS_AVAILABLE:
         return None
-        
-    try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
-            
-            if not results:
-                return "I couldn't find anything for that."
-
-            # Extract short snippets
-            clean_results = []
-            for r in results:
-                snippet = r.get("body", "")
-                if len(snippet.split()) > 30:  # shorten long snippets
-                    snippet = " ".join(snippet.split()[:30]) + "..."
-                clean_results.append(snippet)
-
-            # Combine top results
-            combined_result = " ".join(clean_results)
-            
-        if not combined_result:
-            return None
-            
-        # Clean the result text
-        cleaned_result = clean_text(combined_result)
-        
-        return cleaned_result.strip()
-        
-    except Exception as e:
-        print(f"Web search error: {e}")
-        return "Something went wrong during live search."
\ No newline at end of file
+
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    deadline = time.monotonic() + SEARCH_DEADLINE
+    pending = {_search_pool.submit(_search_source, source, query, SEARCH_RESULTS_PER_SOURCE, cancel)
+               for source in SEARCH_SOURCES}
+    snippets = []
+    failures = 0
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                snippets.extend(future.result())
+            elif cancel is not None and cancel.is_set():
+                cancel.raise_if_cancelled()
+            else:
+                failures += 1
+                print(f"Web search error: {error}")
+        if snippets:
+            # Something to say already, so give stragglers only a short grace period
+            deadline = min(deadline, time.monotonic() + SEARCH_STRAGGLER_WAIT)
+    if pending:
+        metrics.inc("zoya_search_late_sources_total", len(pending))
+
+    if not snippets:
+        if failures and not pending:
+            return "Something went wrong during live search."
+        return "I couldn't find anything for that."
+
+    # Extract short snippets from the best distinct results, skipping
+    # ones that share no words with the query when better ones exist
+    ranked = rank_snippets(query, snippets)
+    ranked = [s for s in ranked if s["coverage"] > 0] or ranked
+    clean_results = []
+    for snippet in ranked[:max_results]:
+        body = snippet["body"]
+        if len(body.split()) > 30:  # shorten long snippets
+            body = " ".join(body.split()[:30]) + "..."
+        clean_results.append(body)
+
+    # Combine top results and clean the text
+    cleaned_result = clean_text(" ".join(clean_results))
+    return cleaned_result.strip() or None
@@ -0,0 +1,365 @@
+"""
+Local stand-ins for the external services used by Zoya AI Assistant
+
+Reproduces the OpenRouter chat-completions API (including streaming), the
+MyMemory /get endpoint and DDGS text results with configurable latency and
+error distributions, so benchmarks and load tests run without network access.
+
+Usage:
+    with FakeServices(openrouter=FakeProfile(latency_ms=400, error_rate=0.02)) as fakes:
+        fakes.install()
+        ... run queries through pipeline.process_query ...
+    # leaving the block uninstalls the fakes and stops the server
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Canned replies and search snippets the fakes draw from
+FAKE_REPLIES = [
+    "Sure! Python is a popular programming language known for its readable syntax. "
+    "It is used for web development, data science, automation and much more.",
+    "Here's a quick tip: drink water regularly and take short breaks while working. "
+    "Small habits like these make a big difference over a long day.",
+    "The best way to learn something new is to practice a little every day. "
+    "Start small, stay consistent, and celebrate your progress along the way!"
+]
+
+FAKE_SNIPPETS = [
+    "Paris is the capital and most populous city of France, with an estimated population of over two million residents.",
+    "The Eiffel Tower is a wrought-iron lattice tower on the Champ de Mars in Paris, France, completed in 1889.",
+    "France is a country located primarily in Western Europe, known for its art, cuisine and history.",
+    "Python is a high-level, general-purpose programming language whose design emphasizes code readability."
+]
+
+# Marks module attributes that did not exist before install()
+_MISSING = object()
+
+
+class FakeProfile:
+    """Latency and error distribution for one fake service"""
+
+    def __init__(self, latency_ms=50.0, jitter_ms=10.0, tail_rate=0.0, tail_ms=0.0,
+                 error_rate=0.0, error_statuses=(429, 500, 503), seed=None):
+        """
+        Args:
+            latency_ms (float): Mean response latency in milliseconds
+            jitter_ms (float): Standard deviation of the latency
+            tail_rate (float): Fraction of responses that get an extra tail delay
+            tail_ms (float): Extra delay added to tail responses
+            error_rate (float): Fraction of responses that fail
+            error_statuses (tuple): HTTP statuses to pick from for failures
+            seed (int): Seed for reproducible distributions
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        """
+        Draw one response outcome
+
+        Returns:
+            tuple: (delay in seconds, HTTP status code)
+        """
+        with self.lock:
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms))
+            if self.random.random() < self.tail_rate:
+                delay += self.tail_ms
+            status = 200
+            if self.random.random() < self.error_rate:
+                status = self.random.choice(self.error_statuses)
+        return delay / 1000.0, status
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Build a profile from a compact "key=value,..." string
+
+        Example: "latency_ms=300,jitter_ms=80,error_rate=0.05"
+        """
+        kwargs = {}
+        for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+            key, _, value = item.partition("=")
+            if key == "error_statuses":
+                kwargs[key] = tuple(int(code) for code in value.split("/"))
+            elif key == "seed":
+                kwargs[key] = int(value)
+            else:
+                kwargs[key] = float(value)
+        return cls(**kwargs)
+
+    def to_dict(self):
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "tail_rate": self.tail_rate,
+            "tail_ms": self.tail_ms,
+            "error_rate": self.error_rate,
+            "error_statuses": list(self.error_statuses)
+        }
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    """Serves fake OpenRouter and MyMemory responses"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        fakes = self.server.fakes
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        delay, status = fakes.openrouter.sample()
+        fakes.count("openrouter", status)
+        if status != 200:
+            time.sleep(delay)
+            self._send_json(status, {"error": {"code": status, "message": "Simulated upstream error"}})
+            return
+
+        reply = fakes.reply_for(request)
+        words = reply.split(" ")
+        max_tokens = request.get("max_tokens")
+        if max_tokens:
+            words = words[:int(max_tokens / fakes.tokens_per_word)]
+        finish_reason = "length" if max_tokens and len(words) < len(reply.split(" ")) else "stop"
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        completion_tokens = math.ceil(len(words) * fakes.tokens_per_word)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        model = request.get("model", "fake/model")
+
+        if not request.get("stream"):
+            time.sleep(delay)
+            self._send_json(200, {
+                "id": "gen-fake",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": finish_reason}],
+                "usage": usage
+            })
+            return
+
+        # Stream one word per chunk, spreading the latency across the reply
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        per_word = delay / (len(words) + 1)
+        try:
+            time.sleep(per_word)
+            for i, word in enumerate(words):
+                time.sleep(per_word)
+                chunk = {"id": "gen-fake", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            final = {"id": "gen-fake", "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        fakes = self.server.fakes
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/get":
+            self._send_json(404, {"responseStatus": 404, "responseDetails": "Not found"})
+            return
+        params = parse_qs(url.query)
+        text = params.get("q", [""])[0]
+        langpair = params.get("langpair", ["en|en"])[0]
+
+        delay, status = fakes.mymemory.sample()
+        fakes.count("mymemory", status)
+        time.sleep(delay)
+        if status != 200:
+            self._send_json(status, {"responseStatus": status, "responseDetails": "Simulated upstream error"})
+            return
+        if len(text) > 500:
+            translated = "QUERY LENGTH LIMIT EXCEEDED. MAX ALLOWED QUERY : 500 CHARS"
+        else:
+            translated = f"[{langpair.split('|')[-1]}] {text}"
+        self._send_json(200, {"responseData": {"translatedText": translated, "match": 1}, "responseStatus": 200})
+
+
+class FakeDDGS:
+    """Drop-in stand-in for ddgs.DDGS that returns canned text, news and instant answer results"""
+
+    fakes = None
+
+    def __init__(self, **kwargs):
+        self.options = kwargs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _results(self, source, query, max_results):
+        delay, status = self.fakes.ddgs.sample()
+        self.fakes.count("ddgs", status)
+        time.sleep(delay)
+        if status != 200:
+            raise RuntimeError(f"Simulated DDGS error {status}")
+        rng = random.Random(f"{source}:{query}")
+        return rng, rng.sample(FAKE_SNIPPETS, min(max_results, len(FAKE_SNIPPETS)))
+
+    def text(self, query, max_results=5, **kwargs):
+        _, snippets = self._results("text", query, max_results)
+        return [{"title": " ".join(body.split()[:4]), "href": f"https://example.com/{i}", "body": body}
+                for i, body in enumerate(snippets)]
+
+    def news(self, query, max_results=5, **kwargs):
+        # News often repeats what the web results say, which exercises dedupe
+        _, snippets = self._results("news", query, max_results)
+        return [{"title": " ".join(body.split()[:4]), "url": f"https://example.com/news/{i}",
+                 "body": f"{body} Reported today.", "source": "Fake News", "date": "2025-01-01"}
+                for i, body in enumerate(snippets)]
+
+    def answers(self, query, **kwargs):
+        rng, snippets = self._results("answers", query, 1)
+        if rng.random() < 0.5:
+            return []
+        return [{"text": snippets[0], "topic": None, "url": "https://example.com/answer"}]
+
+
+class FakeServices:
+    """Runs the fake OpenRouter and MyMemory servers and a fake DDGS client"""
+
+    def __init__(self, openrouter=None, mymemory=None, ddgs=None, host="127.0.0.1", port=0, tokens_per_word=1.0):
+        """
+        Args:
+            openrouter (FakeProfile): Latency and errors for chat completions
+            mymemory (FakeProfile): Latency and errors for translations
+            ddgs (FakeProfile): Latency and errors for web search
+            host (str): Address to bind the HTTP server to
+            port (int): Port to bind, 0 picks a free port
+            tokens_per_word (float): Tokens each reply word costs; above 1 the
+                fake runs out of max_tokens before the word budget, as Hindi,
+                Telugu or Tamil replies do
+        """
+        self.tokens_per_word = tokens_per_word
+        self.openrouter = openrouter or FakeProfile(latency_ms=400, jitter_ms=100)
+        self.mymemory = mymemory or FakeProfile(latency_ms=80, jitter_ms=20)
+        self.ddgs = ddgs or FakeProfile(latency_ms=250, jitter_ms=60)
+        self.counts = {}
+        self._count_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _FakeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fakes = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openrouter_url(self):
+        return f"{self.base_url}/api/v1/chat/completions"
+
+    @property
+    def mymemory_url(self):
+        return f"{self.base_url}/get"
+
+    def count(self, service, status):
+        """Record one request to a fake service"""
+        with self._count_lock:
+            key = f"{service}_{status}"
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def reply_for(self, request):
+        """Pick a deterministic canned reply for a chat-completions request"""
+        messages = request.get("messages", [])
+        last = messages[-1]["content"] if messages else ""
+        return FAKE_REPLIES[sum(map(ord, last)) % len(FAKE_REPLIES)]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="fake-services")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def install(self):
+        """Point the Zoya modules at the fakes until uninstall()"""
+        import ai_engine
+        import translator
+        import duckduckgo_handler
+        import pipeline
+
+        self.originals = []
+
+        def patch(target, name, value):
+            self.originals.append((target, name, getattr(target, name, _MISSING)))
+            setattr(target, name, value)
+
+        # Every configured AI backend answers from the fake OpenRouter
+        for backend in ai_engine.router.backends:
+            patch(backend, "url", self.openrouter_url)
+            patch(backend, "api_key", backend.api_key or "fake-key")
+        patch(ai_engine, "OPENAI_AVAILABLE", True)
+        patch(translator, "MYMEMORY_URL", self.mymemory_url)
+
+        FakeDDGS.fakes = self
+        patch(duckduckgo_handler, "DDGS", FakeDDGS)
+        patch(duckduckgo_handler, "DDGS_AVAILABLE", True)
+
+        patch(pipeline, "OPENAI_AVAILABLE", True)
+        patch(pipeline, "DDGS_AVAILABLE", True)
+        return self
+
+    def uninstall(self):
+        """Put back everything install() changed"""
+        for target, name, value in reversed(getattr(self, "originals", [])):
+            if value is _MISSING:
+                # e.g. DDGS, when the ddgs package is not installed
+                delattr(target, name)
+            else:
+                setattr(target, name, value)
+        self.originals = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+        self.stop()
+        return False
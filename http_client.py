@@ -0,0 +1,172 @@
+"""
+Shared HTTP connection pool for Zoya AI Assistant
+
+All outbound calls to OpenRouter and MyMemory go through one requests.Session
+so keep-alive connections are reused across turns, threads and sessions.
+Requests made under a RequestHandle can be aborted from another thread,
+so a cancelled turn gives its connection back at once instead of waiting
+for the reply or the read timeout.
+"""
+
+import os
+import socket
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Maximum pooled connections kept open per host
+POOL_SIZE = int(os.getenv("ZOYA_HTTP_POOL_SIZE", "32"))
+
+_local = threading.local()
+
+
+class RequestHandle:
+    """
+    Lets another thread abort the HTTP requests made under this handle
+
+    Usage:
+        handle = RequestHandle()
+        cancel.on_cancel(handle.abort)
+        with handle:
+            response = session.post(...)    # raises ConnectionError once aborted
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = []
+        self.closers = []
+        self.aborted = False
+        self.done = False
+
+    def __enter__(self):
+        self.previous = getattr(_local, "handle", None)
+        _local.handle = self
+        return self
+
+    def __exit__(self, *exc):
+        _local.handle = self.previous
+        with self.lock:
+            # The connections go back to the pool now, for other requests to use
+            self.done = True
+            self.connections = []
+            self.closers = []
+        return False
+
+    def run(self, func, *args, **kwargs):
+        """Call func with this handle active, e.g. on a worker thread"""
+        with self:
+            return func(*args, **kwargs)
+
+    def attach(self, connection):
+        with self.lock:
+            if self.aborted:
+                raise ConnectionAbortedError("Request aborted")
+            if not self.done:
+                self.connections.append(connection)
+
+    def on_abort(self, closer):
+        """Also call closer on abort, for clients that do not use the shared session"""
+        with self.lock:
+            if not self.done:
+                self.closers.append(closer)
+
+    def abort(self):
+        with self.lock:
+            if self.done or self.aborted:
+                return
+            self.aborted = True
+            connections, closers = list(self.connections), list(self.closers)
+        for connection in connections:
+            _shutdown(getattr(connection, "sock", None))
+        for closer in closers:
+            try:
+                closer()
+            except Exception:
+                pass
+
+
+def current_handle():
+    """Return the RequestHandle active on this thread, or None"""
+    return getattr(_local, "handle", None)
+
+
+def bind(func):
+    """Wrap func to run under the calling thread's RequestHandle, wherever it is called"""
+    handle = current_handle()
+    if handle is None:
+        return func
+    return lambda *args, **kwargs: handle.run(func, *args, **kwargs)
+
+
+def _shutdown(sock):
+    """Shut a socket down, waking any thread blocked reading it"""
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _TrackedMixin:
+    """Registers each request with the thread's RequestHandle"""
+
+    def request(self, *args, **kwargs):
+        handle = current_handle()
+        if handle is not None:
+            handle.attach(self)
+        result = super().request(*args, **kwargs)
+        if handle is not None and handle.aborted:
+            # Aborted while connecting, before there was a socket to shut down
+            _shutdown(self.sock)
+        return result
+
+
+class _TrackedHTTPConnection(_TrackedMixin, HTTPConnection):
+    pass
+
+
+class _TrackedHTTPSConnection(_TrackedMixin, HTTPSConnection):
+    pass
+
+
+class _TrackedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TrackedHTTPConnection
+
+
+class _TrackedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TrackedHTTPSConnection
+
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE)
+_adapter.poolmanager.pool_classes_by_scheme = {"http": _TrackedHTTPConnectionPool,
+                                               "https": _TrackedHTTPSConnectionPool}
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+
+def abort_response(response):
+    """
+    Close a streaming response immediately, even while another thread reads it
+
+    Closing alone does not wake a thread blocked in recv(), so the socket is
+    shut down first. The socket hangs off the pooled connection, or only off the
+    response once the server said "Connection: close". This reaches into
+    urllib3 internals and falls back to a plain close if they change.
+    """
+    raw = response.raw
+    for find_socket in (lambda: raw._connection.sock, lambda: raw._fp.fp.raw._sock):
+        try:
+            sock = find_socket()
+        except Exception:
+            continue
+        if sock is not None:
+            _shutdown(sock)
+            break
+    try:
+        response.close()
+    except Exception:
+        pass
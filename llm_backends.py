@@ -0,0 +1,203 @@
+"""
+OpenAI-compatible LLM backends for Zoya AI Assistant
+
+A backend is any chat-completions endpoint that speaks the OpenAI protocol:
+OpenRouter, or a local llama.cpp, vLLM or Ollama server. The router keeps a
+moving average of each backend's response latency and error rate and offers
+the backends fastest-healthy first, so when the external API is slow or
+unreachable requests move to a local server that still answers quickly.
+
+A backend left unused drifts back toward the average score of the others, so
+a backend that was slow for a while is tried again once the others are no
+better than average, without spending a real request on it every minute.
+
+Backends are listed in ZOYA_LLM_BACKENDS, in order of preference until their
+latencies are known. "openrouter" uses the OPENROUTER_* settings and "local"
+the ZOYA_LOCAL_LLM_* ones; any other name reads ZOYA_LLM_<NAME>_URL,
+ZOYA_LLM_<NAME>_MODEL and ZOYA_LLM_<NAME>_API_KEY.
+"""
+
+import os
+import threading
+import time
+
+# Backends to use, in order of preference before their latencies are known
+LLM_BACKENDS = [b.strip() for b in os.getenv("ZOYA_LLM_BACKENDS", "openrouter").split(",") if b.strip()]
+
+# Local OpenAI-compatible server (llama.cpp, vLLM, Ollama, ...)
+LOCAL_LLM_URL = os.getenv("ZOYA_LOCAL_LLM_URL", "http://127.0.0.1:8080/v1/chat/completions")
+LOCAL_LLM_MODEL = os.getenv("ZOYA_LOCAL_LLM_MODEL", "local")
+LOCAL_LLM_API_KEY = os.getenv("ZOYA_LOCAL_LLM_API_KEY")
+
+# Weight of the newest sample in each backend's moving latency and error rate
+SCORE_ALPHA = float(os.getenv("ZOYA_LLM_SCORE_ALPHA", "0.3"))
+
+# Seconds added to a backend's score at a 100% error rate
+ERROR_PENALTY = float(os.getenv("ZOYA_LLM_ERROR_PENALTY", "10"))
+
+# Seconds an unused backend keeps its score; after that it halves its distance
+# to the average every RESCORE_AFTER seconds
+RESCORE_AFTER = float(os.getenv("ZOYA_LLM_RESCORE_AFTER", "60"))
+
+
+class Backend:
+    """One OpenAI-compatible chat-completions endpoint and its moving health score"""
+
+    def __init__(self, name, url, models, api_key=None, headers=None, body=None, requires_key=False):
+        """
+        Args:
+            name (str): Backend name, used for rate limits and metrics
+            url (str): Chat-completions URL
+            models (list): Models to try on this backend, best first
+            api_key (str): Bearer token, if the endpoint needs one
+            headers (dict): Extra request headers
+            body (dict): Extra request body fields only this backend understands
+            requires_key (bool): Whether the backend is unusable without an API key
+        """
+        self.name = name
+        self.url = url
+        self.models = models
+        self.api_key = api_key
+        self.extra_headers = headers or {}
+        self.extra_body = body or {}
+        self.requires_key = requires_key
+        self.latency = None
+        self.error_rate = 0.0
+        self.updated = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def available(self):
+        return bool(self.url and self.models) and (self.api_key or not self.requires_key)
+
+    def headers(self):
+        """Return the request headers for this backend"""
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        headers.update(self.extra_headers)
+        return headers
+
+    def observe(self, seconds=None, ok=True):
+        """
+        Fold one request outcome into the moving scores
+
+        Args:
+            seconds (float): Time until the response arrived, for successes
+            ok (bool): False for network errors, timeouts and retryable statuses
+        """
+        with self.lock:
+            stale = time.monotonic() - self.updated > RESCORE_AFTER
+            self.error_rate = (0.0 if stale else self.error_rate * (1 - SCORE_ALPHA)) + (0.0 if ok else SCORE_ALPHA)
+            if seconds is not None:
+                if self.latency is None or stale:
+                    self.latency = seconds
+                else:
+                    self.latency += SCORE_ALPHA * (seconds - self.latency)
+            self.updated = time.monotonic()
+
+    def measured(self):
+        """Return the measured cost of a request in seconds, or None if never measured"""
+        with self.lock:
+            if self.latency is None and not self.error_rate:
+                return None
+            return (self.latency or 0.0) + ERROR_PENALTY * self.error_rate
+
+    def score(self, now=None, prior=None):
+        """
+        Return the expected cost of a request in seconds, lower is better
+
+        Args:
+            now (float): time.monotonic() to score at
+            prior (float): Score assumed without fresh measurements, usually the
+                average of all backends. A backend never measured scores this;
+                one unused for RESCORE_AFTER seconds decays toward it.
+        """
+        now = time.monotonic() if now is None else now
+        measured = self.measured()
+        if measured is None:
+            return prior if prior is not None else 0.0
+        idle = now - self.updated - RESCORE_AFTER
+        if prior is None or idle <= 0:
+            return measured
+        return prior + (measured - prior) * 0.5 ** (idle / RESCORE_AFTER)
+
+    def stats(self, prior=None):
+        """Return the backend's scores for health reports"""
+        with self.lock:
+            latency = round(self.latency * 1000, 1) if self.latency is not None else None
+            error_rate = round(self.error_rate, 3)
+        return {"url": self.url, "models": self.models, "available": self.available,
+                "latency_ms": latency, "error_rate": error_rate, "score": round(self.score(prior=prior), 3)}
+
+
+class BackendRouter:
+    """Orders the configured backends by their latency and error scores"""
+
+    def __init__(self, backends=()):
+        self.backends = list(backends)
+
+    def get(self, name):
+        """Return the backend with this name, or None"""
+        for backend in self.backends:
+            if backend.name == name:
+                return backend
+        return None
+
+    def available(self):
+        """Return True if any backend can take requests"""
+        return any(backend.available for backend in self.backends)
+
+    def prior(self):
+        """Return the average measured score of the usable backends, or None if none is measured"""
+        scores = [backend.measured() for backend in self.backends if backend.available]
+        scores = [score for score in scores if score is not None]
+        return sum(scores) / len(scores) if scores else None
+
+    def order(self):
+        """Return the usable backends, best score first; ties keep the configured order"""
+        now = time.monotonic()
+        prior = self.prior()
+        usable = [backend for backend in self.backends if backend.available]
+        return sorted(usable, key=lambda backend: backend.score(now, prior))
+
+    def stats(self):
+        """Return every backend's scores, keyed by name"""
+        prior = self.prior()
+        return {backend.name: backend.stats(prior) for backend in self.backends}
+
+
+def load_backend(name):
+    """
+    Build a backend from its ZOYA_LLM_<NAME>_* environment variables
+
+    Returns:
+        Backend: The backend, or None if it has no URL configured
+    """
+    if name == "local":
+        return Backend("local", LOCAL_LLM_URL, [LOCAL_LLM_MODEL], LOCAL_LLM_API_KEY)
+    prefix = "ZOYA_LLM_" + name.upper().replace("-", "_")
+    url = os.getenv(prefix + "_URL")
+    if not url:
+        print(f"⚠️ LLM backend '{name}' has no {prefix}_URL and will not be used")
+        return None
+    models = [m.strip() for m in os.getenv(prefix + "_MODEL", "default").split(",") if m.strip()]
+    return Backend(name, url, models, os.getenv(prefix + "_API_KEY"))
+
+
+def build_router(openrouter):
+    """
+    Build the router for the backends named in LLM_BACKENDS
+
+    Args:
+        openrouter (Backend): The OpenRouter backend, configured by the AI engine
+
+    Returns:
+        BackendRouter: Router over the configured backends
+    """
+    backends = []
+    for name in LLM_BACKENDS:
+        backend = openrouter if name == "openrouter" else load_backend(name)
+        if backend is not None and backend not in backends:
+            backends.append(backend)
+    return BackendRouter(backends or [openrouter])
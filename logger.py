@@ -1,68 +1,431 @@
 """
-Handles logging of Zoya AI Assistant interactions to JSON file
+Handles logging of Zoya AI Assistant interactions
+
+Interactions are appended as JSON Lines to an active segment under LOG_DIR.
+When the segment grows past LOG_SEGMENT_BYTES or spans more than
+LOG_SEGMENT_SECONDS it is sealed into a gzip-compressed file, and a small
+index records each sealed segment's time range, modes and languages. Queries
+use the index to open only the segments that can match, and retention limits
+keep the total size on disk bounded.
+
+Layout of LOG_DIR:
+    active.jsonl                          entries not yet sealed
+    index.json                            time range and counts per sealed segment
+    <first timestamp>-<crc>.jsonl.gz      sealed segments
+
+Usage:
+    log_interaction("who are you", "I'm Zoya", mode="text", language="en")
+    query_logs(start="2025-01-01", mode="voice", text="weather", limit=20)
 """
 
+import gzip
 import json
 import os
-from datetime import datetime
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import metrics
+
+# Directory holding the log segments and index
+LOG_DIR = os.getenv("ZOYA_LOG_DIR", "zoya_logs")
+
+# Single-file log written by earlier versions, next to LOG_DIR, migrated on first use
+LEGACY_LOG_FILE = "zoya_logs.json"
+
+# Seal the active segment once it is this large...
+LOG_SEGMENT_BYTES = int(os.getenv("ZOYA_LOG_SEGMENT_BYTES", str(1024 * 1024)))
+
+# ...or once its first entry is this many seconds old
+LOG_SEGMENT_SECONDS = float(os.getenv("ZOYA_LOG_SEGMENT_SECONDS", "86400"))
+
+# Sealed segments older than this many days are deleted (0 keeps them forever)
+LOG_RETENTION_DAYS = float(os.getenv("ZOYA_LOG_RETENTION_DAYS", "90"))
+
+# Oldest sealed segments are deleted while the store is larger than this (0 for no cap)
+LOG_MAX_BYTES = int(os.getenv("ZOYA_LOG_MAX_BYTES", str(100 * 1024 * 1024)))
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+ACTIVE_FILE = "active.jsonl"
+SEALING_FILE = "sealing.jsonl"
+INDEX_FILE = "index.json"
+SEGMENT_SUFFIX = ".jsonl.gz"
+
+
+def _timestamp(value, end_of_day=False):
+    """Normalize a datetime or date/time string to the log timestamp format"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    value = str(value)
+    if len(value) == 10:
+        # A bare date such as "2025-01-31" covers that whole day
+        return value + (" 23:59:59" if end_of_day else " 00:00:00")
+    return datetime.fromisoformat(value).strftime(TIMESTAMP_FORMAT)
+
+
+def _summarize(entries):
+    """Return index metadata for a list of entries"""
+    modes, languages = {}, {}
+    for entry in entries:
+        mode = entry.get("mode") or ""
+        language = entry.get("language") or ""
+        modes[mode] = modes.get(mode, 0) + 1
+        languages[language] = languages.get(language, 0) + 1
+    return {
+        "start": min(entry["timestamp"] for entry in entries),
+        "end": max(entry["timestamp"] for entry in entries),
+        "count": len(entries),
+        "modes": modes,
+        "languages": languages
+    }
+
+
+def _matches(entry, start, end, mode, language, text):
+    timestamp = entry.get("timestamp", "")
+    if start and timestamp < start or end and timestamp > end:
+        return False
+    if mode and entry.get("mode") != mode:
+        return False
+    if language and entry.get("language") != language:
+        return False
+    if text:
+        haystack = " ".join(str(entry.get(field) or "") for field in ("user_query", "ai_reply", "search_result"))
+        if text not in haystack.lower():
+            return False
+    return True
+
+
+class LogStore:
+    """Append-only, rotated and indexed interaction log in one directory"""
+
+    def __init__(self, directory=None, segment_bytes=None, segment_seconds=None,
+                 retention_days=None, max_bytes=None):
+        self.directory = directory or LOG_DIR
+        self.segment_bytes = LOG_SEGMENT_BYTES if segment_bytes is None else segment_bytes
+        self.segment_seconds = LOG_SEGMENT_SECONDS if segment_seconds is None else segment_seconds
+        self.retention_days = LOG_RETENTION_DAYS if retention_days is None else retention_days
+        self.max_bytes = LOG_MAX_BYTES if max_bytes is None else max_bytes
+        self.lock = threading.RLock()
+        self.segments = []
+        self.active = []
+        self.active_bytes = 0
+        self.opened = False
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        """Load the index and active segment, finishing any interrupted seal"""
+        if self.opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.segments = self._load_index()
+
+        sealing = self._path(SEALING_FILE)
+        if os.path.exists(sealing):
+            with open(sealing, "rb") as f:
+                self._seal_data(f.read())
+            os.remove(sealing)
+
+        self.active = []
+        active = self._path(ACTIVE_FILE)
+        if os.path.exists(active):
+            with open(active, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.active.append(json.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+            self.active_bytes = os.path.getsize(active)
+        self.opened = True
+        self._migrate_legacy()
+
+    def _load_index(self):
+        """Read the index, adding sealed segments it misses and dropping ones deleted"""
+        segments = []
+        index_path = self._path(INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    segments = json.load(f)
+            except ValueError:
+                segments = []
+        on_disk = {name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX)}
+        segments = [s for s in segments if s["file"] in on_disk]
+        known = {s["file"] for s in segments}
+        for name in sorted(on_disk - known):
+            entries = list(self._read_segment(name))
+            if entries:
+                segments.append(dict(_summarize(entries), file=name, bytes=os.path.getsize(self._path(name))))
+        segments.sort(key=lambda s: (s["start"], s["file"]))
+        if segments or os.path.exists(index_path):
+            self._write_index(segments)
+        return segments
+
+    def _write_index(self, segments):
+        """Write the index atomically"""
+        tmp = self._path(INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(segments, f, indent=1)
+        os.replace(tmp, self._path(INDEX_FILE))
+
+    def _migrate_legacy(self):
+        """Move entries from the old single-file log into the store"""
+        legacy = os.path.join(os.path.dirname(os.path.abspath(self.directory)), LEGACY_LOG_FILE)
+        if not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except ValueError:
+            entries = []
+        entries = [e for e in entries if isinstance(e, dict) and e.get("timestamp")]
+        entries.sort(key=lambda e: e["timestamp"])
+        for entry in entries:
+            entry.setdefault("language", None)
+            self._append(entry)
+        os.replace(legacy, legacy + ".migrated")
+        print(f"🗂️ Migrated {len(entries)} logged conversations from {LEGACY_LOG_FILE} to {self.directory}/")
+
+    def append(self, entry):
+        """Add one entry, sealing the active segment first if it is full or old"""
+        with self.lock:
+            self._open()
+            self._append(entry)
+
+    def _append(self, entry):
+        if self.active and self._should_seal(entry["timestamp"]):
+            self._seal()
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self._path(ACTIVE_FILE), "ab") as f:
+            f.write(line)
+        self.active.append(entry)
+        self.active_bytes += len(line)
 
-LOG_FILE = "zoya_logs.json"
+    def _should_seal(self, timestamp):
+        if self.active_bytes >= self.segment_bytes:
+            return True
+        if self.segment_seconds:
+            first = datetime.strptime(self.active[0]["timestamp"], TIMESTAMP_FORMAT)
+            latest = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+            return (latest - first).total_seconds() >= self.segment_seconds
+        return False
 
+    def _seal(self):
+        """Compress the active segment into a sealed one and index it"""
+        os.replace(self._path(ACTIVE_FILE), self._path(SEALING_FILE))
+        with open(self._path(SEALING_FILE), "rb") as f:
+            self._seal_data(f.read())
+        os.remove(self._path(SEALING_FILE))
+        self.active = []
+        self.active_bytes = 0
+        self._enforce_retention()
 
-def log_interaction(user_query, ai_reply, mode="text", search_result=None):
+    def _seal_data(self, data):
+        entries = []
+        for line in data.decode("utf-8").splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        if not entries:
+            return
+        summary = _summarize(entries)
+        first = summary["start"].replace("-", "").replace(":", "").replace(" ", "-")
+        name = f"{first}-{zlib.crc32(data):08x}{SEGMENT_SUFFIX}"
+        if name not in {s["file"] for s in self.segments}:
+            tmp = self._path(name + ".tmp")
+            with gzip.open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(name))
+            self.segments.append(dict(summary, file=name, bytes=os.path.getsize(self._path(name))))
+            self.segments.sort(key=lambda s: (s["start"], s["file"]))
+            self._write_index(self.segments)
+        metrics.inc("zoya_log_segments_sealed_total")
+
+    def _enforce_retention(self):
+        """Delete the oldest sealed segments beyond the age and size limits"""
+        expired = []
+        if self.retention_days:
+            cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime(TIMESTAMP_FORMAT)
+            expired = [s for s in self.segments if s["end"] < cutoff]
+        kept = [s for s in self.segments if s not in expired]
+        if self.max_bytes:
+            total = sum(s["bytes"] for s in kept) + self.active_bytes
+            while kept and total > self.max_bytes:
+                total -= kept[0]["bytes"]
+                expired.append(kept.pop(0))
+        if not expired:
+            return
+        self.segments = kept
+        self._write_index(kept)
+        for segment in expired:
+            try:
+                os.remove(self._path(segment["file"]))
+            except OSError:
+                pass
+
+    def _read_segment(self, name):
+        with gzip.open(self._path(name), "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def query(self, start=None, end=None, mode=None, language=None, text=None, limit=None, newest_first=False):
+        """
+        Return logged interactions matching every given filter
+
+        Only sealed segments whose time range, modes and languages can match
+        are decompressed.
+
+        Args:
+            start: Earliest timestamp, as a datetime or "YYYY-MM-DD[ HH:MM:SS]"
+            end: Latest timestamp, inclusive
+            mode (str): Only entries from this mode, e.g. "voice"
+            language (str): Only entries in this language code
+            text (str): Case-insensitive text to find in the query, reply or search result
+            limit (int): Maximum number of entries to return
+            newest_first (bool): Return the most recent matches first
+
+        Returns:
+            list: Matching log entries
+        """
+        start, end = _timestamp(start), _timestamp(end, end_of_day=True)
+        text = text.lower() if text else None
+
+        with self.lock:
+            self._open()
+            segments = [s for s in self.segments
+                        if not (start and s["end"] < start) and not (end and s["start"] > end)
+                        and (not mode or mode in s["modes"])
+                        and (not language or language in s["languages"])]
+            active = list(self.active)
+        metrics.inc("zoya_log_segments_read_total", len(segments))
+
+        sources = [("segment", s["file"]) for s in segments] + [("active", active)]
+        if newest_first:
+            sources.reverse()
+
+        results = []
+        for kind, source in sources:
+            entries = self._read_segment(source) if kind == "segment" else source
+            matched = [e for e in entries if _matches(e, start, end, mode, language, text)]
+            if newest_first:
+                matched.reverse()
+            results.extend(matched)
+            if limit and len(results) >= limit:
+                return results[:limit]
+        return results
+
+    def clear(self):
+        """Delete every segment, the index and the active segment"""
+        with self.lock:
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if name == INDEX_FILE or name in (ACTIVE_FILE, SEALING_FILE) or name.endswith(SEGMENT_SUFFIX):
+                        os.remove(self._path(name))
+            self.segments = []
+            self.active = []
+            self.active_bytes = 0
+
+    def stats(self):
+        """Return segment count, entry count and bytes on disk"""
+        with self.lock:
+            self._open()
+            return {
+                "segments": len(self.segments),
+                "entries": sum(s["count"] for s in self.segments) + len(self.active),
+                "bytes": sum(s["bytes"] for s in self.segments) + self.active_bytes
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the log store for the current LOG_DIR"""
+    global _store
+    with _store_lock:
+        if _store is None or _store.directory != LOG_DIR:
+            _store = LogStore(LOG_DIR)
+        return _store
+
+
+@metrics.timed("log")
+def log_interaction(user_query, ai_reply, mode="text", search_result=None, language=None):
     """
-    Save interaction into JSON log file.
-    
+    Save interaction into the log store.
+
     Args:
         user_query (str): The user's query
         ai_reply (str): The AI's response
         mode (str): The mode used (text or voice)
         search_result (str): Search results if used, None otherwise
+        language (str): Language code of the conversation
     """
     log_entry = {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
         "mode": mode,
+        "language": language,
         "user_query": user_query,
         "ai_reply": ai_reply,
         "search_result": search_result
     }
 
-    # Load existing logs
-    logs = []
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            try:
-                logs = json.load(f)
-            except json.JSONDecodeError:
-                logs = []
+    get_store().append(log_entry)
 
-    logs.append(log_entry)
+    print(f"🗂️ Logged conversation: {log_entry['timestamp']}")
 
-    # Save updated log
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(logs, f, indent=4, ensure_ascii=False)
 
-    print(f"🗂️ Logged conversation: {log_entry['timestamp']}")
+def query_logs(start=None, end=None, mode=None, language=None, text=None, limit=None, newest_first=False):
+    """Return logged interactions matching the given filters, see LogStore.query"""
+    return get_store().query(start, end, mode, language, text, limit, newest_first)
 
 
 def get_logs():
     """
     Retrieve all logged interactions
-    
+
     Returns:
         list: List of log entries
     """
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
+    return query_logs()
 
 
 def clear_logs():
     """Clear all logged interactions"""
-    if os.path.exists(LOG_FILE):
-        os.remove(LOG_FILE)
-        print("🗑️ Logs cleared")
\ No newline at end of file
+    get_store().clear()
+    print("🗑️ Logs cleared")
+
+
+def main(argv=None):
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Search Zoya's interaction logs and print matches as JSON Lines.")
+    parser.add_argument("--since", help="Earliest timestamp, e.g. 2025-01-31 or '2025-01-31 09:00:00'")
+    parser.add_argument("--until", help="Latest timestamp; a bare date includes the whole day")
+    parser.add_argument("--mode", help="Only this mode (text, voice, live, batch, server)")
+    parser.add_argument("--language", help="Only this language code")
+    parser.add_argument("--text", help="Case-insensitive text to find in queries, replies and search results")
+    parser.add_argument("--limit", type=int, help="Maximum entries to print")
+    parser.add_argument("--newest-first", action="store_true", help="Print the most recent matches first")
+    parser.add_argument("--stats", action="store_true", help="Print segment, entry and size totals instead")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        print(json.dumps(get_store().stats()))
+        return 0
+    for entry in query_logs(args.since, args.until, args.mode, args.language, args.text, args.limit, args.newest_first):
+        sys.stdout.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,10 +3,15 @@
 Main entry point for Zoya AI Assistant
 """
 
+import argparse
 import keyboard
+import os
 import sys
 import time
 
+import diagnostics
+import metrics
+
 # Try to import all modules
 try:
     from speech_input import get_voice_input, SR_AVAILABLE
@@ -17,64 +22,89 @@ except ImportError as e:
         return None
 
 try:
-    from speech_output import speak_text, stop_speaking
+    from speech_output import speak_text, stop_speaking, audible
 except ImportError as e:
     print(f"❌ Error loading speech_output: {e}")
+    audible = None
     def speak_text(text, language="en"):
         print(f"Text output: {text}")
     def stop_speaking():
         print("Speech stopped.")
 
-try:
-    from ai_engine import get_ai_response, clear_memory
-    # Check if OPENAI_AVAILABLE is defined, if not define it
+from pipeline import (
+    process_query,
+    clear_memory,
+    resume_session,
+    search_web,
+    LOGGER_AVAILABLE,
+    log_interaction,
+)
+
+from barge_in import VoiceChannel
+from utils import stop_flag, reset_stop_flag
+
+# Saved conversation to continue, defaults to the most recent one
+SESSION_NAME = os.getenv("ZOYA_SESSION") or None
+
+# Continue the most recent conversation on startup (set to 0 to start fresh)
+RESUME_SESSION = os.getenv("ZOYA_RESUME", "1") == "1"
+
+
+def process_interruptible(query, selected_language, mode):
+    """Process a query, letting the spacebar cancel it while Zoya is thinking"""
+    hotkey = None
     try:
-        from ai_engine import OPENAI_AVAILABLE
-    except ImportError:
-        OPENAI_AVAILABLE = False
-except ImportError as e:
-    print(f"❌ Error loading ai_engine: {e}")
-    OPENAI_AVAILABLE = False
-    def get_ai_response(query, language="en"):
-        return None
-    def clear_memory():
+        hotkey = keyboard.add_hotkey("space", stop_flag.set)
+    except Exception:
+        # Keyboard hooks need extra permissions on some systems; Ctrl+C still works
         pass
+    try:
+        return process_query(query, selected_language, mode=mode, cancel=stop_flag)
+    finally:
+        if hotkey is not None:
+            keyboard.remove_hotkey(hotkey)
 
-try:
-    from duckduckgo_handler import search_web, DDGS_AVAILABLE
-except ImportError as e:
-    print(f"❌ Error loading duckduckgo_handler: {e}")
-    DDGS_AVAILABLE = False
-    def search_web(query):
-        return None
 
-# Import translator module
-try:
-    from translator import translate_text
-    TRANSLATOR_AVAILABLE = True
-    print("Translator module imported successfully.")
-except ImportError as e:
-    print(f"❌ Error loading translator: {e}")
-    TRANSLATOR_AVAILABLE = False
-    def translate_text(text, target_language):
-        return text
+def cancel_turn():
+    """Abandon whatever the current turn is still waiting on"""
+    stop_flag.set()
+    reset_stop_flag()
 
-# Import logger module
-try:
-    from logger import log_interaction
-    LOGGER_AVAILABLE = True
-    print("Logger module imported successfully.")
-except ImportError as e:
-    print(f"❌ Error loading logger: {e}")
-    LOGGER_AVAILABLE = False
-    def log_interaction(user_query, ai_reply, mode="text", search_result=None):
-        pass
 
-from utils import clean_text, stop_flag, reset_stop_flag
+def open_session(session_id, resume):
+    """Load the saved conversation into Zoya's memory"""
+    try:
+        memory = resume_session(session_id, resume=resume)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not open saved conversation: {e}")
+        return
+    if memory is None:
+        return
+    turns = sum(1 for msg in memory if msg["role"] == "user")
+    if turns:
+        print(f"🧠 Resumed conversation '{memory.session_id}' ({turns} recent questions remembered)")
+    else:
+        print(f"🧠 Started conversation '{memory.session_id}'")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Zoya AI Assistant")
+    parser.add_argument("--session", default=SESSION_NAME, help="saved conversation to resume or start")
+    parser.add_argument("--new-session", action="store_true", help="start a new conversation instead of resuming")
+    parser.add_argument("--diagnostics", action="store_true", default=diagnostics.DIAGNOSTICS_ENABLED,
+                        help="track memory, threads and open files per turn and report growing allocations")
+    args = parser.parse_args()
+
+    if args.diagnostics:
+        diagnostics.start()
+
+    # Optional Prometheus endpoint for stage latencies and counters
+    metrics_port = os.getenv("ZOYA_METRICS_PORT")
+    if metrics_port:
+        metrics.start_metrics_server(int(metrics_port))
+
     print("✨ Hello! I'm Zoya — your smart personal AI assistant ✨")
+    open_session(args.session, resume=RESUME_SESSION and not args.new_session)
     print("Please select your preferred language:")
     print("1. English")
     print("2. Hindi")
@@ -165,58 +195,20 @@ def start_text_mode(selected_language, selected_language_name):
                 speak_text("Goodbye! Have a nice day!", selected_language)
                 break
 
-            # 🧍 Personal Q&A
-            personal_qa = {
-                "what is your name": "My name is Zoya, your personal AI assistant.",
-                "who created you": "I was created by Masthan Valli — my brilliant developer.",
-                "who are you": "I'm Zoya, your friendly AI assistant built to help you.",
-                "who made you": "Masthan Valli built me using Python and AI.",
-                "who is masthan valli": "Masthan Valli is my creator — a talented developer.",
-                "who developed you": "Masthan Valli developed me with love and code."
-            }
-
-            query_lower = query.lower().strip(" ?")
-            if query_lower in personal_qa:
-                response = personal_qa[query_lower]
-            else:
-                # Check if query is general knowledge or needs AI
-                if is_general_knowledge_query(query):
-                    # Search web for general knowledge
-                    search_result = search_web(query)
-                    response = search_result if search_result else "I couldn't find information on that topic."
-                    
-                    # Log the interaction with search result
-                    if LOGGER_AVAILABLE:
-                        log_interaction(user_query=query, ai_reply=response, mode="text", search_result=search_result)
+            with metrics.turn() as turn:
+                # Route, answer, translate, clean and log the query
+                result = process_interruptible(query, selected_language, "text")
+                clean_response = result["response"]
+
+                if result["cancelled"]:
+                    print("🛑 Stopped.")
                 else:
-                    # Use AI for complex queries
-                    if OPENAI_AVAILABLE:
-                        ai_response = get_ai_response(query, selected_language)
-                        response = ai_response if ai_response else "I couldn't process that request."
-                        
-                        # Log the interaction
-                        if LOGGER_AVAILABLE:
-                            log_interaction(user_query=query, ai_reply=response, mode="text")
-                    else:
-                        # Fallback to web search if AI is not available
-                        search_result = search_web(query)
-                        response = search_result if search_result else "I couldn't find information on that topic."
-                        
-                        # Log the interaction with search result
-                        if LOGGER_AVAILABLE:
-                            log_interaction(user_query=query, ai_reply=response, mode="text", search_result=search_result)
-
-            # Translate response if needed
-            if selected_language != "en" and TRANSLATOR_AVAILABLE:
-                print(f"Translating response to {selected_language_name}...")
-                response = translate_text(response, selected_language)
-
-            # Clean response text
-            clean_response = clean_text(response)
-
-            # Speak the response (only once)
-            print(f"Zoya: {clean_response}")
-            speak_text(clean_response, selected_language)
+                    # Speak the response (only once)
+                    print(f"Zoya: {clean_response}")
+                    speak_text(clean_response, selected_language)
+
+            if metrics.TURN_SUMMARY:
+                print(metrics.turn_summary(turn.stages))
             
             # Friendly prompt after answer
             print("💬 You can ask me another question or type 'stop' anytime.\n")
@@ -225,6 +217,7 @@ def start_text_mode(selected_language, selected_language_name):
             time.sleep(0.5)
             
         except KeyboardInterrupt:
+            cancel_turn()
             print("\nZoya: Goodbye! 👋")
             speak_text("Goodbye! Have a nice day!", selected_language)
             break
@@ -241,95 +234,67 @@ def start_voice_mode(selected_language, selected_language_name):
         
     print(f"\n🎙️ Zoya Mode: Voice (AI) - {selected_language_name}")
     print("Say 'exit' to quit, or 'stop' to reset conversation.\n")
-    
-    while True:
-        try:
-            # Reset stop flag at the beginning of each conversation
-            reset_stop_flag()
-            
-            print("Listening... Say something (say 'stop' to interrupt or reset)")
-            query = get_voice_input(selected_language)
-            
-            if not query:
-                continue
-                
-            # 🛑 Stop Command
-            if query.lower() == "stop":
-                print("🛑 Conversation reset.")
-                speak_text("Conversation reset. Let's start fresh!", selected_language)
-                clear_memory()
-                print("💬 You can ask me another question or say 'stop' anytime.\n")
-                continue
 
-            # ❌ Exit Command
-            if query.lower() in ["exit", "quit", "bye"]:
-                print("Zoya: Goodbye! 👋")
-                speak_text("Goodbye! Have a nice day!", selected_language)
-                break
+    # One microphone, calibrated once, stays open; with barge-in on it also hears the user while Zoya speaks
+    voice = VoiceChannel(speak_text, stop_speaking, audible=audible)
+    try:
+        voice.open()
+    except Exception as e:
+        print(f"Could not open the microphone: {e}")
+        return
 
-            # 🧍 Personal Q&A
-            personal_qa = {
-                "what is your name": "My name is Zoya, your personal AI assistant.",
-                "who created you": "I was created by Masthan Valli — my brilliant developer.",
-                "who are you": "I'm Zoya, your friendly AI assistant built to help you.",
-                "who made you": "Masthan Valli built me using Python and AI.",
-                "who is masthan valli": "Masthan Valli is my creator — a talented developer.",
-                "who developed you": "Masthan Valli developed me with love and code."
-            }
-
-            query_lower = query.lower().strip(" ?")
-            if query_lower in personal_qa:
-                response = personal_qa[query_lower]
-            else:
-                # Check if query is general knowledge or needs AI
-                if is_general_knowledge_query(query):
-                    # Search web for general knowledge
-                    search_result = search_web(query)
-                    response = search_result if search_result else "I couldn't find information on that topic."
-                    
-                    # Log the interaction with search result
-                    if LOGGER_AVAILABLE:
-                        log_interaction(user_query=query, ai_reply=response, mode="voice", search_result=search_result)
-                else:
-                    # Use AI for complex queries
-                    if OPENAI_AVAILABLE:
-                        ai_response = get_ai_response(query, selected_language)
-                        response = ai_response if ai_response else "I couldn't process that request."
-                        
-                        # Log the interaction
-                        if LOGGER_AVAILABLE:
-                            log_interaction(user_query=query, ai_reply=response, mode="voice")
+    try:
+        while True:
+            try:
+                # Reset stop flag at the beginning of each conversation
+                reset_stop_flag()
+
+                if voice.pending is None:
+                    print("Listening... Say something (say 'stop' to interrupt or reset)")
+                query = voice.listen(selected_language)
+
+                if not query:
+                    continue
+
+                # 🛑 Stop Command
+                if query.lower() == "stop":
+                    print("🛑 Conversation reset.")
+                    voice.speak("Conversation reset. Let's start fresh!", selected_language)
+                    clear_memory()
+                    print("💬 You can ask me another question or say 'stop' anytime.\n")
+                    continue
+
+                # ❌ Exit Command
+                if query.lower() in ["exit", "quit", "bye"]:
+                    print("Zoya: Goodbye! 👋")
+                    speak_text("Goodbye! Have a nice day!", selected_language)
+                    break
+
+                with metrics.turn() as turn:
+                    # Route, answer, translate, clean and log the query
+                    result = process_interruptible(query, selected_language, "voice")
+                    clean_response = result["response"]
+
+                    if result["cancelled"]:
+                        print("🛑 Stopped.")
                     else:
-                        # Fallback to web search if AI is not available
-                        search_result = search_web(query)
-                        response = search_result if search_result else "I couldn't find information on that topic."
-                        
-                        # Log the interaction with search result
-                        if LOGGER_AVAILABLE:
-                            log_interaction(user_query=query, ai_reply=response, mode="voice", search_result=search_result)
-
-            # Translate response if needed
-            if selected_language != "en" and TRANSLATOR_AVAILABLE:
-                print(f"Translating response to {selected_language_name}...")
-                response = translate_text(response, selected_language)
-
-            # Clean response text
-            clean_response = clean_text(response)
-
-            # Speak the response (only once)
-            print(f"Zoya: {clean_response}")
-            speak_text(clean_response, selected_language)
-            
-            # Small delay to ensure speech finishes before next prompt
-            time.sleep(0.5)
-            
-        except KeyboardInterrupt:
-            print("\nZoya: Goodbye! 👋")
-            speak_text("Goodbye! Have a nice day!", selected_language)
-            break
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            print("Continuing to next query...")
+                        # Speak the response (only once); talking over it stops it
+                        print(f"Zoya: {clean_response}")
+                        voice.speak(clean_response, selected_language)
+
+                if metrics.TURN_SUMMARY:
+                    print(metrics.turn_summary(turn.stages))
+
+            except KeyboardInterrupt:
+                cancel_turn()
+                print("\nZoya: Goodbye! 👋")
+                speak_text("Goodbye! Have a nice day!", selected_language)
+                break
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                print("Continuing to next query...")
+    finally:
+        voice.close()
 
 
 def start_live_search_mode(selected_language, selected_language_name):
@@ -349,16 +314,20 @@ def start_live_search_mode(selected_language, selected_language_name):
                 break
 
             print(f"You searched: {query}")
-            result = search_web(query)
-            if not result:
-                result = "I couldn't find information on that topic."
-            
-            print(f"\nZoya (Live): {result}")
-            speak_text(result, selected_language)
+            with metrics.turn() as turn:
+                result = search_web(query)
+                if not result:
+                    result = "I couldn't find information on that topic."
 
-            # Log search
-            if LOGGER_AVAILABLE:
-                log_interaction(query, result, mode="live", search_result=result)
+                print(f"\nZoya (Live): {result}")
+                speak_text(result, selected_language)
+
+                # Log search
+                if LOGGER_AVAILABLE:
+                    log_interaction(query, result, mode="live", search_result=result, language=selected_language)
+
+            if metrics.TURN_SUMMARY:
+                print(metrics.turn_summary(turn.stages))
                 
             # Friendly prompt after answer
             print("💬 You can search for another topic or type 'exit' to quit.\n")
@@ -375,14 +344,5 @@ def start_live_search_mode(selected_language, selected_language_name):
             print("Continuing to next query...")
 
 
-def is_general_knowledge_query(query):
-    """Determine if a query is general knowledge (should use web search)"""
-    general_keywords = [
-        "who is", "what is", "when was", "where is", "capital of", 
-        "population of", "temperature in", "weather in", "current time in"
-    ]
-    return any(keyword in query.lower() for keyword in general_keywords)
-
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
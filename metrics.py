@@ -0,0 +1,352 @@
+"""
+Lightweight latency and counter metrics for Zoya AI Assistant
+
+Timing spans feed in-process histograms and per-turn stage totals. Counters
+track requests, errors, cache hits and bytes. Everything can be dumped in the
+Prometheus text format, served on a local /metrics endpoint, or printed as a
+one-line summary per turn. A span costs about two microseconds, so metrics stay
+on in production.
+
+Usage:
+    with metrics.turn() as turn:
+        with metrics.span("routing"):
+            ...
+    print(metrics.turn_summary(turn.stages))
+
+    @metrics.timed("search")
+    def search_web(query): ...
+
+    metrics.inc("zoya_requests_total", backend="openrouter", status=200)
+"""
+
+import functools
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from utils import Cancelled
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Print a one-line stage summary after every interactive turn
+TURN_SUMMARY = os.getenv("ZOYA_TURN_SUMMARY", "1") == "1"
+
+STAGE_METRIC = "zoya_stage_duration_seconds"
+TURN_METRIC = "zoya_turn_duration_seconds"
+
+HELP = {
+    STAGE_METRIC: "Time spent in each pipeline stage",
+    TURN_METRIC: "End-to-end time per turn",
+    "zoya_turns_total": "Turns processed",
+    "zoya_stage_errors_total": "Stages that raised an exception",
+    "zoya_cancelled_total": "Stages abandoned because their turn was cancelled",
+    "zoya_requests_total": "Outbound requests by backend and status",
+    "zoya_http_bytes_total": "Bytes sent and received by backend",
+    "zoya_cache_hits_total": "Cache lookups that returned an entry",
+    "zoya_cache_misses_total": "Cache lookups that found nothing",
+    "zoya_cache_bypass_total": "Queries that skipped a cache because they depend on context",
+    "zoya_llm_tokens_total": "Prompt and completion tokens used",
+    "zoya_llm_ttft_seconds": "Time from sending a streamed AI request to its first token",
+    "zoya_llm_tokens_saved_total": "Completion tokens not generated because a reply ended at its budget",
+    "zoya_retries_total": "Retried AI requests by model",
+    "zoya_hedged_requests_total": "Hedged second AI requests by model",
+    "zoya_model_fallbacks_total": "AI requests that moved on to a fallback model",
+    "zoya_circuit_rejections_total": "AI requests skipped because a model's circuit was open",
+    "zoya_limiter_wait_seconds": "Time spent queued for a backend's rate limit",
+    "zoya_limiter_pauses_total": "Times a backend's rate limit was paused after a 429",
+    "zoya_coalesced_requests_total": "Requests that shared an identical request already in flight",
+    "zoya_search_late_sources_total": "Search sources left behind because they missed the deadline",
+    "zoya_log_segments_sealed_total": "Interaction log segments compressed and indexed",
+    "zoya_log_segments_read_total": "Sealed log segments opened by queries",
+    "zoya_diag_ceiling_breaches_total": "Times a resource went above its diagnostics ceiling",
+    "zoya_diag_trims_total": "Times caches and history were trimmed to free memory",
+    "zoya_barge_ins_total": "Replies stopped because the user started speaking",
+    "zoya_barge_in_echoes_total": "Barge-ins dropped because the phrase heard was the reply itself",
+    "zoya_barge_in_detect_seconds": "Time from the user starting to speak over a reply to barge-in"
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_stage_histograms = {}
+_local = threading.local()
+_turn_hooks = []
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count for one labelled series"""
+
+    __slots__ = ("counts", "sum", "count", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(BUCKETS, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+def percentile(values, pct):
+    """
+    Return the pct-th percentile of values using linear interpolation
+
+    Args:
+        values (list): Numbers to summarize
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter by amount"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def histogram(name, **labels):
+    """Return the histogram for a name and label set, creating it if needed"""
+    key = _key(name, labels)
+    hist = _histograms.get(key)
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault(key, Histogram())
+    return hist
+
+
+def observe(name, value, **labels):
+    """Record one value in a histogram"""
+    histogram(name, **labels).observe(value)
+
+
+def _stage_histogram(stage):
+    hist = _stage_histograms.get(stage)
+    if hist is None:
+        hist = _stage_histograms.setdefault(stage, histogram(STAGE_METRIC, stage=stage))
+    return hist
+
+
+class span:
+    """Context manager that times a stage into its histogram and the current turn"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = perf_counter() - self.start
+        _stage_histogram(self.name).observe(elapsed)
+        stages = getattr(_local, "stages", None)
+        if stages is not None:
+            stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        if exc_type is not None:
+            if issubclass(exc_type, Cancelled):
+                inc("zoya_cancelled_total", stage=self.name)
+            else:
+                inc("zoya_stage_errors_total", stage=self.name)
+        return False
+
+
+def timed(name):
+    """Decorator that wraps every call of a function in a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class turn:
+    """
+    Collects the stage times of one turn on the current thread
+
+    Nested turns join the outermost one, so a caller can time speech output
+    around a pipeline call and see all stages in one place.
+    """
+
+    __slots__ = ("stages", "start", "owner")
+
+    def __enter__(self):
+        current = getattr(_local, "stages", None)
+        self.owner = current is None
+        self.stages = {} if self.owner else current
+        if self.owner:
+            _local.stages = self.stages
+        self.start = perf_counter()
+        return self
+
+    def elapsed(self):
+        """Seconds since this turn (or its nested part) started"""
+        return perf_counter() - self.start
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.owner:
+            total = self.elapsed()
+            self.stages["total"] = total
+            _local.stages = None
+            histogram(TURN_METRIC).observe(total)
+            inc("zoya_turns_total")
+            for hook in list(_turn_hooks):
+                try:
+                    hook(self.stages)
+                except Exception as e:
+                    print(f"⚠️ Turn hook failed: {e}")
+        return False
+
+
+def on_turn(callback):
+    """Call callback(stages) on the turn's thread after every finished turn"""
+    if callback not in _turn_hooks:
+        _turn_hooks.append(callback)
+
+
+def remove_turn_hook(callback):
+    """Stop calling a callback registered with on_turn"""
+    if callback in _turn_hooks:
+        _turn_hooks.remove(callback)
+
+
+def turn_summary(stages):
+    """Format stage times as a single line, e.g. "⏱️ Turn 1234 ms | ai 1100 ms | ...\""""
+    parts = [f"{name} {seconds * 1000:.1f} ms" for name, seconds in stages.items() if name != "total"]
+    total = stages.get("total", sum(stages.values()))
+    return f"⏱️ Turn {total * 1000:.0f} ms | " + " | ".join(parts)
+
+
+def get_counter(name, **labels):
+    """Return the current value of a counter"""
+    return _counters.get(_key(name, labels), 0)
+
+
+def snapshot():
+    """
+    Return a copy of all counters and histogram summaries
+
+    Returns:
+        dict: {"counters": {...}, "histograms": {...}} keyed by "name{labels}"
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = dict(_histograms)
+    return {
+        "counters": {_series(name, labels): value for (name, labels), value in counters.items()},
+        "histograms": {_series(name, labels): {"count": h.count, "sum": h.sum}
+                       for (name, labels), h in histograms.items()}
+    }
+
+
+def reset():
+    """Drop all recorded metrics"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _stage_histograms.clear()
+
+
+def _series(name, labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    inner = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return f"{name}{{{inner}}}"
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items(), key=lambda item: item[0])
+
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{_series(name, labels)} {_format_value(value)}")
+
+    for (name, labels), hist in histograms:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        with hist.lock:
+            counts = list(hist.counts)
+            total, count = hist.sum, hist.count
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS + (float("inf"),), counts):
+            cumulative += bucket
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{_series(name + '_bucket', labels, [('le', le)])} {cumulative}")
+        lines.append(f"{_series(name + '_sum', labels)} {repr(total)}")
+        lines.append(f"{_series(name + '_count', labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Serve /metrics in the Prometheus text format from a background thread
+
+    Args:
+        port (int): Port to listen on
+        host (str): Address to bind
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True, name="zoya-metrics").start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return httpd
@@ -0,0 +1,368 @@
+"""
+Shared outbound request layer for Zoya AI Assistant
+
+Every call to OpenRouter, MyMemory and DDGS passes through here. Each backend
+can have a token-bucket rate limit: callers queue for tokens in priority
+order, so interactive turns overtake batch work, and a 429 pauses the bucket
+instead of letting every queued caller hit the limit again. Identical calls
+already in flight are coalesced, so concurrent sessions asking the same thing
+share one request and its result.
+
+Usage:
+    data = outbound.call("mymemory", (text, lang), fetch, text, lang, cancel=cancel)
+
+    outbound.acquire("openrouter", cancel)   # rate limit only, for streams
+
+    with outbound.priority(outbound.PRIORITY_BATCH):
+        process_query(...)
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import llm_backends
+import metrics
+from http_client import RequestHandle
+from utils import Cancelled, CancelToken, submit_io, wait_cancellable
+
+# Every other AI backend (see llm_backends) can be rate limited under its own name
+BACKENDS = ("openrouter", "mymemory", "ddgs") + tuple(b for b in llm_backends.LLM_BACKENDS if b != "openrouter")
+
+# Pipeline stage names accepted as aliases for backends, e.g. --rate ai=2
+ALIASES = {"ai": "openrouter", "translate": "mymemory", "search": "ddgs"}
+
+# Queue priorities: lower numbers are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Requests per second and burst size per backend (a rate of 0 means unlimited)
+DEFAULT_RATES = {
+    "openrouter": (float(os.getenv("ZOYA_RATE_OPENROUTER", "0")), float(os.getenv("ZOYA_BURST_OPENROUTER", "0"))),
+    "mymemory": (float(os.getenv("ZOYA_RATE_MYMEMORY", "5")), float(os.getenv("ZOYA_BURST_MYMEMORY", "10"))),
+    "ddgs": (float(os.getenv("ZOYA_RATE_DDGS", "2")), float(os.getenv("ZOYA_BURST_DDGS", "6")))
+}
+
+# Coalesce identical in-flight calls (set to 0 to send every call)
+COALESCE_REQUESTS = os.getenv("ZOYA_COALESCE", "1") == "1"
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter with a priority queue of waiters
+
+    Tokens refill at rate per second up to burst. Waiters are served strictly
+    in (priority, arrival) order, so a steady stream of batch calls cannot
+    starve an interactive one.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (float): Maximum tokens saved up, defaults to one second's worth
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst or rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.queue = []
+        self.sequence = itertools.count()
+        self.cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _ready_at(self, now):
+        if self.tokens >= 1:
+            return max(now, self.paused_until)
+        return max(now + (1 - self.tokens) / self.rate, self.paused_until)
+
+    def _wake(self):
+        with self.cond:
+            self.cond.notify_all()
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, cancel=None):
+        """
+        Wait for a token
+
+        Args:
+            priority (int): Queue priority, lower is served first
+            cancel (CancelToken): Leaves the queue when set
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            Cancelled: If cancel was set while waiting
+        """
+        start = time.monotonic()
+        ticket = (priority, next(self.sequence))
+        wake = cancel.on_cancel(self._wake) if cancel is not None else None
+        try:
+            with self.cond:
+                heapq.heappush(self.queue, ticket)
+                try:
+                    while True:
+                        if cancel is not None and cancel.is_set():
+                            raise Cancelled()
+                        now = time.monotonic()
+                        self._refill(now)
+                        if self.queue[0] != ticket:
+                            self.cond.wait()
+                            continue
+                        ready_at = self._ready_at(now)
+                        if ready_at <= now:
+                            heapq.heappop(self.queue)
+                            self.tokens -= 1
+                            self.cond.notify_all()
+                            return now - start
+                        self.cond.wait(ready_at - now)
+                except BaseException:
+                    if ticket in self.queue:
+                        self.queue.remove(ticket)
+                        heapq.heapify(self.queue)
+                        self.cond.notify_all()
+                    raise
+        finally:
+            if wake is not None:
+                cancel.remove_callback(wake)
+
+    def try_acquire(self):
+        """Take a token only if one is free and nobody is queued; returns True if taken"""
+        with self.cond:
+            now = time.monotonic()
+            self._refill(now)
+            if self.queue or self._ready_at(now) > now:
+                return False
+            self.tokens -= 1
+            return True
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next seconds, e.g. after a 429"""
+        with self.cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class _Flight:
+    """One in-flight call shared by every caller asking for the same key"""
+
+    __slots__ = ("future", "waiters", "cancel")
+
+    def __init__(self):
+        self.future = Future()
+        self.waiters = 1
+        self.cancel = CancelToken()
+
+
+_buckets = {}
+_flights = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def configure(backend, rate, burst=None):
+    """
+    Set or remove the rate limit for a backend
+
+    Args:
+        backend (str): Backend name or alias
+        rate (float): Requests per second, 0 to remove the limit
+        burst (float): Requests allowed back to back after an idle spell
+    """
+    backend = ALIASES.get(backend, backend)
+    with _lock:
+        if rate and rate > 0:
+            _buckets[backend] = TokenBucket(rate, burst)
+        else:
+            _buckets.pop(backend, None)
+
+
+def reset_limits():
+    """Restore the rate limits configured by environment variables"""
+    with _lock:
+        _buckets.clear()
+    for backend, (rate, burst) in DEFAULT_RATES.items():
+        configure(backend, rate, burst)
+
+
+def parse_rate(value):
+    """
+    Parse a backend=requests_per_second[:burst] argument
+
+    Returns:
+        tuple: (backend, rate, burst or None)
+
+    Raises:
+        ValueError: If the backend or numbers are invalid
+    """
+    backend, _, spec = value.partition("=")
+    backend = ALIASES.get(backend, backend)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of "
+                         f"{', '.join(BACKENDS + tuple(ALIASES))}")
+    rate, _, burst = spec.partition(":")
+    try:
+        rate = float(rate)
+        burst = float(burst) if burst else None
+    except ValueError:
+        raise ValueError(f"Invalid rate for {backend}: '{spec}'")
+    if rate < 0 or (burst is not None and burst < 1):
+        raise ValueError(f"Rate for {backend} must be positive")
+    return backend, rate, burst
+
+
+class priority:
+    """Context manager that sets the queue priority of outbound calls made on this thread"""
+
+    __slots__ = ("level", "previous")
+
+    def __init__(self, level):
+        self.level = level
+
+    def __enter__(self):
+        self.previous = getattr(_local, "priority", PRIORITY_INTERACTIVE)
+        _local.priority = self.level
+        return self
+
+    def __exit__(self, *exc):
+        _local.priority = self.previous
+        return False
+
+
+def current_priority():
+    """Return the queue priority of the current thread"""
+    return getattr(_local, "priority", PRIORITY_INTERACTIVE)
+
+
+def acquire(backend, cancel=None, level=None):
+    """
+    Wait for the backend's rate limit, if it has one
+
+    Args:
+        backend (str): Backend name
+        cancel (CancelToken): Leaves the queue when set
+        level (int): Queue priority, defaults to the current thread's
+
+    Raises:
+        Cancelled: If cancel was set while waiting
+    """
+    bucket = _buckets.get(backend)
+    if bucket is None:
+        return
+    waited = bucket.acquire(current_priority() if level is None else level, cancel)
+    metrics.observe("zoya_limiter_wait_seconds", waited, backend=backend)
+
+
+def try_acquire(backend):
+    """Take a rate-limit token without waiting; returns True if the call may go ahead"""
+    bucket = _buckets.get(backend)
+    return bucket is None or bucket.try_acquire()
+
+
+def pause(backend, seconds):
+    """Stop handing out tokens for a backend, e.g. after it answered 429"""
+    bucket = _buckets.get(backend)
+    if bucket is not None and seconds > 0:
+        bucket.pause(seconds)
+        metrics.inc("zoya_limiter_pauses_total", backend=backend)
+
+
+def call(backend, key, func, *args, cancel=None, on_abandon=None, **kwargs):
+    """
+    Make a rate-limited call, sharing it with identical calls already in flight
+
+    With a cancel token the call runs on the I/O pool, so each caller can stop
+    waiting on its own token; without one it runs on the calling thread. HTTP
+    requests made through the shared session are aborted as soon as nobody
+    is waiting for them. It is only abandoned once every caller sharing it has gone,
+    at which point on_abandon receives its result.
+
+    Args:
+        backend (str): Backend name, which picks the rate limit
+        key: Hashable description of the call, or None to never share it
+        func (callable): The blocking call
+        cancel (CancelToken): Stops this caller waiting when set
+        on_abandon (callable): Receives the result if every caller gave up
+
+    Returns:
+        The result of func, which callers must treat as read-only
+
+    Raises:
+        Cancelled: If cancel was set before the call finished
+    """
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    if key is None or not COALESCE_REQUESTS:
+        acquire(backend, cancel)
+        if cancel is None:
+            return func(*args, **kwargs)
+        # A cancelled caller aborts its HTTP request instead of leaving it to finish
+        handle = RequestHandle()
+        callback = cancel.on_cancel(handle.abort)
+        try:
+            return wait_cancellable(submit_io(handle.run, func, *args, **kwargs), cancel, on_abandon)
+        finally:
+            cancel.remove_callback(callback)
+
+    flight_key = (backend, key)
+    with _lock:
+        flight = _flights.get(flight_key)
+        if flight is not None and not flight.cancel.is_set():
+            flight.waiters += 1
+            leader = False
+        else:
+            flight = _Flight()
+            _flights[flight_key] = flight
+            leader = True
+
+    if leader and cancel is None:
+        # Nothing to walk away from, so the leader makes the call itself; callers
+        # that already run on the I/O pool never wait on another pool task
+        _fly(backend, flight_key, flight, current_priority(), func, args, kwargs, on_abandon)
+    elif leader:
+        submit_io(_fly, backend, flight_key, flight, current_priority(), func, args, kwargs, on_abandon)
+    else:
+        metrics.inc("zoya_coalesced_requests_total", backend=backend)
+
+    try:
+        return wait_cancellable(flight.future, cancel)
+    except Cancelled:
+        with _lock:
+            flight.waiters -= 1
+            if flight.waiters == 0:
+                flight.cancel.set()
+        raise
+
+
+def _fly(backend, flight_key, flight, level, func, args, kwargs, on_abandon):
+    """Run a shared call and publish its result to every waiter"""
+    # Once every caller has gone, the HTTP request is aborted rather than left to finish
+    handle = RequestHandle()
+    callback = flight.cancel.on_cancel(handle.abort)
+    try:
+        acquire(backend, flight.cancel, level)
+        result = handle.run(func, *args, **kwargs)
+    except BaseException as e:
+        flight.future.set_exception(e)
+    else:
+        flight.future.set_result(result)
+        if flight.cancel.is_set() and on_abandon:
+            try:
+                on_abandon(result)
+            except Exception:
+                pass
+    finally:
+        flight.cancel.remove_callback(callback)
+        with _lock:
+            if _flights.get(flight_key) is flight:
+                del _flights[flight_key]
+
+
+reset_limits()
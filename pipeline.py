@@ -0,0 +1,193 @@
+"""
+Query processing pipeline for Zoya AI Assistant
+
+Routes a query to personal Q&A, web search or the AI engine, then translates,
+cleans and logs the reply. Shared by the interactive modes and batch mode.
+"""
+
+import metrics
+
+# Try to import all backend modules
+try:
+    from ai_engine import get_ai_response, clear_memory, resume_session
+    # Check if OPENAI_AVAILABLE is defined, if not define it
+    try:
+        from ai_engine import OPENAI_AVAILABLE
+    except ImportError:
+        OPENAI_AVAILABLE = False
+except ImportError as e:
+    print(f"❌ Error loading ai_engine: {e}")
+    OPENAI_AVAILABLE = False
+    def get_ai_response(query, language="en", memory=None, on_delta=None, cancel=None, mode="text"):
+        return None
+    def clear_memory():
+        pass
+    def resume_session(session_id=None, resume=True):
+        return None
+
+try:
+    from duckduckgo_handler import search_web, DDGS_AVAILABLE
+except ImportError as e:
+    print(f"❌ Error loading duckduckgo_handler: {e}")
+    DDGS_AVAILABLE = False
+    def search_web(query, cancel=None):
+        return None
+
+# Import translator module
+try:
+    from translator import translate_text
+    TRANSLATOR_AVAILABLE = True
+    print("Translator module imported successfully.")
+except ImportError as e:
+    print(f"❌ Error loading translator: {e}")
+    TRANSLATOR_AVAILABLE = False
+    def translate_text(text, target_language, cancel=None):
+        return text
+
+# Import logger module
+try:
+    from logger import log_interaction
+    LOGGER_AVAILABLE = True
+    print("Logger module imported successfully.")
+except ImportError as e:
+    print(f"❌ Error loading logger: {e}")
+    LOGGER_AVAILABLE = False
+    def log_interaction(user_query, ai_reply, mode="text", search_result=None, language=None):
+        pass
+
+from utils import Cancelled, clean_text
+
+language_names = {
+    "en": "English",
+    "hi": "Hindi",
+    "te": "Telugu",
+    "ta": "Tamil",
+    "es": "Spanish",
+    "fr": "French"
+}
+
+# 🧍 Personal Q&A
+personal_qa = {
+    "what is your name": "My name is Zoya, your personal AI assistant.",
+    "who created you": "I was created by Masthan Valli — my brilliant developer.",
+    "who are you": "I'm Zoya, your friendly AI assistant built to help you.",
+    "who made you": "Masthan Valli built me using Python and AI.",
+    "who is masthan valli": "Masthan Valli is my creator — a talented developer.",
+    "who developed you": "Masthan Valli developed me with love and code."
+}
+
+NO_SEARCH_RESULT = "I couldn't find information on that topic."
+NO_AI_RESULT = "I couldn't process that request."
+
+# Replies that mean a backend failed or found nothing
+FALLBACK_RESPONSES = {
+    NO_SEARCH_RESULT,
+    NO_AI_RESULT,
+    "I couldn't find anything for that.",
+    "Something went wrong during live search."
+}
+
+
+def is_general_knowledge_query(query):
+    """Determine if a query is general knowledge (should use web search)"""
+    general_keywords = [
+        "who is", "what is", "when was", "where is", "capital of",
+        "population of", "temperature in", "weather in", "current time in"
+    ]
+    return any(keyword in query.lower() for keyword in general_keywords)
+
+
+def process_query(query, language="en", mode="text", memory=None, log=True,
+                  on_delta=None, cancel=None):
+    """
+    Run a query through routing, search/AI, translation, cleaning and logging
+
+    Args:
+        query (str): User's query
+        language (str): Language code for the response
+        mode (str): The mode used (text, voice or batch), recorded in the log
+            and used to pick the AI generation budget
+        memory (list): Conversation memory to use instead of the global chat memory
+        log (bool): Whether to log the interaction
+        on_delta (callable): Streams AI replies when given, called with each piece of text
+        cancel (CancelToken): Abandons the turn when set; in-flight search,
+            AI and translation requests return immediately
+
+    Returns:
+        dict: The cleaned response, the route taken, whether a real answer
+            was found, whether the turn was cancelled, the raw search result
+            and per-stage timings in seconds
+    """
+    with metrics.turn() as turn:
+        response, route, search_result, cancelled = _answer(query, language, mode, memory, on_delta, cancel)
+        ok = not cancelled and response not in FALLBACK_RESPONSES
+
+        # A cancelled turn was never answered, so it is neither logged nor translated
+        if not cancelled and log and route != "personal" and LOGGER_AVAILABLE:
+            log_interaction(user_query=query, ai_reply=response, mode=mode, search_result=search_result,
+                            language=language)
+
+        # Translate response if needed
+        if not cancelled and language != "en" and TRANSLATOR_AVAILABLE:
+            print(f"Translating response to {language_names.get(language, language)}...")
+            try:
+                response = translate_text(response, language, cancel=cancel)
+            except Cancelled:
+                cancelled, ok = True, False
+
+        # Clean response text
+        with metrics.span("clean"):
+            clean_response = clean_text(response)
+
+        timings = dict(turn.stages)
+        timings["total"] = turn.elapsed()
+
+    return {
+        "query": query,
+        "language": language,
+        "route": route,
+        "ok": ok,
+        "cancelled": cancelled,
+        "response": clean_response,
+        "search_result": search_result,
+        "timings": timings
+    }
+
+
+def _answer(query, language, mode, memory, on_delta, cancel):
+    """
+    Route a query and answer it from personal Q&A, web search or the AI engine
+
+    Returns:
+        tuple: (response, route, search result, True if the turn was cancelled)
+    """
+    search_result = None
+
+    with metrics.span("routing"):
+        query_lower = query.lower().strip(" ?")
+        if query_lower in personal_qa:
+            route = "personal"
+        elif is_general_knowledge_query(query) or not OPENAI_AVAILABLE:
+            # General knowledge goes to web search, as does everything
+            # else when AI is not available
+            route = "search"
+        else:
+            route = "ai"
+
+    try:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        if route == "personal":
+            response = personal_qa[query_lower]
+        elif route == "search":
+            search_result = search_web(query, cancel=cancel)
+            response = search_result if search_result else NO_SEARCH_RESULT
+        else:
+            ai_response = get_ai_response(query, language, memory=memory, on_delta=on_delta,
+                                          cancel=cancel, mode=mode)
+            response = ai_response if ai_response else NO_AI_RESULT
+    except Cancelled as e:
+        # Whatever was already streamed is returned so callers can show it
+        return e.partial, route, search_result, True
+
+    return response, route, search_result, False
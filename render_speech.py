@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Offline speech rendering for Zoya AI Assistant
+
+Synthesizes texts to audio files ahead of time, e.g. answers for an FAQ
+kiosk, instead of speaking them live. pyttsx3 renders WAV files with the
+same voice, speed and volume as live speech; gTTS renders MP3 files and is
+used for pyttsx3 failures or when asked for. pyttsx3 engines are not
+thread-safe, so texts are spread over a pool of processes with one engine
+each, and throughput grows with the number of cores.
+
+Input is JSON Lines: a JSON string, or an object with "text" (or the
+"response" field of batch.py output), and optionally "id" and "language":
+    {"id": "faq-1", "text": "We open at nine.", "language": "en"}
+
+A manifest.json in the output directory lists every file with its text,
+engine, size and render time. Texts whose file is already listed with the
+same text, language and voice are not rendered again.
+
+Usage:
+    python batch.py faq.jsonl -o answers.jsonl
+    python render_speech.py answers.jsonl -o kiosk_audio --workers 8
+    python render_speech.py faq.jsonl -o kiosk_audio --engine gtts --language hi
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ENGINES = ("auto", "pyttsx3", "gtts")
+
+MANIFEST_FILE = "manifest.json"
+
+# Engine of the current worker process, set up once by _init_worker
+_worker = {}
+
+
+def read_texts(stream, default_language):
+    """
+    Read text records from a JSON Lines stream
+
+    Args:
+        stream: Text stream to read from
+        default_language (str): Language code for records that do not set one
+
+    Returns:
+        list: Records with index, id, text and language
+    """
+    records = []
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Skipping line {line_no}: invalid JSON ({e})", file=sys.stderr)
+            continue
+        if isinstance(item, str):
+            item = {"text": item}
+        text = item.get("text", item.get("response")) if isinstance(item, dict) else None
+        if not str(text or "").strip() or "error" in item:
+            print(f"Skipping line {line_no}: no text", file=sys.stderr)
+            continue
+        records.append({
+            "index": len(records),
+            "id": str(item.get("id", line_no)),
+            "text": str(text).strip(),
+            "language": item.get("language", default_language)
+        })
+    return records
+
+
+def file_stem(record):
+    """Return a safe, unique file name stem for a record"""
+    stem = re.sub(r"[^\w.-]+", "_", record["id"]).strip("._") or "item"
+    return f"{record['index']:05d}-{stem}"
+
+
+def voice_key(engine_name, record):
+    """Return a digest of everything that decides how a record sounds"""
+    from speech_output import VOICE_RATE, VOICE_VOLUME
+    spec = json.dumps([engine_name, record["language"], VOICE_RATE, VOICE_VOLUME, record["text"]])
+    return hashlib.sha1(spec.encode("utf-8")).hexdigest()
+
+
+def _init_worker(engine_name):
+    """Load the speech modules and create this process's pyttsx3 engine"""
+    import speech_output
+    _worker["speech"] = speech_output
+    _worker["pyttsx3"] = None
+    if engine_name in ("auto", "pyttsx3") and speech_output.PYTTSX3_AVAILABLE:
+        try:
+            _worker["pyttsx3"] = speech_output.configure_voice(speech_output.pyttsx3.init())
+        except Exception as e:
+            print(f"pyttsx3 failed to start in worker {os.getpid()}: {e}", file=sys.stderr)
+
+
+def _save(path, write):
+    """Write a file through a temporary name, so a crash never leaves half a file"""
+    stem, ext = os.path.splitext(path)
+    tmp = f"{stem}.tmp{ext}"
+    write(tmp)
+    if not os.path.exists(tmp) or os.path.getsize(tmp) == 0:
+        raise RuntimeError("the engine wrote no audio")
+    os.replace(tmp, path)
+
+
+def _render_pyttsx3(text, path):
+    tts_engine = _worker["pyttsx3"]
+    if tts_engine is None:
+        raise RuntimeError("pyttsx3 not available")
+
+    def write(tmp):
+        tts_engine.save_to_file(text, tmp)
+        tts_engine.runAndWait()
+    _save(path, write)
+
+
+def _render_gtts(text, language, path):
+    speech_output = _worker["speech"]
+    if not speech_output.GTTS_AVAILABLE:
+        raise RuntimeError("gTTS not available")
+    tts = speech_output.gTTS(text=text, lang=language, slow=False, lang_check=False)
+    _save(path, tts.save)
+
+
+def render_one(record, engine_name, output_dir):
+    """
+    Render one record in a worker process
+
+    Args:
+        record (dict): Record from read_texts
+        engine_name (str): "auto", "pyttsx3" or "gtts"
+        output_dir (str): Directory to write the audio file to
+
+    Returns:
+        dict: Manifest entry for the record, with "error" set if it failed
+    """
+    speech_output = _worker["speech"]
+    entry = {"index": record["index"], "id": record["id"], "text": record["text"], "language": record["language"]}
+    start = time.perf_counter()
+    text = speech_output.clean_text(record["text"])
+    if not text:
+        entry["error"] = "nothing to say after cleaning"
+        return entry
+
+    errors = []
+    if engine_name in ("auto", "pyttsx3"):
+        path = os.path.join(output_dir, file_stem(record) + ".wav")
+        try:
+            _render_pyttsx3(text, path)
+            entry.update(engine="pyttsx3", file=os.path.basename(path))
+        except Exception as e:
+            errors.append(f"pyttsx3: {e}")
+    if "file" not in entry and engine_name in ("auto", "gtts"):
+        path = os.path.join(output_dir, file_stem(record) + ".mp3")
+        try:
+            _render_gtts(text, record["language"], path)
+            entry.update(engine="gtts", file=os.path.basename(path))
+        except Exception as e:
+            errors.append(f"gtts: {e}")
+
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    if "file" in entry:
+        entry["bytes"] = os.path.getsize(path)
+        entry["voice"] = voice_key(entry["engine"], record)
+    else:
+        entry["error"] = "; ".join(errors)
+    return entry
+
+
+def load_manifest(output_dir):
+    """Return the entries of an earlier manifest, keyed by file stem"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            items = json.load(f).get("items", [])
+    except (OSError, ValueError):
+        return {}
+    return {os.path.splitext(item["file"])[0]: item for item in items if item.get("file")}
+
+
+def render_all(records, output_dir, engine_name="auto", workers=None, force=False, progress=None):
+    """
+    Render records to audio files on a process pool and write the manifest
+
+    Args:
+        records (list): Records from read_texts
+        output_dir (str): Directory for the audio files and manifest
+        engine_name (str): "auto", "pyttsx3" or "gtts"
+        workers (int): Worker processes, defaults to the number of cores
+        force (bool): Render again even if an up-to-date file exists
+        progress (callable): Called with each finished manifest entry
+
+    Returns:
+        dict: The manifest, with a summary and one entry per record
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    previous = {} if force else load_manifest(output_dir)
+
+    entries, pending = [], []
+    for record in records:
+        old = previous.get(file_stem(record))
+        if (old and old.get("voice") == voice_key(old["engine"], record)
+                and os.path.exists(os.path.join(output_dir, old["file"]))):
+            entries.append(dict(old, index=record["index"], skipped=True))
+        else:
+            pending.append(record)
+
+    start = time.perf_counter()
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker,
+                                 initargs=(engine_name,)) as pool:
+            futures = [pool.submit(render_one, record, engine_name, output_dir) for record in pending]
+            for future in as_completed(futures):
+                entry = future.result()
+                entries.append(entry)
+                if progress:
+                    progress(entry)
+    seconds = time.perf_counter() - start
+
+    entries.sort(key=lambda entry: entry["index"])
+    rendered = [e for e in entries if "file" in e and not e.get("skipped")]
+    manifest = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "engine": engine_name,
+        "workers": workers,
+        "rendered": len(rendered),
+        "skipped": sum(1 for e in entries if e.get("skipped")),
+        "failed": sum(1 for e in entries if "error" in e),
+        "seconds": round(seconds, 3),
+        "items_per_second": round(len(rendered) / seconds, 2) if seconds and rendered else 0.0,
+        "items": entries
+    }
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render texts to Zoya speech audio files on all cores.")
+    parser.add_argument("input", help="JSON Lines file with texts (or batch.py output), or '-' for stdin")
+    parser.add_argument("-o", "--output", default="zoya_audio", help="Directory for audio files (default: zoya_audio)")
+    parser.add_argument("-l", "--language", default="en", help="Default language code (default: en)")
+    parser.add_argument("-e", "--engine", choices=ENGINES, default="auto",
+                        help="pyttsx3 (WAV, same voice as live speech), gtts (MP3), or auto: "
+                             "pyttsx3 with gTTS as fallback (default)")
+    parser.add_argument("-w", "--workers", type=int, help="Worker processes (default: number of cores)")
+    parser.add_argument("--force", action="store_true", help="Render every text again, even unchanged ones")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if args.input == "-":
+        records = read_texts(sys.stdin, args.language)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            records = read_texts(f, args.language)
+
+    def progress(entry):
+        status = f"❌ {entry['error']}" if "error" in entry else f"🎙️ {entry['file']} ({entry['seconds']}s)"
+        print(f"[{entry['index'] + 1}/{len(records)}] {status}")
+
+    manifest = render_all(records, args.output, args.engine, args.workers, args.force, progress)
+    print(f"✅ Rendered {manifest['rendered']} files ({manifest['skipped']} unchanged, {manifest['failed']} failed) "
+          f"in {manifest['seconds']}s with {manifest['workers']} workers "
+          f"({manifest['items_per_second']} files/s) -> {os.path.join(args.output, MANIFEST_FILE)}")
+    return 1 if manifest["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
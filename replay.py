@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Log-replay load generator for Zoya AI Assistant
+
+Turns the interaction log into a workload: the logged queries are sent
+again, in their original order and language, through the same routing,
+search, AI and translation stack, or through the local stand-ins in
+fake_services.py. Capacity changes can then be checked against the real
+query mix rather than synthetic queries.
+
+Arrivals are paced like the original traffic, time-compressed by a speed
+factor, or at a fixed rate, and are served by a pool of simulated users,
+each with its own conversation memory. Latency is measured from the
+scheduled arrival, so time spent waiting for a free user counts, as it
+would for a real one.
+
+Usage:
+    python replay.py --fake --speed 60 --users 8
+    python replay.py --fake --qps 5 --users 16 --since 2025-01-01 --mode voice
+    python replay.py --speed 0 --users 4 --limit 200     # real services, no pacing
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmark import summarize
+from metrics import percentile
+
+# Logged modes that went through process_query with the same mode
+PIPELINE_MODES = {"text", "voice", "batch", "server"}
+
+
+def load_workload(since=None, until=None, mode=None, language=None, limit=None):
+    """
+    Read logged queries, oldest first
+
+    Returns:
+        list: Dicts with the query, language, mode and logged time
+    """
+    import logger
+
+    workload = []
+    for entry in logger.query_logs(since, until, mode, language, limit=limit):
+        query = (entry.get("user_query") or "").strip()
+        if not query:
+            continue
+        try:
+            logged_at = datetime.strptime(entry["timestamp"], logger.TIMESTAMP_FORMAT).timestamp()
+        except (KeyError, TypeError, ValueError):
+            logged_at = None
+        workload.append({
+            "query": query,
+            "language": entry.get("language") or "en",
+            "mode": entry.get("mode") or "text",
+            "logged_at": logged_at
+        })
+    return workload
+
+
+def schedule(workload, speed=1.0, qps=None, max_gap=None):
+    """
+    Work out when each query is sent, in seconds from the start of the replay
+
+    Args:
+        workload (list): Queries from load_workload
+        speed (float): Time compression of the original pacing; 0 sends
+            everything at once and lets the users pull queries as fast as they can
+        qps (float): Fixed arrival rate, instead of the original pacing
+        max_gap (float): Longest idle gap kept from the original pacing, in
+            replay seconds, so quiet nights do not stall the replay
+
+    Returns:
+        list: Arrival offsets, one per query
+    """
+    if qps:
+        return [i / qps for i in range(len(workload))]
+    if not speed:
+        return [0.0] * len(workload)
+
+    offsets, offset, previous = [], 0.0, None
+    for item in workload:
+        logged_at = item["logged_at"]
+        if previous is not None and logged_at is not None:
+            gap = max(0.0, logged_at - previous) / speed
+            offset += min(gap, max_gap) if max_gap is not None else gap
+        if logged_at is not None:
+            previous = logged_at
+        offsets.append(offset)
+    return offsets
+
+
+def _cache_counters():
+    """Return the cache and request-sharing counters recorded so far"""
+    import metrics
+    return {series: value for series, value in metrics.snapshot()["counters"].items()
+            if series.startswith(("zoya_cache_", "zoya_coalesced_"))}
+
+
+def cache_report(before, after):
+    """
+    Summarize cache activity between two counter snapshots
+
+    Returns:
+        dict: Hits, misses, bypasses and hit rate per cache, plus shared requests per backend
+    """
+    report = {}
+    for series, value in after.items():
+        delta = value - before.get(series, 0)
+        if not delta:
+            continue
+        name = series.split("{", 1)[0]
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', series))
+        if name == "zoya_coalesced_requests_total":
+            report.setdefault("coalesced", {})[labels.get("backend", "")] = delta
+            continue
+        kind = {"zoya_cache_hits_total": "hits", "zoya_cache_misses_total": "misses",
+                "zoya_cache_bypass_total": "bypassed"}.get(name)
+        if kind:
+            cache = report.setdefault(labels.get("cache", ""), {"hits": 0, "misses": 0, "bypassed": 0})
+            cache[kind] += delta
+    for cache in report.values():
+        if "hits" in cache:
+            looked_up = cache["hits"] + cache["misses"]
+            cache["hit_rate"] = round(cache["hits"] / looked_up, 4) if looked_up else 0.0
+    return report
+
+
+def run_replay(workload, offsets, users=4, stream=False):
+    """
+    Replay queries at their scheduled offsets on a pool of simulated users
+
+    Args:
+        workload (list): Queries from load_workload
+        offsets (list): Arrival offsets from schedule
+        users (int): Simulated users, each answering one query at a time
+        stream (bool): Stream AI replies and record time to first token
+
+    Returns:
+        dict: Throughput, latency percentiles, per-stage summaries and failures
+    """
+    from pipeline import process_query, search_web
+    from ai_engine import new_memory
+
+    local = threading.local()
+    samples = {"turn": [], "service": [], "queued": [], "send_lag": []}
+    stages = {}
+    routes = {}
+    stats = {"failed": 0}
+    lock = threading.Lock()
+
+    def run_turn(item, due, sent_at):
+        # Each worker thread is one user, keeping its own conversation
+        if not hasattr(local, "memory"):
+            local.memory = new_memory()
+        first_token = {}
+        started = time.perf_counter()
+
+        def on_delta(text):
+            first_token.setdefault("at", time.perf_counter())
+
+        ok, timings = True, {}
+        try:
+            if item["mode"] in PIPELINE_MODES:
+                result = process_query(item["query"], item["language"], mode=item["mode"], memory=local.memory,
+                                       log=False, on_delta=on_delta if stream else None)
+                ok, timings, route = result["ok"], result["timings"], result["route"]
+            else:
+                # Live search mode asks DuckDuckGo directly
+                ok, route = bool(search_web(item["query"])), "live"
+        except Exception as e:
+            print(f"Replayed query failed: {e}", file=sys.stderr)
+            ok, route = False, "error"
+        done = time.perf_counter()
+
+        with lock:
+            samples["turn"].append((done - due) * 1000)
+            samples["service"].append((done - started) * 1000)
+            samples["queued"].append((started - due) * 1000)
+            samples["send_lag"].append((sent_at - due) * 1000)
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds * 1000)
+            if "at" in first_token:
+                stages.setdefault("ai_first_token", []).append((first_token["at"] - started) * 1000)
+            routes[route] = routes.get(route, 0) + 1
+            if not ok:
+                stats["failed"] += 1
+
+    before = _cache_counters()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="zoya-user") as executor:
+        for item, offset in zip(workload, offsets):
+            due = start + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run_turn, item, due, time.perf_counter())
+    elapsed = time.perf_counter() - start
+
+    latency = {}
+    for name, values in samples.items():
+        latency[name] = {
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(max(values), 3) if values else 0.0
+        }
+    span = offsets[-1] if offsets else 0.0
+    return {
+        "queries": len(workload),
+        "users": users,
+        "stream": stream,
+        "scheduled_seconds": round(span, 3),
+        "offered_qps": round(len(workload) / span, 3) if span else None,
+        "seconds": round(elapsed, 3),
+        "throughput_qps": round(len(workload) / elapsed, 3) if elapsed else 0.0,
+        "failed": stats["failed"],
+        "routes": routes,
+        "latency": latency,
+        "stages": summarize(stages),
+        "caches": cache_report(before, _cache_counters())
+    }
+
+
+def print_report(report):
+    """Print throughput, latency and cache hit rates"""
+    offered = f", offered {report['offered_qps']} q/s" if report["offered_qps"] else ""
+    print(f"\n🔁 Replayed {report['queries']} queries with {report['users']} users in {report['seconds']}s: "
+          f"{report['throughput_qps']} q/s{offered}, {report['failed']} failed")
+    print(f"{'latency':<16}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+    for name, s in list(report["latency"].items()) + list(report["stages"].items()):
+        print(f"{name:<16}{s['p50_ms']:>11.2f}{s['p95_ms']:>11.2f}{s['p99_ms']:>11.2f}{s['max_ms']:>11.2f}")
+    print("Routes: " + ", ".join(f"{route} {count}" for route, count in sorted(report["routes"].items())))
+    for cache, counts in report["caches"].items():
+        if cache == "coalesced":
+            print("Shared requests: " + ", ".join(f"{backend} {n}" for backend, n in counts.items()))
+        else:
+            print(f"Cache {cache}: {counts['hit_rate'] * 100:.1f}% hit rate "
+                  f"({counts['hits']} hits, {counts['misses']} misses, {counts['bypassed']} bypassed)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay logged Zoya queries as a load test.")
+    parser.add_argument("--since", help="Earliest logged timestamp to replay, e.g. 2025-01-31")
+    parser.add_argument("--until", help="Latest logged timestamp; a bare date includes the whole day")
+    parser.add_argument("--mode", help="Only replay queries logged in this mode")
+    parser.add_argument("--language", help="Only replay queries in this language code")
+    parser.add_argument("--limit", type=int, help="Replay at most this many queries")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay the original pacing this many times faster (default: 1); "
+                             "0 sends queries as fast as the users can take them")
+    parser.add_argument("--qps", type=float, help="Send queries at this fixed rate instead of the original pacing")
+    parser.add_argument("--max-gap", type=float, default=60.0,
+                        help="Longest idle gap kept from the original pacing, in replay seconds (default: 60)")
+    parser.add_argument("-u", "--users", type=int, default=4, help="Simulated users answering at once (default: 4)")
+    parser.add_argument("--stream", action="store_true", help="Stream AI replies and measure time to first token")
+    parser.add_argument("--fake", action="store_true", help="Answer from the local stand-ins in fake_services.py")
+    parser.add_argument("--openrouter", default="latency_ms=400,jitter_ms=100", help="Fake OpenRouter profile")
+    parser.add_argument("--mymemory", default="latency_ms=80,jitter_ms=20", help="Fake MyMemory profile")
+    parser.add_argument("--ddgs", default="latency_ms=250,jitter_ms=60", help="Fake DDGS profile")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Always ask the model, even for repeated questions")
+    parser.add_argument("-o", "--output", help="Also save the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.users < 1:
+        parser.error("--users must be at least 1")
+    if args.speed < 0 or (args.qps is not None and args.qps <= 0):
+        parser.error("--speed and --qps must be positive")
+
+    workload = load_workload(args.since, args.until, args.mode, args.language, args.limit)
+    if not workload:
+        print("No logged queries match; nothing to replay.")
+        return 1
+    offsets = schedule(workload, args.speed, args.qps, args.max_gap)
+
+    # Replayed turns and their AI requests stay out of the real telemetry
+    import telemetry
+    telemetry.TELEMETRY_DB = os.path.join(tempfile.mkdtemp(prefix="zoya-replay-"), "zoya_telemetry.db")
+
+    if args.no_answer_cache:
+        import ai_engine
+        ai_engine.answer_cache.enabled = False
+
+    print(f"🔁 Replaying {len(workload)} logged queries over {offsets[-1]:.1f}s with {args.users} users"
+          f"{' against fake services' if args.fake else ''}")
+    if args.fake:
+        from fake_services import FakeServices, FakeProfile
+
+        # The fakes have no quotas, so they are not rate limited
+        import outbound
+        for backend in outbound.BACKENDS:
+            outbound.configure(backend, 0)
+
+        profiles = {name: FakeProfile.parse(getattr(args, name)) for name in ("openrouter", "mymemory", "ddgs")}
+        with FakeServices(**profiles) as fakes:
+            fakes.install()
+            report = run_replay(workload, offsets, args.users, args.stream)
+            report["service_calls"] = dict(sorted(fakes.counts.items()))
+    else:
+        report = run_replay(workload, offsets, args.users, args.stream)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"💾 Saved report to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
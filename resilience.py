@@ -0,0 +1,126 @@
+"""
+Retry, circuit breaker and latency tracking helpers for Zoya AI Assistant
+
+Used by the AI engine to cap tail latency when a model is slow, rate-limited
+or down: jittered backoff between retries, a breaker per model that stops
+sending traffic to a failing one, and a rolling p95 that decides when to send
+a hedged second request.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+# HTTP statuses worth retrying: rate limits and transient server errors
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """
+    Return a "full jitter" exponential backoff delay
+
+    Args:
+        attempt (int): Zero-based retry attempt
+        base (float): Delay scale in seconds
+        cap (float): Maximum delay in seconds
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(response, cap=8.0):
+    """Return the Retry-After header of a response in seconds, or None"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return min(cap, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing dependency for a cool-down period
+
+    Closed: calls flow normally. After failure_threshold consecutive failures
+    the breaker opens and rejects calls for reset_timeout seconds. It then
+    half-opens and lets a single trial call through; success closes it,
+    failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may be made now"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a half-open trial whose call ended with no verdict, e.g. when cancelled"""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.trial_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies with percentile lookup"""
+
+    def __init__(self, window=200, default=2.0, min_samples=20):
+        """
+        Args:
+            window (int): Number of recent samples kept
+            default (float): Value returned until enough samples exist
+            min_samples (int): Samples needed before percentiles are trusted
+        """
+        self.samples = deque(maxlen=window)
+        self.default = default
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        """Return the pct-th percentile of recent samples, or the default"""
+        with self.lock:
+            if len(self.samples) < self.min_samples:
+                return self.default
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Multi-session HTTP/WebSocket server mode for Zoya AI Assistant
+
+Hosts many concurrent sessions in one process using only the standard library.
+Each session has its own conversation memory, language and interrupt flag,
+while the HTTP connection pool and module-level caches are shared.
+
+HTTP endpoints (JSON bodies):
+    GET    /health                    Server and session stats
+    GET    /metrics                   Prometheus text-format metrics
+    POST   /sessions                  Create a session {"language": "en"}
+    DELETE /sessions/<id>             Close a session
+    POST   /sessions/<id>/query       Answer {"query": "..."} and return the full reply
+    POST   /sessions/<id>/stop        Interrupt the reply in progress
+    POST   /sessions/<id>/clear       Clear the session's memory
+
+WebSocket endpoint:
+    GET /ws[?session=<id>&language=<code>]
+
+    Client messages: {"type": "query", "query": "..."}, {"type": "stop"},
+    {"type": "clear"}, {"type": "language", "language": "hi"}
+    Server messages: {"type": "session", ...}, {"type": "delta", "text": "..."},
+    {"type": "done", ...}, {"type": "error", "error": "..."}
+
+Usage:
+    python server.py --host 127.0.0.1 --port 8765
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import ai_engine
+import diagnostics
+import metrics
+import telemetry
+from pipeline import process_query
+from sessions import SessionManager
+
+# Threads available for blocking pipeline work across all sessions
+SERVER_WORKERS = int(os.getenv("ZOYA_SERVER_WORKERS", "16"))
+
+# Seconds between idle-session sweeps
+SWEEP_INTERVAL = 60
+
+# Largest accepted HTTP body or WebSocket message in bytes
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+# WebSocket close code for a message larger than MAX_MESSAGE_SIZE
+WS_CLOSE_TOO_BIG = 1009
+
+HTTP_REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large"
+}
+
+
+class HTTPError(Exception):
+    """An error that maps directly to an HTTP status code"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _encode_frame(opcode, payload):
+    """Encode a single unmasked, unfragmented WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def _close_frame(code, reason):
+    """Encode a WebSocket close frame with a status code and reason"""
+    return _encode_frame(WS_CLOSE, struct.pack("!H", code) + reason.encode("utf-8"))
+
+
+async def _read_frame(reader):
+    """
+    Read one WebSocket frame from a client
+
+    Returns:
+        tuple: (fin, opcode, payload)
+    """
+    first, second = await reader.readexactly(2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_MESSAGE_SIZE:
+        raise HTTPError(413, "WebSocket message too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        # XOR the payload with the repeated 4-byte mask in one integer operation
+        key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+        payload = (int.from_bytes(payload, "big") ^ key).to_bytes(length, "big")
+    return fin, opcode, payload
+
+
+def _answer_for_session(session, query, on_delta):
+    """Run a session's query through the pipeline on a worker thread"""
+    with telemetry.session(session.id):
+        return process_query(query, session.language, mode="server", memory=session.memory,
+                             on_delta=on_delta, cancel=session.cancel)
+
+
+class ZoyaServer:
+    """Serves Zoya sessions over HTTP and WebSocket"""
+
+    def __init__(self, manager=None, workers=SERVER_WORKERS):
+        self.manager = manager or SessionManager()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zoya-turn")
+
+    async def serve(self, host, port):
+        """Run the server until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        sweeper = asyncio.create_task(self._sweep_forever())
+        print(f"🌐 Zoya server listening on http://{host}:{port} (WebSocket: ws://{host}:{port}/ws)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            self.manager.sweep()
+
+    async def handle_connection(self, reader, writer):
+        """Handle one client connection: a single HTTP request or a WebSocket"""
+        try:
+            method, path, query, headers, body = await self._read_request(reader)
+            if path == "/ws":
+                await self._handle_websocket(reader, writer, query, headers)
+            elif path == "/metrics" and method == "GET":
+                self._write_response(writer, 200, metrics.render_prometheus(), "text/plain; version=0.0.4")
+            else:
+                status, payload = await self._route(method, path, body)
+                self._write_response(writer, status, payload)
+        except HTTPError as e:
+            self._write_response(writer, e.status, {"error": str(e)})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_MESSAGE_SIZE:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return method.upper(), url.path.rstrip("/") or "/", query, headers, body
+
+    def _write_response(self, writer, status, payload, content_type="application/json"):
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+    async def _route(self, method, path, body):
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        parts = path.strip("/").split("/")
+
+        if path == "/health" and method == "GET":
+            return 200, {
+                "status": "ok",
+                "sessions": len(self.manager.sessions),
+                "memory_bytes": self.manager.memory_bytes(),
+                "llm_backends": ai_engine.router.stats(),
+                "diagnostics": diagnostics.running().sample() if diagnostics.running() else None
+            }
+
+        if parts[0] != "sessions":
+            raise HTTPError(404, f"No route for {path}")
+
+        if len(parts) == 1:
+            if method != "POST":
+                raise HTTPError(405, "Use POST to create a session")
+            session = self.manager.create(data.get("language", "en"))
+            return 201, {"session": session.id, "language": session.language}
+
+        session = self.manager.get(parts[1])
+        if session is None:
+            raise HTTPError(404, "Unknown or expired session")
+
+        action = parts[2] if len(parts) > 2 else None
+        if action is None and method == "DELETE":
+            self.manager.remove(session.id)
+            return 200, {"session": session.id, "closed": True}
+        if method != "POST" or action not in ("query", "stop", "clear"):
+            raise HTTPError(404, f"No route for {method} {path}")
+
+        if action == "stop":
+            session.cancel.set()
+            return 200, {"session": session.id, "stopped": True}
+        if action == "clear":
+            session.clear()
+            return 200, {"session": session.id, "cleared": True}
+
+        query = str(data.get("query", "")).strip()
+        if not query:
+            raise HTTPError(400, "Missing query")
+        return 200, await self._run_turn(session, query)
+
+    async def _run_turn(self, session, query, send=None):
+        """
+        Answer a query for a session on the worker pool
+
+        Args:
+            session (Session): The session asking
+            query (str): User's query
+            send (coroutine function): Receives streamed delta messages when given
+
+        Returns:
+            dict: The final "done" message
+        """
+        if session.busy:
+            raise HTTPError(409, "A reply is already in progress for this session")
+
+        loop = asyncio.get_running_loop()
+        deltas = asyncio.Queue()
+        on_delta = None
+        # Deltas are untranslated model output, so only stream them for English
+        if send and session.language == "en":
+            def on_delta(text):
+                loop.call_soon_threadsafe(deltas.put_nowait, text)
+
+        session.busy = True
+        session.cancel.clear()
+        try:
+            future = loop.run_in_executor(self.executor, functools.partial(
+                _answer_for_session, session, query, on_delta
+            ))
+            while not future.done():
+                getter = asyncio.ensure_future(deltas.get())
+                done, _ = await asyncio.wait({getter, future}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await send({"type": "delta", "text": getter.result()})
+                else:
+                    getter.cancel()
+            while not deltas.empty():
+                await send({"type": "delta", "text": deltas.get_nowait()})
+            result = await future
+        finally:
+            session.busy = False
+            session.touch()
+
+        return {
+            "type": "done",
+            "session": session.id,
+            "route": result["route"],
+            "response": result["response"],
+            "interrupted": result["cancelled"],
+            "timings_ms": {stage: round(seconds * 1000, 2) for stage, seconds in result["timings"].items()}
+        }
+
+    async def _handle_websocket(self, reader, writer, query, headers):
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or not key:
+            raise HTTPError(400, "Expected a WebSocket upgrade")
+
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode("latin-1"))
+
+        async def send(message):
+            writer.write(_encode_frame(WS_TEXT, json.dumps(message, ensure_ascii=False).encode("utf-8")))
+            await writer.drain()
+
+        session = self.manager.get(query["session"]) if "session" in query else None
+        if session is None:
+            session = self.manager.create(query.get("language", "en"))
+        await send({"type": "session", "session": session.id, "language": session.language})
+
+        turn = None
+        fragments, size = [], 0
+        try:
+            while True:
+                try:
+                    fin, opcode, payload = await _read_frame(reader)
+                except HTTPError as e:
+                    # The socket speaks WebSocket now, so an HTTP error response would be garbage
+                    writer.write(_close_frame(WS_CLOSE_TOO_BIG, str(e)))
+                    break
+                if opcode == WS_CLOSE:
+                    writer.write(_encode_frame(WS_CLOSE, payload[:2]))
+                    break
+                if opcode == WS_PING:
+                    writer.write(_encode_frame(WS_PONG, payload))
+                    continue
+                if opcode == WS_PONG:
+                    continue
+
+                fragments.append(payload)
+                size += len(payload)
+                if size > MAX_MESSAGE_SIZE:
+                    writer.write(_close_frame(WS_CLOSE_TOO_BIG, "WebSocket message too large"))
+                    break
+                if not fin:
+                    continue
+                message = b"".join(fragments)
+                fragments, size = [], 0
+
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    await send({"type": "error", "error": "Messages must be JSON"})
+                    continue
+                if not isinstance(data, dict):
+                    await send({"type": "error", "error": "Messages must be JSON objects"})
+                    continue
+
+                kind = data.get("type")
+                if kind == "stop":
+                    session.cancel.set()
+                elif kind == "clear":
+                    session.clear()
+                    await send({"type": "cleared", "session": session.id})
+                elif kind == "language":
+                    session.language = data.get("language", session.language)
+                    await send({"type": "session", "session": session.id, "language": session.language})
+                elif kind == "query":
+                    if turn and not turn.done():
+                        await send({"type": "error", "error": "A reply is already in progress"})
+                    else:
+                        turn = asyncio.create_task(self._websocket_turn(session, str(data.get("query", "")).strip(), send))
+                else:
+                    await send({"type": "error", "error": f"Unknown message type: {kind}"})
+        finally:
+            # The session outlives the socket so clients can reconnect; stop any reply in flight
+            session.cancel.set()
+            if turn:
+                await asyncio.gather(turn, return_exceptions=True)
+
+    async def _websocket_turn(self, session, query, send):
+        if not query:
+            await send({"type": "error", "error": "Missing query"})
+            return
+        try:
+            await send(await self._run_turn(session, query, send))
+        except HTTPError as e:
+            await send({"type": "error", "error": str(e)})
+        except ConnectionError:
+            session.cancel.set()
+        except Exception as e:
+            print(f"Server turn error: {e}")
+            await send({"type": "error", "error": "Internal error"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Zoya as a multi-session HTTP/WebSocket server.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Threads for concurrent replies")
+    parser.add_argument("--diagnostics", action="store_true", default=diagnostics.DIAGNOSTICS_ENABLED,
+                        help="Track memory, threads and open files per turn and report growing allocations")
+    args = parser.parse_args()
+
+    server = ZoyaServer(workers=args.workers)
+    if args.diagnostics:
+        # At a ceiling, idle sessions are evicted well below the normal limits and the rest trimmed
+        diagnostics.add_trimmer("sessions", server.manager.shrink)
+        diagnostics.start()
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Zoya server stopped.")
+
+
+if __name__ == "__main__":
+    main()
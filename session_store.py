@@ -0,0 +1,278 @@
+"""
+Durable conversation memory for Zoya AI Assistant
+
+Each session is a directory holding an append-only journal of memory changes
+and a periodic snapshot of the history window, the recent messages that are
+actually sent to the model. Every turn appends a line to the journal instead
+of rewriting the conversation, and resuming reads the snapshot plus the few
+journal records written after it, so it takes the same time however long the
+conversation has been. The full journal stays on disk as the session history.
+
+Layout of SESSIONS_DIR:
+    LATEST                      id of the most recently used session
+    <session id>/journal.jsonl  one memory change per line
+    <session id>/snapshot.json  history window and the journal offset it covers
+
+Usage:
+    memory = SessionStore().open()            # resume the latest session
+    memory = SessionStore().open("work")      # resume or start "work"
+    memory.append({"role": "user", "content": "hi"})
+"""
+
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+
+# Directory holding one subdirectory per saved session
+SESSIONS_DIR = os.getenv("ZOYA_SESSIONS_DIR", "zoya_sessions")
+
+# Journal records between snapshots; resuming replays at most this many
+SNAPSHOT_EVERY = int(os.getenv("ZOYA_SESSION_SNAPSHOT_EVERY", "20"))
+
+# Flush journal writes to disk before returning (slower, survives power loss)
+SESSION_FSYNC = os.getenv("ZOYA_SESSION_FSYNC", "0") == "1"
+
+LATEST_FILE = "LATEST"
+JOURNAL_FILE = "journal.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _trim_window(messages, window):
+    """Drop the oldest messages beyond the window, never starting on a reply"""
+    if window and len(messages) > window:
+        del messages[:len(messages) - window]
+    while messages and messages[0]["role"] == "assistant":
+        del messages[0]
+
+
+class JournaledMemory(list):
+    """
+    Conversation memory that records every change in its session journal
+
+    Behaves like the plain list of messages the AI engine expects, with the
+    system message first. Only the history window is kept in memory; older
+    messages live on in the journal.
+    """
+
+    def __init__(self, session_id, directory, messages, system_message, window,
+                 seq=0, offset=0, snapshot_every=SNAPSHOT_EVERY):
+        super().__init__([system_message] + messages)
+        self.session_id = session_id
+        self.directory = directory
+        self.window = window
+        self.seq = seq
+        self.snapshot_seq = seq
+        self.snapshot_every = snapshot_every
+        self.lock = threading.RLock()
+        self.journal = open(os.path.join(directory, JOURNAL_FILE), "ab")
+        self.journal.seek(0, os.SEEK_END)
+        if self.journal.tell() != offset:
+            # Records after the snapshot were replayed, so snapshot again from here
+            self.snapshot()
+
+    # Recording
+
+    def _record(self, op, **fields):
+        line = json.dumps(dict(fields, op=op), ensure_ascii=False) + "\n"
+        with self.lock:
+            self.journal.write(line.encode("utf-8"))
+            self.journal.flush()
+            if SESSION_FSYNC:
+                os.fsync(self.journal.fileno())
+            self.seq += 1
+            if self.seq - self.snapshot_seq >= self.snapshot_every:
+                self.snapshot()
+
+    def _trim(self):
+        history = list.__getitem__(self, slice(1, None))
+        _trim_window(history, self.window)
+        list.__setitem__(self, slice(1, None), history)
+
+    def snapshot(self):
+        """Save the history window and how much of the journal it covers"""
+        with self.lock:
+            self.journal.flush()
+            state = {
+                "session": self.session_id,
+                "seq": self.seq,
+                "offset": self.journal.tell(),
+                "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "messages": list.__getitem__(self, slice(1, None))
+            }
+            _write_atomic(os.path.join(self.directory, SNAPSHOT_FILE), json.dumps(state, ensure_ascii=False))
+            self.snapshot_seq = self.seq
+
+    def close(self):
+        """Snapshot and close the journal"""
+        with self.lock:
+            if not self.journal.closed:
+                self.snapshot()
+                self.journal.close()
+
+    # List operations that change the conversation
+
+    def append(self, message):
+        with self.lock:
+            super().append(message)
+            if message.get("role") != "system":
+                self._record("append", message=message)
+            self._trim()
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def __iadd__(self, messages):
+        self.extend(messages)
+        return self
+
+    def pop(self, index=-1):
+        with self.lock:
+            last = index in (-1, len(self) - 1)
+            message = super().pop(index)
+            if last:
+                self._record("pop")
+            else:
+                self._record("reset", messages=self[1:])
+            return message
+
+    def __delitem__(self, index):
+        with self.lock:
+            super().__delitem__(index)
+            if len(self) <= 1:
+                self._record("clear")
+            else:
+                self._record("reset", messages=self[1:])
+
+    def clear(self):
+        """Forget the conversation, keeping the system message"""
+        del self[1:]
+
+    def insert(self, index, message):
+        with self.lock:
+            super().insert(index, message)
+            self._record("reset", messages=self[1:])
+
+    def __setitem__(self, index, value):
+        with self.lock:
+            super().__setitem__(index, value)
+            self._record("reset", messages=self[1:])
+
+
+class SessionStore:
+    """Creates, resumes and lists journaled conversation sessions"""
+
+    def __init__(self, directory=SESSIONS_DIR, window=None, snapshot_every=SNAPSHOT_EVERY):
+        """
+        Args:
+            directory (str): Directory holding the sessions
+            window (int): Messages kept in memory and sent to the model,
+                defaults to the AI engine's history window
+            snapshot_every (int): Journal records between snapshots
+        """
+        if window is None:
+            from ai_engine import HISTORY_MESSAGES
+            window = HISTORY_MESSAGES
+        self.directory = directory
+        self.window = window
+        self.snapshot_every = snapshot_every
+
+    def latest(self):
+        """Return the id of the most recently used session, or None"""
+        try:
+            with open(os.path.join(self.directory, LATEST_FILE), "r", encoding="utf-8") as f:
+                session_id = f.read().strip()
+        except OSError:
+            return None
+        return session_id if session_id and os.path.isdir(os.path.join(self.directory, session_id)) else None
+
+    def list_sessions(self):
+        """Return (session id, last updated) pairs, most recent first"""
+        sessions = []
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                snapshot = os.path.join(self.directory, name, SNAPSHOT_FILE)
+                if os.path.exists(snapshot):
+                    with open(snapshot, "r", encoding="utf-8") as f:
+                        sessions.append((name, json.load(f).get("updated", "")))
+        return sorted(sessions, key=lambda item: item[1], reverse=True)
+
+    def open(self, session_id=None, resume=True, system_message=None):
+        """
+        Open a session's memory, resuming it if it already exists
+
+        Args:
+            session_id (str): Session to open; defaults to the latest one when
+                resuming, or a new id otherwise
+            resume (bool): Whether to resume the latest session when no id is given
+            system_message (dict): System message to start the memory with
+
+        Returns:
+            JournaledMemory: The session's memory
+        """
+        if system_message is None:
+            from ai_engine import new_memory
+            system_message = new_memory()[0]
+        if session_id is None and resume:
+            session_id = self.latest()
+        if session_id is None:
+            session_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        if not re.fullmatch(r"[\w.-]+", session_id) or session_id.startswith("."):
+            raise ValueError(f"Invalid session name: {session_id!r}")
+
+        path = os.path.join(self.directory, session_id)
+        os.makedirs(path, exist_ok=True)
+        messages, seq, offset = self._load(path)
+
+        memory = JournaledMemory(session_id, path, messages, system_message, self.window,
+                                 seq=seq, offset=offset, snapshot_every=self.snapshot_every)
+        _write_atomic(os.path.join(self.directory, LATEST_FILE), session_id)
+        return memory
+
+    def _load(self, path):
+        """Read the snapshot and replay the journal records written after it"""
+        messages, seq, offset = [], 0, 0
+        snapshot = os.path.join(path, SNAPSHOT_FILE)
+        if os.path.exists(snapshot):
+            with open(snapshot, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            messages, seq, offset = state["messages"], state["seq"], state["offset"]
+
+        journal = os.path.join(path, JOURNAL_FILE)
+        if not os.path.exists(journal):
+            return messages, seq, 0
+        with open(journal, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A record cut short by a crash is dropped
+                    break
+                offset += len(line)
+                seq += 1
+                op = record.get("op")
+                if op == "append":
+                    messages.append(record["message"])
+                elif op == "pop" and messages:
+                    messages.pop()
+                elif op == "clear":
+                    messages = []
+                elif op == "reset":
+                    messages = record["messages"]
+                _trim_window(messages, self.window)
+        if offset != os.path.getsize(journal):
+            # Cut off a torn final record so new records start on a clean line
+            with open(journal, "r+b") as f:
+                f.truncate(offset)
+        return messages, seq, offset
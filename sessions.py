@@ -0,0 +1,173 @@
+"""
+Per-session state for Zoya AI Assistant server mode
+
+Each session owns its conversation memory, language and cancel token, so
+many users can talk to one process without sharing chat_memory or stop_flag.
+Idle sessions are evicted when they expire or when total memory use exceeds
+a cap.
+"""
+
+import os
+import threading
+import time
+import uuid
+
+from ai_engine import new_memory, trim_history
+from utils import CancelToken
+
+# Seconds a session may stay idle before it is evicted
+SESSION_IDLE_TTL = float(os.getenv("ZOYA_SESSION_IDLE_TTL", "1800"))
+
+# Approximate bytes of conversation memory held across all sessions
+SESSION_MEMORY_CAP = int(os.getenv("ZOYA_SESSION_MEMORY_CAP", str(64 * 1024 * 1024)))
+
+# Hard limit on the number of live sessions
+MAX_SESSIONS = int(os.getenv("ZOYA_MAX_SESSIONS", "1000"))
+
+# Share of the sessions and of the memory cap kept when the process hits a resource ceiling
+SESSION_TRIM_KEEP = float(os.getenv("ZOYA_SESSION_TRIM_KEEP", "0.5"))
+
+
+class Session:
+    """Conversation state owned by a single connected user"""
+
+    def __init__(self, session_id, language="en"):
+        self.id = session_id
+        self.language = language
+        self.memory = new_memory()
+        self.cancel = CancelToken()
+        self.busy = False
+        self.last_active = time.monotonic()
+
+    def touch(self):
+        """Mark the session as active now"""
+        self.last_active = time.monotonic()
+
+    def memory_bytes(self):
+        """Approximate the size of the conversation memory in bytes"""
+        return sum(len(msg["content"].encode("utf-8")) + 32 for msg in self.memory)
+
+    def clear(self):
+        """Clear the conversation memory, keeping only the system message"""
+        del self.memory[1:]
+
+
+class SessionManager:
+    """Creates, looks up and evicts sessions"""
+
+    def __init__(self, idle_ttl=SESSION_IDLE_TTL, memory_cap=SESSION_MEMORY_CAP, max_sessions=MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.memory_cap = memory_cap
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def create(self, language="en", session_id=None):
+        """
+        Create a new session, evicting idle ones first if limits are reached
+
+        Args:
+            language (str): Language code for the session
+            session_id (str): Optional caller-chosen session id
+
+        Returns:
+            Session: The new session
+        """
+        session = Session(session_id or uuid.uuid4().hex, language)
+        with self.lock:
+            self.sessions[session.id] = session
+            # Even when busy sessions keep the limits exceeded, the new one is not evicted
+            self._evict_locked(keep=session)
+        return session
+
+    def get(self, session_id):
+        """Return the session with the given id and mark it active, or None"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session:
+            session.touch()
+        return session
+
+    def remove(self, session_id):
+        """Remove a session, returning True if it existed"""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session:
+            session.cancel.set()
+        return session is not None
+
+    def sweep(self):
+        """Evict expired sessions and enforce the memory cap
+
+        Returns:
+            list: Ids of the evicted sessions
+        """
+        with self.lock:
+            return self._evict_locked()
+
+    def shrink(self, keep=SESSION_TRIM_KEEP):
+        """
+        Free session memory well below the normal limits, for resource ceilings
+
+        Evicts least recently used idle sessions until at most keep of them
+        remain and their memory is under keep times the cap, then drops the
+        history outside the context window from every idle session left.
+
+        Args:
+            keep (float): Share of the sessions and of the memory cap to keep
+
+        Returns:
+            list: Ids of the evicted sessions
+        """
+        with self.lock:
+            evicted = self._evict_locked()
+            max_sessions = int(len(self.sessions) * keep)
+            memory_cap = self.memory_cap * keep
+            idle = sorted((s for s in self.sessions.values() if not s.busy), key=lambda s: s.last_active)
+            total = sum(s.memory_bytes() for s in self.sessions.values())
+            dropped = []
+            for session in idle:
+                if total <= memory_cap and len(self.sessions) <= max_sessions:
+                    break
+                total -= session.memory_bytes()
+                dropped.append(self.sessions.pop(session.id))
+            # Busy sessions are skipped: their memory is in use by a reply
+            remaining = [s for s in self.sessions.values() if not s.busy]
+        for session in dropped:
+            session.cancel.set()
+        for session in remaining:
+            trim_history(session.memory)
+        if dropped:
+            print(f"🧹 Evicted {len(dropped)} idle session(s) to free memory")
+        return evicted + [session.id for session in dropped]
+
+    def memory_bytes(self):
+        """Approximate conversation memory held by all sessions in bytes"""
+        with self.lock:
+            sessions = list(self.sessions.values())
+        return sum(session.memory_bytes() for session in sessions)
+
+    def _evict_locked(self, keep=None):
+        now = time.monotonic()
+        evicted = []
+
+        # Expired sessions go first
+        for session in list(self.sessions.values()):
+            if not session.busy and now - session.last_active > self.idle_ttl:
+                evicted.append(self.sessions.pop(session.id))
+
+        # Then least recently used idle sessions until back under the limits
+        idle = sorted((s for s in self.sessions.values() if not s.busy and s is not keep),
+                      key=lambda s: s.last_active)
+        total = sum(s.memory_bytes() for s in self.sessions.values())
+        for session in idle:
+            if total <= self.memory_cap and len(self.sessions) <= self.max_sessions:
+                break
+            total -= session.memory_bytes()
+            evicted.append(self.sessions.pop(session.id))
+
+        for session in evicted:
+            session.cancel.set()
+        if evicted:
+            print(f"🧹 Evicted {len(evicted)} idle session(s)")
+        return [session.id for session in evicted]
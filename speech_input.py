@@ -12,56 +12,90 @@ except ImportError:
     print("Warning: speech_recognition not available. Voice input will be disabled.")
     SR_AVAILABLE = False
 
+# Language mapping for speech recognition
+LANGUAGE_CODES = {
+    "en": "en-US",
+    "hi": "hi-IN",
+    "te": "te-IN",
+    "ta": "ta-IN",
+    "es": "es-ES",
+    "fr": "fr-FR"
+}
 
-def get_voice_input(language="en"):
+
+def listen(recognizer, source):
+    """
+    Record one phrase from an open microphone
+
+    Returns:
+        AudioData: The phrase, or None if nobody spoke
+    """
+    print("Listening...")
+    try:
+        return recognizer.listen(source, timeout=5, phrase_time_limit=10)
+    except sr.WaitTimeoutError:
+        print("Listening timed out")
+        return None
+    except Exception as e:
+        print(f"Error in speech recognition: {e}")
+        return None
+
+
+def recognize(recognizer, audio, language="en"):
+    """
+    Convert recorded audio to text
+
+    Args:
+        recognizer (Recognizer): speech_recognition recognizer
+        audio (AudioData): Recorded speech
+        language (str): Language code for speech recognition
+
+    Returns:
+        str: Transcribed text or None if failed
+    """
+    print("Processing...")
+    try:
+        return recognizer.recognize_google(audio, language=LANGUAGE_CODES.get(language, "en-US"))
+    except sr.UnknownValueError:
+        print("Could not understand audio")
+        return None
+    except sr.RequestError as e:
+        print(f"Could not request results; {e}")
+        return None
+    except Exception as e:
+        print(f"Error in speech recognition: {e}")
+        return None
+
+
+def get_voice_input(language="en", source=None, recognizer=None, audio=None):
     """
     Capture voice input from microphone and convert to text
-    
+
     Args:
         language (str): Language code for speech recognition
-        
+        source (Microphone): Microphone that is already open and calibrated;
+            by default one is opened and calibrated for this phrase
+        recognizer (Recognizer): Recognizer calibrated for source
+        audio (AudioData): Speech captured already, e.g. by barge-in, to
+            transcribe instead of listening
+
     Returns:
         str: Transcribed text or None if failed
     """
     if not SR_AVAILABLE:
         print("Speech recognition not available.")
         return None
-        
-    recognizer = sr.Recognizer()
-    
-    with sr.Microphone() as source:
-        print("Adjusting for ambient noise...")
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-        print("Listening...")
-        
-        try:
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
-            print("Processing...")
-            
-            # Language mapping for speech recognition
-            lang_map = {
-                "en": "en-US",
-                "hi": "hi-IN",
-                "te": "te-IN",
-                "ta": "ta-IN",
-                "es": "es-ES",
-                "fr": "fr-FR"
-            }
-            
-            language_code = lang_map.get(language, "en-US")
-            
-            text = recognizer.recognize_google(audio, language=language_code)
-            return text
-            
-        except sr.WaitTimeoutError:
-            print("Listening timed out")
-            return None
-        except sr.UnknownValueError:
-            print("Could not understand audio")
-            return None
-        except sr.RequestError as e:
-            print(f"Could not request results; {e}")
-            return None
-        except Exception as e:
-            print(f"Error in speech recognition: {e}")
-            return None
\ No newline at end of file
+
+    recognizer = recognizer or sr.Recognizer()
+
+    if audio is None and source is None:
+        with sr.Microphone() as source:
+            print("Adjusting for ambient noise...")
+            recognizer.adjust_for_ambient_noise(source, duration=1)
+            audio = listen(recognizer, source)
+    elif audio is None:
+        audio = listen(recognizer, source)
+
+    if audio is None:
+        return None
+    return recognize(recognizer, audio, language)
@@ -6,11 +6,10 @@ import threading
 import time
 import os
 import re
-import pyttsx3
-from gtts import gTTS
-import pygame
+import tempfile
 import keyboard
-from utils import stop_flag
+import metrics
+from utils import Cancelled, run_cancellable, stop_flag
 
 # Try to import pyttsx3
 try:
@@ -29,10 +28,24 @@ except ImportError:
     print("Warning: gTTS or pygame not available. Speech output may be limited.")
     GTTS_AVAILABLE = False
 
+# pyttsx3 voice settings, shared by live speech and offline rendering (render_speech.py)
+FEMALE_VOICE_NAMES = ("female", "zira", "heera", "eva")
+VOICE_RATE = 130  # 🐢 normal is ~200; slower is easier to follow
+VOICE_VOLUME = 0.9  # 0.0 to 1.0
+
 # Global variables for speech control
 engine = None
 is_speaking = False
 
+# The pygame mixer and the spacebar monitor are started once and reused by every utterance
+_mixer_lock = threading.Lock()
+_mixer_ready = False
+_playing = threading.Event()
+_monitor = None
+
+# Set while an utterance can actually be heard, after synthesis, for barge-in echo calibration
+audible = threading.Event()
+
 
 def clean_text(text):
     """
@@ -57,6 +70,28 @@ def clean_text(text):
     return cleaned
 
 
+def configure_voice(tts_engine):
+    """Give a pyttsx3 engine Zoya's female voice, slower speed and volume"""
+    # Set properties for female voice
+    voices = tts_engine.getProperty('voices')
+    # Try to find a female voice
+    female_voice_found = False
+    for voice in voices:
+        name = voice.name.lower()
+        if any(hint in name for hint in FEMALE_VOICE_NAMES):
+            tts_engine.setProperty('voice', voice.id)
+            female_voice_found = True
+            break
+
+    # If no female voice found, try to find any voice
+    if not female_voice_found and voices:
+        tts_engine.setProperty('voice', voices[0].id)
+
+    tts_engine.setProperty('rate', VOICE_RATE)
+    tts_engine.setProperty('volume', VOICE_VOLUME)
+    return tts_engine
+
+
 def init_tts_engine():
     """Initialize the TTS engine with female voice and slower speed"""
     global engine
@@ -64,28 +99,8 @@ def init_tts_engine():
         return None
         
     if engine is None:
-        engine = pyttsx3.init()
-        
-        # Set properties for female voice
-        voices = engine.getProperty('voices')
-        # Try to find a female voice
-        female_voice_found = False
-        for voice in voices:
-            name = voice.name.lower()
-            if "female" in name or "zira" in name or "heera" in name or "eva" in name:
-                engine.setProperty('voice', voice.id)
-                female_voice_found = True
-                break
-        
-        # If no female voice found, try to find any voice
-        if not female_voice_found and voices:
-            engine.setProperty('voice', voices[0].id)
-        
-        # 🐢 Slow down speed (normal is ~200, slower is ~130)
-        engine.setProperty('rate', 130)  # Even slower speed for better comprehension
-        
-        # Set volume
-        engine.setProperty('volume', 0.9)  # Volume level (0.0 to 1.0)
+        engine = configure_voice(pyttsx3.init())
+        engine.connect("started-utterance", lambda name: audible.set())
     
     return engine
 
@@ -97,10 +112,11 @@ def speak_with_pyttsx3(text, language="en"):
     if not PYTTSX3_AVAILABLE:
         raise Exception("pyttsx3 not available")
         
-    engine = init_tts_engine()
-    
-    # Clean text for speech
-    clean_text_content = clean_text(text)
+    with metrics.span("synthesis"):
+        engine = init_tts_engine()
+
+        # Clean text for speech
+        clean_text_content = clean_text(text)
     
     if not clean_text_content.strip():
         return
@@ -123,12 +139,16 @@ def speak_with_pyttsx3(text, language="en"):
         is_speaking = False
     
     # Run speech in a separate thread to allow interruption
-    thread = threading.Thread(target=speak)
-    thread.start()
-    
-    # Wait for speech to complete or be interrupted
-    while thread.is_alive() and not stop_flag.is_set():
-        time.sleep(0.1)
+    with metrics.span("playback"):
+        thread = threading.Thread(target=speak)
+        thread.start()
+
+        # Wait for speech to complete or be interrupted
+        try:
+            while thread.is_alive() and not stop_flag.is_set():
+                time.sleep(0.1)
+        finally:
+            audible.clear()
     
     if stop_flag.is_set():
         try:
@@ -151,51 +171,113 @@ def speak_with_gtts(text, language="en"):
     if not clean_text_content.strip():
         return
         
-    filename = "zoya_tts.mp3"
+    # Each utterance gets its own file, so an abandoned download cannot overwrite the next one
+    fd, filename = tempfile.mkstemp(prefix="zoya_tts_", suffix=".mp3")
+    os.close(fd)
+    abandoned = False
     
     try:
         is_speaking = True
-        tts = gTTS(text=clean_text_content, lang=language, slow=False, lang_check=False)
-        tts.save(filename)
-        
-        # Initialize and play sound
-        pygame.mixer.init()
-        pygame.mixer.music.load(filename)
-        pygame.mixer.music.play()
+        with metrics.span("synthesis"):
+            tts = gTTS(text=clean_text_content, lang=language, slow=False, lang_check=False)
+            try:
+                # Synthesis is a network call, so a stop must not wait for it; the
+                # abandoned download deletes its own file once it ends
+                run_cancellable(_save_speech, stop_flag, tts, filename,
+                                on_abandon=lambda _: _remove_file(filename))
+            except Cancelled:
+                abandoned = True
+                return
         
-        # Spacebar stop works only while playing
-        def monitor_stop():
+        with metrics.span("playback"):
+            _init_mixer()
+            pygame.mixer.music.load(filename)
+            pygame.mixer.music.play()
+            _playing.set()
+            audible.set()
+
+            # Wait until speech finishes or is interrupted
+            clock = pygame.time.Clock()
             while pygame.mixer.music.get_busy():
-                if keyboard.is_pressed("space"):
+                if stop_flag.is_set():
                     pygame.mixer.music.stop()
                     break
+                clock.tick(10)
         
-        # Run stop monitor in background
-        threading.Thread(target=monitor_stop, daemon=True).start()
-        
-        # Wait until speech finishes or is interrupted
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        
-        # Clean up
-        pygame.mixer.quit()
-        if os.path.exists(filename):
-            os.remove(filename)
+        # Clean up, keeping the mixer open for the next utterance
+        _release_music()
             
     except Exception as e:
         print(f"[Speech Error]: {e}")
-        try:
-            pygame.mixer.quit()
-        except:
-            pass
-        if os.path.exists(filename):
-            try:
-                os.remove(filename)
-            except:
-                pass
+        _release_music()
         raise
     finally:
+        _playing.clear()
+        audible.clear()
         is_speaking = False
+        if not abandoned:
+            _remove_file(filename)
+
+
+def _save_speech(tts, filename):
+    """Download gTTS speech to filename, deleting the file if the download fails"""
+    try:
+        tts.save(filename)
+    except Exception:
+        _remove_file(filename)
+        raise
+
+
+def _remove_file(filename):
+    """Delete a temporary audio file if it is still there"""
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def _init_mixer():
+    """Start the pygame mixer and the spacebar monitor on first use"""
+    global _mixer_ready, _monitor
+    with _mixer_lock:
+        if not _mixer_ready:
+            pygame.mixer.init()
+            _mixer_ready = True
+        if _monitor is None:
+            _monitor = threading.Thread(target=_monitor_stop, daemon=True, name="zoya-spacebar")
+            _monitor.start()
+
+
+def _release_music():
+    """Stop playback and let go of the audio file, so it can be deleted"""
+    global _mixer_ready
+    _playing.clear()
+    if not _mixer_ready:
+        return
+    try:
+        pygame.mixer.music.stop()
+        # pygame 2 can release the file without closing the mixer; older versions cannot
+        if hasattr(pygame.mixer.music, "unload"):
+            pygame.mixer.music.unload()
+        else:
+            pygame.mixer.quit()
+            _mixer_ready = False
+    except Exception:
+        pass
+
+
+def _monitor_stop():
+    """Stop gTTS playback when the spacebar is pressed; sleeps between utterances"""
+    while True:
+        _playing.wait()
+        try:
+            if keyboard.is_pressed("space"):
+                pygame.mixer.music.stop()
+                _playing.clear()
+        except Exception:
+            # No keyboard access (e.g. not root on Linux): the stop command still works
+            return
+        time.sleep(0.05)
 
 
 def speak_text(text, language="en"):
@@ -243,9 +325,9 @@ def stop_speaking():
             pass
     
     # Stop gTTS if playing
-    if GTTS_AVAILABLE:
+    if GTTS_AVAILABLE and _mixer_ready:
         try:
-            pygame.mixer.quit()
+            pygame.mixer.music.stop()
         except:
             pass
     
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Token, cost and latency telemetry for Zoya AI Assistant
+
+Every OpenRouter request is recorded with its model, status, prompt and
+completion tokens, cost, total latency and, for streamed replies, time to
+first token. Records are buffered and written in batches to a local SQLite
+database, so most requests never touch the disk, and can be summarized per
+model and per session to size conversation history and compare models
+against latency targets.
+
+Usage:
+    python telemetry.py                       # per-model summary
+    python telemetry.py --by session --since 2025-01-01
+    python telemetry.py --by session,model --model x-ai/grok-4-fast:free --json
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from metrics import percentile
+
+# SQLite database the telemetry is written to
+TELEMETRY_DB = os.getenv("ZOYA_TELEMETRY_DB", "zoya_telemetry.db")
+
+# Record telemetry for every AI request (set to 0 to disable)
+TELEMETRY_ENABLED = os.getenv("ZOYA_TELEMETRY", "1") == "1"
+
+# Buffered records written at once, and the longest they wait to be written
+FLUSH_EVERY = int(os.getenv("ZOYA_TELEMETRY_FLUSH_EVERY", "50"))
+FLUSH_SECONDS = float(os.getenv("ZOYA_TELEMETRY_FLUSH_SECONDS", "5"))
+
+COLUMNS = ("ts", "session", "model", "mode", "status", "streamed", "prompt_tokens", "completion_tokens",
+           "estimated", "cost", "latency_ms", "ttft_ms")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    ts REAL NOT NULL,
+    session TEXT,
+    model TEXT NOT NULL,
+    mode TEXT,
+    status TEXT NOT NULL,
+    streamed INTEGER NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    estimated INTEGER NOT NULL,
+    cost REAL,
+    latency_ms REAL,
+    ttft_ms REAL
+);
+CREATE INDEX IF NOT EXISTS requests_ts ON requests (ts);
+CREATE INDEX IF NOT EXISTS requests_session ON requests (session, ts);
+CREATE INDEX IF NOT EXISTS requests_model ON requests (model, ts);
+"""
+
+GROUPS = ("model", "session", "mode")
+
+_lock = threading.Lock()
+_local = threading.local()
+_buffer = []
+_buffer_path = None
+_last_flush = time.monotonic()
+_connection = None
+_connection_path = None
+
+
+class session:
+    """Context manager that attributes AI requests made on this thread to a session"""
+
+    __slots__ = ("session_id", "previous")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+
+    def __enter__(self):
+        self.previous = getattr(_local, "session", None)
+        _local.session = self.session_id
+        return self
+
+    def __exit__(self, *exc):
+        _local.session = self.previous
+        return False
+
+
+def current_session():
+    """Return the session the current thread is working for, or None"""
+    return getattr(_local, "session", None)
+
+
+def _connect(path=None):
+    """Open the database at path (default TELEMETRY_DB), reopening if it changed; call with _lock held"""
+    global _connection, _connection_path
+    path = path or TELEMETRY_DB
+    if _connection is None or _connection_path != path:
+        if _connection is not None:
+            _connection.close()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _connection = sqlite3.connect(path, check_same_thread=False)
+        _connection.executescript(SCHEMA)
+        _connection_path = path
+    return _connection
+
+
+def record(model, status, latency, prompt_tokens=None, completion_tokens=None, ttft=None, cost=None,
+           streamed=False, estimated=False, mode=None, session_id=None):
+    """
+    Record one AI request
+
+    Args:
+        model (str): Model that answered, or was asked last
+        status: HTTP status code, or "error" / "cancelled" if none arrived
+        latency (float): Seconds from sending the request to the full reply
+        prompt_tokens (int): Prompt tokens used
+        completion_tokens (int): Completion tokens generated
+        ttft (float): Seconds to the first streamed token
+        cost (float): Cost in credits, when OpenRouter reports it
+        streamed (bool): Whether the reply was streamed
+        estimated (bool): Whether the token counts were estimated from word counts
+        mode (str): The mode asking, e.g. "voice" or "batch"
+        session_id (str): Session the request belongs to, defaults to the current one
+    """
+    if not TELEMETRY_ENABLED:
+        return
+    row = (
+        time.time(),
+        session_id if session_id is not None else current_session(),
+        model,
+        mode,
+        str(status),
+        int(bool(streamed)),
+        prompt_tokens,
+        completion_tokens,
+        int(bool(estimated)),
+        cost,
+        round(latency * 1000, 2) if latency is not None else None,
+        round(ttft * 1000, 2) if ttft is not None else None
+    )
+    global _buffer_path
+    with _lock:
+        if _buffer and _buffer_path != TELEMETRY_DB:
+            # Records buffered before TELEMETRY_DB changed belong to the old database
+            _flush_locked()
+        _buffer_path = TELEMETRY_DB
+        _buffer.append(row)
+        due = len(_buffer) >= FLUSH_EVERY or time.monotonic() - _last_flush >= FLUSH_SECONDS
+    if due:
+        flush()
+
+
+def flush():
+    """Write buffered records to the database they were recorded for"""
+    with _lock:
+        _flush_locked()
+
+
+def _flush_locked():
+    global _last_flush
+    _last_flush = time.monotonic()
+    if not _buffer:
+        return
+    rows = list(_buffer)
+    del _buffer[:]
+    try:
+        connection = _connect(_buffer_path)
+        with connection:
+            connection.executemany(
+                f"INSERT INTO requests ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+            )
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not save telemetry: {e}")
+
+
+atexit.register(flush)
+
+
+def _timestamp(value):
+    """Parse a date or datetime string into seconds since the epoch"""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def summarize(by=("model",), since=None, until=None, session_id=None, model=None):
+    """
+    Aggregate recorded requests
+
+    Args:
+        by (tuple): Columns to group by, from GROUPS
+        since (str): Earliest date or datetime to include
+        until (str): Latest date or datetime to include
+        session_id (str): Only include this session
+        model (str): Only include this model
+
+    Returns:
+        list: One dict per group with request, error and token counts, cost,
+            latency and time-to-first-token percentiles, busiest group first
+    """
+    for column in by:
+        if column not in GROUPS:
+            raise ValueError(f"Cannot group by '{column}', expected one of {', '.join(GROUPS)}")
+
+    clauses, params = [], []
+    if since:
+        clauses.append("ts >= ?")
+        params.append(_timestamp(since))
+    if until:
+        clauses.append("ts <= ?")
+        params.append(_timestamp(until))
+    if session_id:
+        clauses.append("session = ?")
+        params.append(session_id)
+    if model:
+        clauses.append("model = ?")
+        params.append(model)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    flush()
+    with _lock:
+        rows = _connect().execute(
+            f"SELECT {', '.join(by)}, status, prompt_tokens, completion_tokens, cost, latency_ms, ttft_ms "
+            f"FROM requests {where}", params
+        ).fetchall()
+
+    groups = {}
+    for row in rows:
+        key = row[:len(by)]
+        status, prompt, completion, cost, latency, ttft = row[len(by):]
+        group = groups.setdefault(key, {"requests": 0, "errors": 0, "cancelled": 0, "prompt": [], "completion": 0,
+                                        "cost": 0.0, "latency": [], "ttft": []})
+        group["requests"] += 1
+        if status == "cancelled":
+            group["cancelled"] += 1
+            continue
+        if status != "200":
+            group["errors"] += 1
+            continue
+        group["prompt"].append(prompt or 0)
+        group["completion"] += completion or 0
+        group["cost"] += cost or 0.0
+        if latency is not None:
+            group["latency"].append(latency)
+        if ttft is not None:
+            group["ttft"].append(ttft)
+
+    summary = []
+    for key, group in groups.items():
+        prompts = group["prompt"]
+        summary.append(dict(zip(by, key), **{
+            "requests": group["requests"],
+            "errors": group["errors"],
+            "cancelled": group["cancelled"],
+            "prompt_tokens": sum(prompts),
+            "completion_tokens": group["completion"],
+            "prompt_tokens_mean": round(sum(prompts) / len(prompts), 1) if prompts else 0.0,
+            "prompt_tokens_p95": round(percentile(prompts, 95), 1),
+            "cost": round(group["cost"], 6),
+            "latency_ms_p50": round(percentile(group["latency"], 50), 2),
+            "latency_ms_p95": round(percentile(group["latency"], 95), 2),
+            "ttft_ms_p50": round(percentile(group["ttft"], 50), 2),
+            "ttft_ms_p95": round(percentile(group["ttft"], 95), 2)
+        }))
+    summary.sort(key=lambda item: item["requests"], reverse=True)
+    return summary
+
+
+def format_summary(summary, by):
+    """Render a summary as an aligned text table"""
+    headers = list(by) + ["requests", "errors", "cancelled", "prompt_tokens_mean", "prompt_tokens_p95", "completion_tokens",
+                          "cost", "latency_ms_p50", "latency_ms_p95", "ttft_ms_p50", "ttft_ms_p95"]
+    table = [headers] + [[str(item[column] if item[column] is not None else "-") for column in headers]
+                         for item in summary]
+    widths = [max(len(row[i]) for row in table) for i in range(len(headers))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in table)
+
+
+def main():
+    global TELEMETRY_DB
+    parser = argparse.ArgumentParser(description="Summarize Zoya's AI token usage, cost and latency")
+    parser.add_argument("--by", default="model", help="comma-separated grouping: model, session, mode")
+    parser.add_argument("--since", help="earliest date or datetime, e.g. 2025-01-01")
+    parser.add_argument("--until", help="latest date or datetime")
+    parser.add_argument("--session", help="only this session")
+    parser.add_argument("--model", help="only this model")
+    parser.add_argument("--db", default=TELEMETRY_DB, help="telemetry database")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    TELEMETRY_DB = args.db
+    by = tuple(column.strip() for column in args.by.split(",") if column.strip())
+    try:
+        summary = summarize(by, args.since, args.until, args.session, args.model)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    elif summary:
+        print(format_summary(summary, by))
+    else:
+        print("No AI requests recorded yet.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Shared fixtures: keep logs, sessions and telemetry out of the working tree"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def scratch_files(tmp_path, monkeypatch):
+    import logger
+    import session_store
+    import telemetry
+    monkeypatch.setattr(logger, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(session_store, "SESSIONS_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr(telemetry, "TELEMETRY_DB", str(tmp_path / "telemetry.db"))
+    yield
+    # Write buffered rows while TELEMETRY_DB still points at the scratch database
+    telemetry.flush()
+
+
+@pytest.fixture
+def fakes():
+    """Local fake OpenRouter, MyMemory and DDGS, with rate limits off"""
+    import outbound
+    from fake_services import FakeServices, FakeProfile
+
+    for backend in outbound.BACKENDS:
+        outbound.configure(backend, 0)
+    profile = FakeProfile(latency_ms=20, jitter_ms=5, seed=1)
+    with FakeServices(openrouter=profile, mymemory=FakeProfile(latency_ms=5, jitter_ms=1, seed=2),
+                      ddgs=FakeProfile(latency_ms=50, jitter_ms=5, seed=3)) as services:
+        services.install()
+        try:
+            yield services
+        finally:
+            services.uninstall()
+    outbound.reset_limits()
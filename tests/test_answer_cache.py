@@ -0,0 +1,50 @@
+"""The answer cache keys on recent context, not only the question"""
+
+from answer_cache import AnswerCache
+
+SYSTEM = {"role": "system", "content": "You are Zoya."}
+
+
+def conversation(*user_turns):
+    memory = [SYSTEM]
+    for turn in user_turns:
+        memory += [{"role": "user", "content": turn}, {"role": "assistant", "content": "..."}]
+    return memory
+
+
+def test_same_question_in_different_context_gets_its_own_entry():
+    cache = AnswerCache()
+    question = "How do I reverse a list"
+    about_python = cache.make_key(question, "en", conversation("I am learning Python"))
+    about_java = cache.make_key(question, "en", conversation("I am learning Java"))
+    assert about_python != about_java
+
+    cache.put(about_python, "Use reversed() or list.reverse().")
+    assert cache.get(about_java) is None
+    assert cache.get(about_python) == "Use reversed() or list.reverse()."
+
+
+def test_fresh_conversations_share_entries():
+    cache = AnswerCache()
+    first = cache.make_key("What is the capital of France", "en", conversation())
+    cache.put(first, "Paris.")
+    assert cache.get(cache.make_key("what is the capital of france?", "en", conversation())) == "Paris."
+
+
+def test_only_the_latest_turns_count():
+    cache = AnswerCache(context_turns=1)
+    question = "How do I reverse a list"
+    assert cache.make_key(question, "en", conversation("Hello", "I am learning Python")) == \
+        cache.make_key(question, "en", conversation("Good morning", "I am learning Python"))
+
+
+def test_index_buckets_are_dropped_with_their_last_entry():
+    cache = AnswerCache(max_entries=5)
+    for i in range(50):
+        key = cache.make_key("How do I reverse a list", "en", conversation(f"I am learning language {i}"))
+        cache.put(key, f"Answer {i}")
+    assert len(cache) == 5
+    assert len(cache.index) == 5
+
+    cache.clear()
+    assert len(cache.index) == 0
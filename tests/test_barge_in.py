@@ -0,0 +1,103 @@
+"""Barge-in is opt-in and does not mistake Zoya's own voice for the user"""
+
+import math
+from array import array
+
+import barge_in
+
+RATE = 16000
+CHUNK_MS = 32
+
+
+def tone(amplitude, ms):
+    """16-bit mono sine at 440 Hz"""
+    samples = array("h", (int(amplitude * math.sin(2 * math.pi * 440 * i / RATE))
+                          for i in range(int(RATE * ms / 1000))))
+    return samples.tobytes()
+
+
+def feed(detector, audio):
+    step = int(RATE * CHUNK_MS / 1000) * 2
+    return [detector.feed(audio[i:i + step]) for i in range(0, len(audio), step)]
+
+
+def test_barge_in_is_off_by_default():
+    assert barge_in.VoiceChannel(print, print).barge_in is False
+
+
+def test_loudspeaker_echo_does_not_barge_in():
+    # Room noise calibrated low, but the reply plays back loudly throughout
+    detector = barge_in.BargeInDetector(barge_in.speech_threshold(100), RATE, 2)
+    assert "speech" not in feed(detector, tone(3000, 3000))
+
+
+def test_speech_over_the_echo_barges_in():
+    detector = barge_in.BargeInDetector(barge_in.speech_threshold(100), RATE, 2)
+    events = feed(detector, tone(3000, 500) + tone(12000, 1000))
+    assert "speech" in events
+
+
+def test_reply_heard_back_is_echo():
+    reply = "Python is a popular programming language known for its simple syntax."
+    assert barge_in.is_echo("python is a popular programming language", reply)
+    assert not barge_in.is_echo("stop and tell me the weather in Delhi", reply)
+    assert not barge_in.is_echo(None, reply)
+
+
+def test_echo_phrase_is_dropped_and_the_user_heard_next(monkeypatch):
+    import speech_input
+    heard = iter(["a popular programming language", "what about java"])
+    monkeypatch.setattr(speech_input, "get_voice_input", lambda *args, **kwargs: next(heard))
+    channel = barge_in.VoiceChannel(print, print)
+    channel.reply = "Python is a popular programming language."
+    channel.pending = object()
+    assert channel.listen() == "what about java"
+
+
+def test_echo_is_measured_from_when_playback_starts():
+    # Speech synthesis takes a second before the reply is heard
+    silence, echo = tone(0, 1000), tone(3000, 3000)
+
+    # Calibrating from the first frame would measure the silence and let the echo through
+    early = barge_in.BargeInDetector(barge_in.speech_threshold(100), RATE, 2)
+    assert "speech" in feed(early, silence + echo)
+
+    detector = barge_in.BargeInDetector(barge_in.speech_threshold(100), RATE, 2, playback_started=False)
+    assert "speech" not in feed(detector, silence)
+    detector.start_playback()
+    assert "speech" not in feed(detector, echo)
+
+
+class FakeMicrophone:
+    """Plays silence until the reply becomes audible, then its echo"""
+
+    SAMPLE_RATE = RATE
+    SAMPLE_WIDTH = 2
+    CHUNK = 512
+
+    def __init__(self, audible, silent_reads):
+        self.stream = self
+        self.audible = audible
+        self.reads = 0
+        self.silent_reads = silent_reads
+
+    def read(self, size):
+        self.reads += 1
+        if self.reads == self.silent_reads:
+            self.audible.set()
+        amplitude = 3000 if self.audible.is_set() else 0
+        return tone(amplitude, size * 1000 / RATE)
+
+
+def test_listener_waits_for_audible_playback():
+    import threading
+    import time
+    audible = threading.Event()
+    stopped = []
+    microphone = FakeMicrophone(audible, silent_reads=40)
+    listener = barge_in.BargeInListener(microphone, barge_in.speech_threshold(100),
+                                        lambda: stopped.append(True), audible).start()
+    while microphone.reads < 200:
+        time.sleep(0.01)
+    assert listener.finish() is None
+    assert not stopped
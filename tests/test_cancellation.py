@@ -0,0 +1,81 @@
+"""Cancelled turns abort their HTTP requests instead of leaving them to finish"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+import outbound
+from fake_services import FakeProfile
+from http_client import session as http_session
+from utils import Cancelled, CancelToken
+
+
+@pytest.mark.parametrize("key", [None, "slow-translation"])
+def test_cancel_aborts_the_request(fakes, key):
+    fakes.mymemory = FakeProfile(latency_ms=3000, jitter_ms=0)
+    finished = {}
+    ended = threading.Event()
+
+    def fetch():
+        try:
+            return http_session.get(fakes.mymemory_url, params={"q": "hello", "langpair": "en|hi"}, timeout=10)
+        except requests.RequestException as e:
+            finished["error"] = e
+        finally:
+            finished["at"] = time.monotonic()
+            ended.set()
+
+    cancel = CancelToken()
+    threading.Timer(0.2, cancel.set).start()
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        outbound.call("mymemory", key, fetch, cancel=cancel)
+
+    assert ended.wait(2)
+    assert finished["at"] - start < 1.0
+    assert isinstance(finished["error"], requests.ConnectionError)
+
+
+def test_shared_request_survives_one_cancelled_caller(fakes):
+    fakes.mymemory = FakeProfile(latency_ms=300, jitter_ms=0)
+
+    def fetch():
+        return http_session.get(fakes.mymemory_url, params={"q": "shared", "langpair": "en|hi"}, timeout=10).json()
+
+    leaving, staying = CancelToken(), CancelToken()
+    results = {}
+
+    def wait_for(name, token):
+        try:
+            results[name] = outbound.call("mymemory", "shared", fetch, cancel=token)
+        except Cancelled:
+            results[name] = "cancelled"
+
+    threads = [threading.Thread(target=wait_for, args=("leaving", leaving)),
+               threading.Thread(target=wait_for, args=("staying", staying))]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    leaving.set()
+    for thread in threads:
+        thread.join(5)
+    assert results["leaving"] == "cancelled"
+    assert results["staying"]["responseStatus"] == 200
+
+
+def test_cancelled_non_streamed_ai_request_returns_promptly(fakes):
+    import ai_engine
+
+    fakes.openrouter = FakeProfile(latency_ms=3000, jitter_ms=0)
+    cancel = CancelToken()
+    threading.Timer(0.2, cancel.set).start()
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        ai_engine._post_completion({"messages": [{"role": "user", "content": "slow question"}]}, cancel=cancel)
+    assert time.monotonic() - start < 1.0
+    # The aborted request was not counted against the model
+    backend = ai_engine.router.order()[0]
+    breaker, _ = ai_engine._model_state(backend, backend.models[0])
+    assert breaker.state == breaker.CLOSED
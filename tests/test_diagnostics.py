@@ -0,0 +1,33 @@
+"""Diagnostics keep snapshots and trims off the thread that served the turn"""
+
+import threading
+
+import diagnostics
+
+
+def test_snapshots_and_trims_run_in_the_background(monkeypatch):
+    threads = []
+    real_snapshot = diagnostics.Diagnostics._snapshot
+
+    def snapshot(self):
+        threads.append(threading.current_thread().name)
+        return real_snapshot(self)
+
+    monkeypatch.setattr(diagnostics.Diagnostics, "_snapshot", snapshot)
+    monkeypatch.setattr(diagnostics, "SNAPSHOT_INTERVAL", 0)
+    monkeypatch.setattr(diagnostics, "MAX_THREADS", 1)
+    trimmed = []
+    monkeypatch.setattr(diagnostics, "_trimmers", {"test": lambda: trimmed.append(threading.current_thread().name)})
+
+    diag = diagnostics.Diagnostics(path=None)
+    diag.start()
+    try:
+        for _ in range(3):
+            diag.on_turn({"total": 0.1})
+    finally:
+        diag.stop()
+
+    assert threads and set(threads) == {"zoya-diagnostics"}
+    assert trimmed == ["zoya-diagnostics"]
+    assert diag.baseline is not None
+    assert diag.last_report["turns"] == 3
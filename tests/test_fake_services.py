@@ -0,0 +1,27 @@
+"""Installing the fakes only lasts until they are uninstalled"""
+
+import ai_engine
+import duckduckgo_handler
+import pipeline
+import translator
+from fake_services import FakeServices
+
+
+def current_settings():
+    return ([(backend.url, backend.api_key) for backend in ai_engine.router.backends],
+            ai_engine.OPENAI_AVAILABLE, translator.MYMEMORY_URL, getattr(duckduckgo_handler, "DDGS", None),
+            hasattr(duckduckgo_handler, "DDGS"), duckduckgo_handler.DDGS_AVAILABLE, pipeline.OPENAI_AVAILABLE, pipeline.DDGS_AVAILABLE)
+
+
+def test_uninstall_restores_the_real_services():
+    before = current_settings()
+    with FakeServices() as services:
+        services.install()
+        assert translator.MYMEMORY_URL == services.mymemory_url
+        assert all(backend.url == services.openrouter_url for backend in ai_engine.router.backends)
+        services.uninstall()
+        assert current_settings() == before
+
+        # Leaving the block also uninstalls
+        services.install()
+    assert current_settings() == before
@@ -0,0 +1,43 @@
+"""Replies cut short by the generation budget end on a complete sentence"""
+
+import pytest
+
+import ai_engine
+from fake_services import FAKE_REPLIES
+
+
+@pytest.fixture
+def no_answer_cache(monkeypatch):
+    monkeypatch.setattr(ai_engine.answer_cache, "enabled", False)
+
+
+def test_truncated_reply_is_trimmed_whatever_its_length():
+    text = "Namaste! Main Zoya hoon. Aaj mausam"
+    assert ai_engine.trim_to_sentence(text, 80) == text
+    assert ai_engine.trim_to_sentence(text, 80, truncated=True) == "Namaste! Main Zoya hoon."
+
+
+@pytest.mark.parametrize("tokens_per_word,voice_tokens", [(6.0, 110), (1.0, 20)])
+@pytest.mark.parametrize("stream", [False, True])
+def test_cut_reply_ends_on_a_sentence(fakes, no_answer_cache, monkeypatch, tokens_per_word, voice_tokens, stream):
+    # Six tokens per word runs out of max_tokens long before the word estimate, as Indic scripts do
+    fakes.tokens_per_word = tokens_per_word
+    monkeypatch.setitem(ai_engine.GENERATION_BUDGETS, "voice", voice_tokens)
+    deltas = []
+    reply = ai_engine.get_ai_response("Tell me a tip", memory=ai_engine.new_memory(), mode="voice",
+                                      on_delta=deltas.append if stream else None)
+
+    assert reply[-1] in ".!?"
+    assert any(full.startswith(reply) and len(full) > len(reply) for full in FAKE_REPLIES)
+    if stream:
+        # Clients are sent exactly the reply that is saved, nothing past it
+        assert "".join(deltas).strip() == reply
+
+
+def test_complete_stream_is_passed_on_in_full(fakes, no_answer_cache):
+    deltas = []
+    reply = ai_engine.get_ai_response("Tell me a tip", memory=ai_engine.new_memory(), mode="text",
+                                      on_delta=deltas.append)
+    assert reply in FAKE_REPLIES
+    assert "".join(deltas).strip() == reply
+    assert len(deltas) > 1
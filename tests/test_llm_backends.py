@@ -0,0 +1,35 @@
+"""Backend ranking: a slow backend is not retried just because it went unused"""
+
+import time
+
+import llm_backends
+from llm_backends import Backend, BackendRouter
+
+
+def measured_router(fast_seconds, slow_seconds, idle):
+    fast = Backend("fast", "http://fast", ["m"])
+    slow = Backend("slow", "http://slow", ["m"])
+    fast.observe(fast_seconds)
+    slow.observe(slow_seconds)
+    slow.updated -= idle
+    return BackendRouter([slow, fast]), fast, slow
+
+
+def test_idle_slow_backend_stays_behind_a_fast_one():
+    router, fast, slow = measured_router(0.5, 5.0, idle=10 * llm_backends.RESCORE_AFTER)
+    assert router.order() == [fast, slow]
+    # It has drifted most of the way to the average, but no further
+    assert fast.measured() < slow.score(prior=router.prior()) < 5.0
+
+
+def test_idle_score_decays_halfway_per_period():
+    router, fast, slow = measured_router(1.0, 5.0, idle=2 * llm_backends.RESCORE_AFTER)
+    assert abs(slow.score(time.monotonic(), prior=3.0) - 4.0) < 0.01
+
+
+def test_unmeasured_backend_scores_the_average():
+    router, fast, slow = measured_router(0.5, 5.0, idle=0)
+    new = Backend("new", "http://new", ["m"])
+    router.backends.append(new)
+    assert router.order() == [fast, new, slow]
+    assert BackendRouter([new]).order() == [new]
@@ -0,0 +1,49 @@
+"""Concurrency of the outbound layer and the search fan-out on top of it"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def small_io_pool(monkeypatch):
+    """A fresh I/O pool with fewer workers than concurrent searches"""
+    monkeypatch.setattr(utils, "IO_WORKERS", 4)
+    monkeypatch.setattr(utils, "_io_pool", None)
+    yield
+    if utils._io_pool is not None:
+        utils._io_pool.shutdown(wait=False)
+    utils._io_pool = None
+
+
+@pytest.mark.parametrize("cancellable", [False, True])
+def test_concurrent_searches_do_not_exhaust_the_io_pool(fakes, small_io_pool, cancellable):
+    import duckduckgo_handler
+
+    def search(i):
+        cancel = utils.CancelToken() if cancellable else None
+        return duckduckgo_handler.search_web(f"capital of france {i}", cancel=cancel)
+
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        futures = [pool.submit(search, i) for i in range(40)]
+        results = [f.result(timeout=30) for f in futures]
+    assert all(r and r != "I couldn't find anything for that." for r in results)
+
+
+def test_calls_still_complete_after_a_search_burst(fakes, small_io_pool):
+    import outbound
+    import duckduckgo_handler
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda i: duckduckgo_handler.search_web(f"python {i}"), range(16)))
+
+    done = threading.Event()
+    result = []
+    worker = threading.Thread(target=lambda: (result.append(outbound.call("mymemory", None, lambda: 42)),
+                                              done.set()), daemon=True)
+    worker.start()
+    assert done.wait(5)
+    assert result == [42]
@@ -0,0 +1,45 @@
+"""Circuit breaker state changes, including trials that end without a verdict"""
+
+import pytest
+
+import ai_engine
+from resilience import CircuitBreaker
+from utils import Cancelled, CancelToken
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    return breaker
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = open_breaker()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_released_trial_can_be_retried():
+    breaker = open_breaker()
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+
+
+def test_cancelled_trial_request_releases_the_breaker(fakes):
+    backend = ai_engine.router.order()[0]
+    model = backend.models[0]
+    breaker, _ = ai_engine._model_state(backend, model)
+    breaker.failure_threshold, breaker.reset_timeout = 1, 0.0
+    breaker.record_failure()
+
+    cancel = CancelToken()
+    cancel.set()
+    with pytest.raises(Cancelled):
+        ai_engine._post_completion({"messages": [{"role": "user", "content": "hi"}]}, cancel=cancel)
+    assert not breaker.trial_in_flight
+    assert breaker.allow()
+    breaker.record_success()
@@ -0,0 +1,93 @@
+"""The server answers JSON that is not an object with an error, not a crash"""
+
+import asyncio
+import json
+import struct
+
+import pytest
+
+from server import ZoyaServer, _encode_frame, _read_frame, WS_TEXT
+
+
+async def http_request(port, method, path, body):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def with_server(client):
+    server = await asyncio.start_server(ZoyaServer().handle_connection, "127.0.0.1", 0)
+    async with server:
+        return await client(server.sockets[0].getsockname()[1])
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'"hello"', b"42", b"null"])
+def test_http_body_must_be_an_object(body):
+    status, payload = asyncio.run(with_server(lambda port: http_request(port, "POST", "/sessions", body)))
+    assert status == 400
+    assert payload == {"error": "Body must be a JSON object"}
+
+
+def test_http_object_body_still_works():
+    status, payload = asyncio.run(with_server(
+        lambda port: http_request(port, "POST", "/sessions", b'{"language": "hi"}')))
+    assert status == 201
+    assert payload["language"] == "hi"
+
+
+def test_websocket_message_must_be_an_object():
+    async def client(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /ws HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n")
+        await reader.readuntil(b"\r\n\r\n")
+        frames = []
+        for message in (b"[1]", b'{"type": "clear"}'):
+            frames.append(json.loads((await _read_frame(reader))[2]))
+            writer.write(_encode_frame(WS_TEXT, message))
+        frames.append(json.loads((await _read_frame(reader))[2]))
+        writer.close()
+        return frames
+
+    frames = asyncio.run(with_server(client))
+    assert frames[0]["type"] == "session"
+    assert frames[1] == {"type": "error", "error": "Messages must be JSON objects"}
+    # The connection survives and keeps handling messages
+    assert frames[2]["type"] == "cleared"
+
+
+async def open_websocket(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /ws HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    await _read_frame(reader)
+    return reader, writer
+
+
+@pytest.mark.parametrize("fragments", [1, 3])
+def test_oversized_websocket_message_closes_with_1009(monkeypatch, fragments):
+    import server
+    monkeypatch.setattr(server, "MAX_MESSAGE_SIZE", 1000)
+
+    async def client(port):
+        reader, writer = await open_websocket(port)
+        piece = b"x" * (1200 // fragments)
+        for i in range(fragments):
+            frame = bytearray(_encode_frame(WS_TEXT if i == 0 else 0x0, piece))
+            if i < fragments - 1:
+                frame[0] &= 0x7F
+            writer.write(bytes(frame))
+        reply = await _read_frame(reader)
+        rest = await reader.read()
+        writer.close()
+        return reply, rest
+
+    (fin, opcode, payload), rest = asyncio.run(with_server(client))
+    assert opcode == server.WS_CLOSE
+    assert struct.unpack("!H", payload[:2])[0] == 1009
+    assert rest == b""
@@ -0,0 +1,47 @@
+"""Session eviction and the trim run at resource ceilings"""
+
+import time
+
+import ai_engine
+from sessions import SessionManager
+
+
+def chatty_manager(count, turns=30):
+    manager = SessionManager()
+    for i in range(count):
+        session = manager.create(session_id=f"s{i}")
+        session.last_active = time.monotonic() + i
+        for turn in range(turns):
+            session.memory += [{"role": "user", "content": f"question {turn}"},
+                               {"role": "assistant", "content": f"answer {turn}"}]
+    return manager
+
+
+def test_shrink_evicts_least_recent_idle_sessions_and_trims_the_rest():
+    manager = chatty_manager(10)
+    manager.sessions["s0"].busy = True
+    before = manager.memory_bytes()
+
+    evicted = manager.shrink(keep=0.5)
+
+    assert evicted == ["s1", "s2", "s3", "s4", "s5"]
+    assert sorted(manager.sessions) == ["s0", "s6", "s7", "s8", "s9"]
+    for session_id in ("s6", "s7", "s8", "s9"):
+        assert len(manager.sessions[session_id].memory) == 1 + ai_engine.HISTORY_MESSAGES
+    # The busy session's memory is left alone mid-reply
+    assert len(manager.sessions["s0"].memory) == 61
+    assert manager.memory_bytes() < before / 2
+
+
+def test_new_session_survives_when_busy_sessions_fill_the_limit():
+    manager = SessionManager(max_sessions=2)
+    for session_id in ("a", "b"):
+        manager.create(session_id=session_id).busy = True
+
+    session = manager.create(session_id="c")
+
+    assert manager.get("c") is session
+    # Evicted only once a newer session arrives and the busy ones are still there
+    manager.create(session_id="d")
+    assert manager.get("c") is None
+    assert manager.get("d") is not None
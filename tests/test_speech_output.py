@@ -0,0 +1,76 @@
+"""A stopped gTTS download cannot touch the next utterance's audio file"""
+
+import os
+import threading
+import types
+
+import pytest
+
+pytest.importorskip("keyboard")
+import speech_output
+from utils import stop_flag
+
+
+class SlowTTS:
+    """gTTS stand-in whose first download only finishes when released"""
+
+    release = threading.Event()
+    saved = []
+
+    def __init__(self, text, **kwargs):
+        self.text = text
+
+    def save(self, filename):
+        if not SlowTTS.saved:
+            SlowTTS.saved.append(filename)
+            SlowTTS.release.wait(5)
+        else:
+            SlowTTS.saved.append(filename)
+        with open(filename, "w") as f:
+            f.write(self.text)
+
+
+class FakeMusic:
+    played = []
+
+    def load(self, filename):
+        with open(filename) as f:
+            FakeMusic.played.append(f.read())
+
+    def play(self):
+        pass
+
+    def get_busy(self):
+        return False
+
+    def stop(self):
+        pass
+
+    def unload(self):
+        pass
+
+
+def test_abandoned_download_writes_only_its_own_file(monkeypatch):
+    fake_pygame = types.SimpleNamespace(mixer=types.SimpleNamespace(init=lambda: None, music=FakeMusic()),
+                                        time=types.SimpleNamespace(Clock=lambda: types.SimpleNamespace(tick=lambda fps: None)))
+    monkeypatch.setattr(speech_output, "GTTS_AVAILABLE", True)
+    monkeypatch.setattr(speech_output, "gTTS", SlowTTS, raising=False)
+    monkeypatch.setattr(speech_output, "pygame", fake_pygame, raising=False)
+    monkeypatch.setattr(speech_output, "_monitor", object())
+
+    threading.Timer(0.2, stop_flag.set).start()
+    speech_output.speak_with_gtts("first reply")
+    stop_flag.clear()
+
+    speech_output.speak_with_gtts("second reply")
+    assert FakeMusic.played == ["second reply"]
+
+    SlowTTS.release.set()
+    first, second = SlowTTS.saved
+    assert first != second
+    for _ in range(50):
+        if not os.path.exists(first):
+            break
+        threading.Event().wait(0.05)
+    assert not os.path.exists(first)
+    assert not os.path.exists(second)
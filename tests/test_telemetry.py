@@ -0,0 +1,28 @@
+"""Buffered telemetry goes to the database it was recorded for"""
+
+import sqlite3
+
+import telemetry
+
+
+def count(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+
+
+def test_rows_buffered_before_the_database_changes_stay_in_the_old_one(tmp_path, monkeypatch):
+    first, second = str(tmp_path / "first.db"), str(tmp_path / "second.db")
+    monkeypatch.setattr(telemetry, "TELEMETRY_DB", first)
+    telemetry.record("model-a", 200, 0.1)
+    telemetry.record("model-a", 200, 0.2)
+
+    monkeypatch.setattr(telemetry, "TELEMETRY_DB", second)
+    telemetry.record("model-b", 200, 0.3)
+    assert count(first) == 2
+
+    # Even when flushed after TELEMETRY_DB moved on again
+    monkeypatch.setattr(telemetry, "TELEMETRY_DB", first)
+    monkeypatch.setattr(telemetry, "TELEMETRY_DB", str(tmp_path / "third.db"))
+    telemetry.flush()
+    assert count(second) == 1
+    assert count(first) == 2
@@ -2,12 +2,18 @@
 Handles translation functionality for Zoya AI Assistant
 """
 
-import requests
-import json
+import os
+import metrics
+import outbound
+from http_client import session as http_session
+from resilience import retry_after_seconds
 
 # Global flag to indicate if translation is available
 TRANSLATOR_AVAILABLE = True
 
+# MyMemory API endpoint
+MYMEMORY_URL = os.getenv("MYMEMORY_URL", "https://api.mymemory.translated.net/get")
+
 # Language code mapping for the translate library
 LANGUAGE_MAP = {
     "en": "EN",
@@ -19,16 +25,21 @@ LANGUAGE_MAP = {
 }
 
 
-def translate_text(text, target_language):
+@metrics.timed("translate")
+def translate_text(text, target_language, cancel=None):
     """
     Translate text to the target language using MyMemory API
     
     Args:
         text (str): Text to translate
         target_language (str): Target language code
+        cancel (CancelToken): Abandons the translation when set
         
     Returns:
         str: Translated text or original text if failed
+
+    Raises:
+        Cancelled: If cancel was set before the translation finished
     """
     # If target language is English, no translation needed
     if target_language == "en":
@@ -40,41 +51,30 @@ def translate_text(text, target_language):
         chunks = [text[i:i+400] for i in range(0, len(text), 400)]
         translated_chunks = []
         for chunk in chunks:
-            translated_chunk = translate_chunk(chunk, target_language)
+            translated_chunk = translate_chunk(chunk, target_language, cancel)
             if translated_chunk:
                 translated_chunks.append(translated_chunk)
         return " ".join(translated_chunks) if translated_chunks else text
     
-    return translate_chunk(text, target_language)
+    return translate_chunk(text, target_language, cancel)
 
 
-def translate_chunk(text, target_language):
+def translate_chunk(text, target_language, cancel=None):
     """
     Translate a single chunk of text
     
     Args:
         text (str): Text to translate
         target_language (str): Target language code
+        cancel (CancelToken): Abandons the request when set
         
     Returns:
         str: Translated text or original text if failed
     """
     try:
-        # MyMemory API endpoint
-        url = "https://api.mymemory.translated.net/get"
-        
-        # Parameters for the translation
-        params = {
-            'q': text,
-            'langpair': f'en|{target_language}'
-        }
-        
-        # Make the API request
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        # Parse the JSON response
-        data = response.json()
+        # Make the API request, sharing it with identical translations in flight
+        data = outbound.call("mymemory", (text, target_language), _request_translation,
+                             text, target_language, cancel=cancel)
         
         # Extract the translated text
         translated_text = data['responseData']['translatedText']
@@ -88,5 +88,21 @@ def translate_chunk(text, target_language):
         return translated_text
         
     except Exception as e:
+        metrics.inc("zoya_stage_errors_total", stage="translate_chunk")
         print(f"Translation error: {e}")
-        return text  # Return original text if translation fails
\ No newline at end of file
+        return text  # Return original text if translation fails
+
+def _request_translation(text, target_language):
+    """Send one MyMemory request and return the parsed JSON"""
+    # Parameters for the translation
+    params = {
+        'q': text,
+        'langpair': f'en|{target_language}'
+    }
+    response = http_session.get(MYMEMORY_URL, params=params)
+    metrics.inc("zoya_requests_total", backend="mymemory", status=response.status_code)
+    metrics.inc("zoya_http_bytes_total", len(response.content), backend="mymemory", direction="in")
+    if response.status_code == 429:
+        outbound.pause("mymemory", retry_after_seconds(response) or 1.0)
+    response.raise_for_status()
+    return response.json()
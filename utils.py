@@ -2,12 +2,158 @@
 Utility functions for Zoya AI Assistant
 """
 
+import os
 import re
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+# Threads available for blocking calls that must be abandonable on cancel
+IO_WORKERS = int(os.getenv("ZOYA_IO_WORKERS", "64"))
 
-# Global stop flag for interrupting speech
-stop_flag = threading.Event()
+
+class Cancelled(BaseException):
+    """
+    Raised when work is abandoned because its turn was cancelled
+
+    Like asyncio.CancelledError it derives from BaseException, so the broad
+    "except Exception" handlers around each backend do not swallow it.
+    """
+
+    def __init__(self, partial=""):
+        super().__init__("Cancelled")
+        self.partial = partial
+
+
+class CancelToken(threading.Event):
+    """
+    An Event that also runs callbacks when set
+
+    Callbacks let in-flight work react immediately, for example by closing a
+    socket, instead of noticing the flag on its next poll. Setting the token
+    is the same as cancelling it; clearing it drops pending callbacks.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks = []
+        self._callback_lock = threading.Lock()
+
+    def set(self):
+        with self._callback_lock:
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    cancel = set
+
+    def clear(self):
+        with self._callback_lock:
+            super().clear()
+            self._callbacks = []
+
+    def on_cancel(self, callback):
+        """Run callback when the token is cancelled, or now if it already is"""
+        with self._callback_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return callback
+        callback()
+        return callback
+
+    def remove_callback(self, callback):
+        """Forget a callback registered with on_cancel"""
+        with self._callback_lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def raise_if_cancelled(self):
+        """Raise Cancelled if the token has been cancelled"""
+        if self.is_set():
+            raise Cancelled()
+
+
+# Global stop flag for interrupting speech and the turn in progress
+stop_flag = CancelToken()
+
+_io_pool = None
+_io_pool_lock = threading.Lock()
+
+
+def submit_io(func, *args, **kwargs):
+    """Run a blocking call on the shared I/O worker pool and return its Future"""
+    global _io_pool
+    with _io_pool_lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="zoya-io")
+    return _io_pool.submit(func, *args, **kwargs)
+
+
+def wait_cancellable(future, cancel, on_abandon=None):
+    """
+    Wait for a Future, returning early with Cancelled if cancel is set first
+
+    Args:
+        future (Future): The call to wait for
+        cancel (CancelToken): Token to watch, or None to wait indefinitely
+        on_abandon (callable): Receives the result if the wait is abandoned
+
+    Returns:
+        The result of the future
+
+    Raises:
+        Cancelled: If cancel was set before the future finished
+    """
+    if cancel is None:
+        return future.result()
+
+    cancelled = Future()
+    callback = cancel.on_cancel(lambda: cancelled.done() or cancelled.set_result(None))
+    finished = False
+    try:
+        wait([future, cancelled], return_when=FIRST_COMPLETED)
+        # A call that ends because it was aborted on cancel still counts as cancelled
+        finished = future.done() and not cancel.is_set()
+    finally:
+        # Also reached on KeyboardInterrupt, which abandons the call as well
+        cancel.remove_callback(callback)
+        if not finished and on_abandon:
+            future.add_done_callback(lambda f: f.exception() is None and on_abandon(f.result()))
+
+    if finished:
+        return future.result()
+    raise Cancelled()
+
+
+def run_cancellable(func, cancel, *args, on_abandon=None, **kwargs):
+    """
+    Run a blocking call, returning as soon as it finishes or cancel is set
+
+    The call runs on a shared worker pool so the caller can walk away from it
+    the moment the turn is cancelled. An abandoned call keeps running in the
+    background; on_abandon receives its result when it arrives, so responses
+    can be closed and connections returned to the pool.
+
+    Args:
+        func (callable): The blocking call
+        cancel (CancelToken): Token to watch, or None to call func directly
+        on_abandon (callable): Receives the result of an abandoned call
+
+    Returns:
+        The result of func
+
+    Raises:
+        Cancelled: If cancel was set before func finished
+    """
+    if cancel is None:
+        return func(*args, **kwargs)
+    cancel.raise_if_cancelled()
+    return wait_cancellable(submit_io(func, *args, **kwargs), cancel, on_abandon)
 
 
 def clean_text(text):